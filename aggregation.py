@@ -0,0 +1,112 @@
+"""Replicate statistics of merged, named data files.
+
+The columns of the merged files written by the naming and merging step
+(all_OD.csv, all_relative_<reporter>.csv or their sorted_* counterparts for
+single plates) are named "construct, condition" with pandas suffixes (.1,
+.2, ...) for replicates. This module groups all replicate columns by
+construct and condition and computes N, mean, SD, SEM and CV for every time
+point with one reduction per statistic over all groups. The result is written
+as a long table with one row per construct, condition and time point.
+"""
+
+import os
+import logging
+
+import numpy as np
+
+import constants
+import reorder
+
+pd = constants.lazy_import("pandas")
+
+
+# Initialize logger.
+logger = constants.setup_logger(
+    log_level=logging.DEBUG,
+    logger_name=__name__
+)
+
+SUMMARY_SUFFIX = constants.SUMMARY_SUFFIX
+SUMMARY_COLUMNS = ["construct", "condition", "cycle", "time", "N", "mean",
+                   "SD", "SEM", "CV"]
+
+
+def group_columns(names):
+    """Assigns every column name to its (construct, condition) group.
+    Returns the list of groups in order of their first appearance and an
+    array with the group index of every column.
+    """
+    group_idx = {}
+    codes = np.array([group_idx.setdefault(group, len(group_idx))
+                      for group in constants.split_names(names)],
+                     dtype=np.int64)
+    return list(group_idx), codes
+
+
+def replicate_summary(names, values, mask=None):
+    """Takes the column names and the values of shape (time, column) of a
+    merged file as input. Returns the groups (see group_columns) and a
+    dictionary of arrays of shape (time, group) with the keys N, mean, SD,
+    SEM and CV. Missing values (NaN) and values for which the outlier mask is
+    True are not counted.
+    """
+    values = reorder.masked(values, mask)
+    groups, codes = group_columns(names)
+    order = np.argsort(codes, kind="stable")
+    starts = np.searchsorted(codes[order], np.arange(len(groups)))
+    valid = ~np.isnan(values[:, order])
+    filled = np.where(valid, values[:, order], 0.0)
+
+    counts = np.add.reduceat(valid, starts, axis=1).astype(np.int64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.add.reduceat(filled, starts, axis=1) / counts
+        deviations = np.where(valid, filled - means[:, codes[order]], 0.0)
+        sds = np.sqrt(np.add.reduceat(deviations ** 2, starts, axis=1)
+                      / (counts - 1))
+        sds[counts < 2] = np.nan
+        sems = sds / np.sqrt(counts)
+        cvs = sds / means
+    return groups, {"N": counts, "mean": means, "SD": sds, "SEM": sems,
+                    "CV": cvs}
+
+
+def summary_frame(groups, cycles, times, statistics):
+    """Arranges the result of replicate_summary as a long DataFrame with the
+    columns SUMMARY_COLUMNS, ordered by group and time.
+    """
+    num_times = len(times)
+    constructs, conditions = zip(*groups) if groups else ((), ())
+    frame = pd.DataFrame({
+        "construct": np.repeat(constructs, num_times),
+        "condition": np.repeat(conditions, num_times),
+        "cycle": np.tile(np.asarray(cycles).astype(int), len(groups)),
+        "time": np.tile(times, len(groups)),
+    })
+    for key in SUMMARY_COLUMNS[4:]:
+        frame[key] = statistics[key].T.ravel()
+    return frame
+
+
+def summary_file_name(in_file):
+    stem, extension = os.path.splitext(in_file)
+    return stem + SUMMARY_SUFFIX + extension
+
+
+def aggregate_merged_file(in_file, outfile=None, mask=None):
+    """Writes the replicate summary of the merged file in_file to outfile
+    (default: <in_file>_summary.csv), leaving out values masked as outliers.
+    Returns the name of the written file.
+    """
+    if outfile is None:
+        outfile = summary_file_name(in_file)
+    names, cycles, times, values = reorder.read_merged_file(in_file)
+    groups, statistics = replicate_summary(names, values, mask)
+    summary_frame(groups, cycles, times, statistics).to_csv(
+        outfile, sep=constants.SEP, decimal=",", index=False)
+    logger.info(f"Written replicate summary of {len(groups)} groups in "
+                + f"{in_file} to {outfile}.")
+    return outfile
+
+
+if __name__ != "__main__":
+    constants.announce("Initialized replicate aggregation.")
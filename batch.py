@@ -0,0 +1,347 @@
+"""Batch processing of merged data files from many experiment folders.
+
+Files are processed in parallel worker processes. Every batch run writes a
+JSON summary listing the processed files, the captured constructs, the wall
+time and all failures.
+
+Usage from the command line:
+
+    python batch.py reorder DIR_OR_GLOB [DIR_OR_GLOB ...] [options]
+    python batch.py dose-response DIR_OR_GLOB [DIR_OR_GLOB ...] [options]
+
+See "python batch.py <command> --help" for all options.
+"""
+
+import os
+import sys
+import glob
+import json
+import math
+import time
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import constants
+import reorder
+import dose_response
+import outliers
+
+
+# Initialize logger.
+logger = constants.setup_logger(
+    log_level=logging.DEBUG,
+    logger_name=__name__
+)
+
+MERGED_FILE_PATTERN = "all_relative_*.csv"
+CURVE_FILE_PATTERN = "*.csv"
+
+
+def find_files(paths, pattern=MERGED_FILE_PATTERN):
+    """Takes a list of directories and/or glob patterns as input.
+    Directories are searched for files matching pattern. Returns a sorted list
+    of all files found without duplicates. Output files of earlier reorder
+    runs and other output files (see constants.is_output_file) are skipped.
+    """
+    found = set()
+    for path in paths:
+        if os.path.isdir(path):
+            found.update(glob.glob(os.path.join(path, pattern)))
+        else:
+            found.update(glob.glob(path, recursive=True))
+    return sorted(file for file in found
+                  if os.path.isfile(file)
+                  and not constants.is_output_file(file))
+
+
+def run_in_pool(worker, jobs, processes=None):
+    """Calls worker with the arguments of every job (a tuple) in a pool of
+    worker processes. Returns the results in the order of jobs.
+    With processes=1, all jobs run in the calling process. Jobs are sent to
+    the workers in chunks to keep the overhead of many small jobs low.
+    The workers log to the log file of the calling process.
+    """
+    if processes == 1 or len(jobs) <= 1:
+        return [worker(*job) for job in jobs]
+    num_workers = processes or os.cpu_count() or 1
+    chunksize = max(1, len(jobs) // (4 * num_workers))
+    with ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=constants.init_worker_logging,
+            initargs=(constants.worker_log_queue(),)) as pool:
+        return list(pool.map(worker, *zip(*jobs), chunksize=chunksize))
+
+
+def reorder_file(in_file, num_replicates, timepoint_idx, background_keyword,
+                 outlier_method=None):
+    """Worker for batch_reorder. Writes the reordered file and, if a
+    background_keyword is given, the background corrected variant. If an
+    outlier_method (see outliers.METHODS) is given, the flagged outliers are
+    listed in <in_file>_outliers.csv and left out of both.
+    Returns a dictionary describing the result. Errors are reported in the
+    result instead of being raised.
+    """
+    result = {"file": in_file, "written": [], "constructs": [],
+              "error": None}
+    try:
+        mask = None
+        if outlier_method is not None:
+            mask = outliers.flag_merged_file(in_file, outlier_method)
+            result["written"].append(reorder.outlier_file(in_file))
+            result["outliers"] = int(mask.sum())
+        output_file, constructs = reorder.write_reordered_single_point(
+            in_file, num_replicates, timepoint_idx, mask=mask)
+        result["written"].append(output_file)
+        result["constructs"] = [str(construct) for construct in constructs]
+        if background_keyword is not None:
+            output_file, _ = reorder.write_reordered_single_point(
+                in_file, num_replicates, timepoint_idx, background_keyword,
+                mask=mask)
+            result["written"].append(output_file)
+    except Exception as error:
+        logger.exception(f"Could not reorder {in_file}.")
+        result["error"] = f"{type(error).__name__}: {error}"
+    return result
+
+
+def batch_reorder(paths, num_replicates=3, timepoint_idx=4,
+                  background_keyword=None, processes=None,
+                  pattern=MERGED_FILE_PATTERN, outlier_method=None):
+    """Reorders every merged data file found in paths (see find_files) with
+    the same settings in parallel worker processes. Outliers are only left
+    out if an outlier_method is given.
+    Returns a summary dictionary of the run.
+    """
+    start = time.perf_counter()
+    files = find_files(paths, pattern)
+    logger.info(f"Started batch reorder of {len(files)} file(s).")
+    jobs = [(file, num_replicates, timepoint_idx, background_keyword,
+             outlier_method) for file in files]
+    results = run_in_pool(reorder_file, jobs, processes)
+    return summarize(results, time.perf_counter() - start, settings={
+        "num_replicates": num_replicates,
+        "timepoint_idx": timepoint_idx,
+        "background_keyword": background_keyword,
+        "outlier_method": outlier_method,
+    })
+
+
+def analyse_curve(in_file, num_replicates, induction_time, time_points):
+    """Worker for batch_dose_response. Loads a single dose-response curve and
+    returns a dictionary with its row of the metrics table. Errors are
+    reported in the result instead of being raised.
+    """
+    result = {"file": in_file, "metrics": None, "constructs": [],
+              "error": None}
+    try:
+        drc = dose_response.DoseResponseCurve(
+            in_file,
+            induction_time=induction_time,
+            num_replicates=num_replicates)
+        result["metrics"] = dose_response.curve_metrics(drc, time_points)
+        result["constructs"] = [drc.name]
+    except Exception as error:
+        logger.exception(f"Could not analyse {in_file}.")
+        result["error"] = f"{type(error).__name__}: {error}"
+    return result
+
+
+def batch_dose_response(
+        paths,
+        num_replicates=dose_response.NUM_REPLICATES,
+        induction_time=dose_response.INDUCTION_TIME_IN_MIN,
+        time_points=dose_response.DYNAMIC_RANGE_TIME_POINTS,
+        processes=None,
+        pattern=CURVE_FILE_PATTERN):
+    """Analyses every dose-response curve CSV found in paths (see find_files)
+    in parallel worker processes.
+    Returns a summary dictionary of the run. The metrics of every curve are
+    part of its results (see metrics_table).
+    """
+    start = time.perf_counter()
+    files = [file for file in find_files(paths, pattern)
+             if dose_response.is_curve_file(file)]
+    logger.info(f"Started batch dose-response analysis of {len(files)} "
+                + "file(s).")
+    jobs = [(file, num_replicates, induction_time, list(time_points))
+            for file in files]
+    results = run_in_pool(analyse_curve, jobs, processes)
+    return summarize(results, time.perf_counter() - start, settings={
+        "num_replicates": num_replicates,
+        "induction_time": induction_time,
+        "time_points": list(time_points),
+    })
+
+
+def metrics_table(results):
+    """Returns the metrics of all curves analysed by batch_dose_response
+    followed by their file, sorted by curve name and file.
+    """
+    return sorted((result["metrics"] + [result["file"]] for result in results
+                   if result["error"] is None),
+                  key=lambda row: (row[0], row[-1]))
+
+
+def write_metrics_table(table, out_file,
+                        time_points=dose_response.DYNAMIC_RANGE_TIME_POINTS,
+                        sep=constants.SEP):
+    """Writes the combined metrics table of batch_dose_response."""
+    with open(out_file, "w") as out:
+        out.write(sep.join(dose_response.metrics_header(time_points)
+                           + ["File"]) + "\n")
+        for *metrics, file in table:
+            out.write(sep.join(dose_response.format_metrics(metrics) + [file])
+                      + "\n")
+
+
+def summarize(results, wall_time, settings):
+    """Assembles the summary of a batch run from the worker results."""
+    failures = [{"file": result["file"], "error": result["error"]}
+                for result in results if result["error"] is not None]
+    constructs = {construct for result in results
+                  for construct in result["constructs"]}
+    summary = {
+        "settings": settings,
+        "files_processed": len(results) - len(failures),
+        "files_failed": len(failures),
+        "constructs_captured": len(constructs),
+        "wall_time_s": round(wall_time, 3),
+        "results": results,
+        "failures": failures,
+    }
+    logger.info(f"Finished batch run of {len(results)} file(s) in "
+                + f"{wall_time:.2f} s with {len(failures)} failure(s).")
+    return summary
+
+
+def json_compatible(data):
+    """Returns data with NaN and infinite numbers, e.g. undefined metrics,
+    replaced by None, which JSON can represent.
+    """
+    if isinstance(data, dict):
+        return {key: json_compatible(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [json_compatible(value) for value in data]
+    if isinstance(data, float) and not math.isfinite(data):
+        return None
+    return data
+
+
+def write_summary(summary, summary_file):
+    with open(summary_file, "w") as out:
+        json.dump(json_compatible(summary), out, indent=2, allow_nan=False)
+
+
+def time_point(text):
+    """Parses a time point given on the command line. Whole numbers are
+    returned as int so that they are printed without decimals.
+    """
+    number = constants.parse_number(text)
+    return int(number) if number.is_integer() else number
+
+
+def parse_arguments(argv):
+    parser = argparse.ArgumentParser(
+        description="Batch processing of merged OCUTaF data files.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    reorder_parser = subparsers.add_parser(
+        "reorder", help="Reorder single time points of merged files.")
+    reorder_parser.add_argument(
+        "paths", nargs="+",
+        help="Experiment directories or glob patterns of merged files.")
+    reorder_parser.add_argument(
+        "--pattern", default=MERGED_FILE_PATTERN,
+        help="File pattern used inside directories "
+        + f"(default: {MERGED_FILE_PATTERN}).")
+    reorder_parser.add_argument(
+        "--replicates", type=int, default=3,
+        help="Number of biological replicates (default: 3).")
+    reorder_parser.add_argument(
+        "--timepoint", type=int, default=4,
+        help="Data row used for the single point analysis (default: 4).")
+    reorder_parser.add_argument(
+        "--background-keyword", default=None,
+        help="Also write the background corrected variant using this "
+        + "keyword for background constructs.")
+    reorder_parser.add_argument(
+        "--exclude-outliers", choices=outliers.METHODS, default=None,
+        help="Leave out outliers flagged by this method and list them in "
+        + f"<file>{outliers.OUTLIER_SUFFIX}.csv (default: keep all values).")
+
+    dose_response_parser = subparsers.add_parser(
+        "dose-response", help="Analyse dose-response curve CSVs.")
+    dose_response_parser.add_argument(
+        "paths", nargs="+",
+        help="Directories or glob patterns of dose-response curve CSVs.")
+    dose_response_parser.add_argument(
+        "--pattern", default=CURVE_FILE_PATTERN,
+        help="File pattern used inside directories "
+        + f"(default: {CURVE_FILE_PATTERN}).")
+    dose_response_parser.add_argument(
+        "--replicates", type=int, default=dose_response.NUM_REPLICATES,
+        help="Number of biological replicates "
+        + f"(default: {dose_response.NUM_REPLICATES}).")
+    dose_response_parser.add_argument(
+        "--induction-time", type=time_point,
+        default=dose_response.INDUCTION_TIME_IN_MIN,
+        help="Time of inducer addition in minutes "
+        + f"(default: {dose_response.INDUCTION_TIME_IN_MIN}).")
+    dose_response_parser.add_argument(
+        "--time-points", type=time_point, nargs="+",
+        default=list(dose_response.DYNAMIC_RANGE_TIME_POINTS),
+        help="Time points the dynamic range is reported at (default: "
+        + " ".join(str(time_point) for time_point
+                   in dose_response.DYNAMIC_RANGE_TIME_POINTS) + ").")
+    dose_response_parser.add_argument(
+        "--output", default=dose_response.METRICS_TABLE_FILE,
+        help="File the combined metrics table is written to "
+        + f"(default: {dose_response.METRICS_TABLE_FILE}).")
+
+    for subparser in subparsers.choices.values():
+        subparser.add_argument(
+            "--processes", type=int, default=None,
+            help="Number of worker processes (default: number of CPUs).")
+        subparser.add_argument(
+            "--summary", default="batch_summary.json",
+            help="File the run summary is written to "
+            + "(default: batch_summary.json).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    if args.command == "reorder":
+        summary = batch_reorder(
+            args.paths,
+            num_replicates=args.replicates,
+            timepoint_idx=args.timepoint,
+            background_keyword=args.background_keyword,
+            processes=args.processes,
+            pattern=args.pattern,
+            outlier_method=args.exclude_outliers)
+    elif args.command == "dose-response":
+        summary = batch_dose_response(
+            args.paths,
+            num_replicates=args.replicates,
+            induction_time=args.induction_time,
+            time_points=args.time_points,
+            processes=args.processes,
+            pattern=args.pattern)
+        write_metrics_table(metrics_table(summary["results"]), args.output,
+                            args.time_points)
+    write_summary(summary, args.summary)
+    print(f"Processed {summary['files_processed']} file(s) with "
+          + f"{summary['constructs_captured']} construct(s) in "
+          + f"{summary['wall_time_s']} s. {summary['files_failed']} "
+          + f"failure(s). Summary written to {args.summary}.")
+    return 1 if summary["files_failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+
+if __name__ != "__main__":
+    constants.announce("Initialized batch processing module.")
@@ -0,0 +1,256 @@
+"""Benchmark of the raw data pipeline on synthetic data.
+
+Every stage of a raw data run is timed at several scales, i.e. numbers of
+plates and cycles, on data written by synthetic_data.py:
+
+    validation          pre-flight checks of the input directories
+    ingest              reading the raw data files into uniform TSVs
+    blank correction    blank correction of OD and reporter, growth tables
+    naming and merging  naming, merging, aggregation and experiment store
+    reorder             reordering all time points of the merged reporter file
+    dose-response       metrics of the dose-response curve of every construct
+
+The raw data stages run the same code as a raw data run of the GUI.
+
+The best time of a number of repeats is kept per stage and written to a
+JSON file. Given the JSON file of an earlier run as baseline, stages that
+got slower than the baseline by more than the tolerance are reported as
+regressions and the exit status is 1.
+
+Usage from the command line:
+
+    python benchmark.py [--scales 1x10 4x25] [--baseline FILE] [options]
+
+See "python benchmark.py --help" for all options.
+"""
+
+import os
+import sys
+import json
+import logging
+import argparse
+import platform
+import tempfile
+
+import constants
+import raw_data
+import reorder
+import dose_response
+import synthetic_data
+import instrumentation
+import profiling
+
+
+# Initialize logger.
+logger = constants.setup_logger(
+    log_level=logging.DEBUG,
+    logger_name=__name__
+)
+
+STAGES = ("validation", "ingest", "blank correction", "naming and merging",
+          "reorder", "dose-response")
+DEFAULT_SCALES = ((1, 10), (4, 25), (8, 50))
+REPORTER_NAME = "lux"
+RESULTS_FILE = "benchmark_results.json"
+TOLERANCE = 0.25  # Relative slowdown reported as regression.
+MIN_SLOWDOWN_S = 0.05  # Smaller slowdowns are timer noise.
+
+
+def scale(text):
+    """Parses a scale given on the command line as <plates>x<cycles>."""
+    try:
+        plates, cycles = map(int, text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"{text} is no scale of the form <plates>x<cycles>.")
+    if plates < 1 or cycles < 2:
+        raise argparse.ArgumentTypeError(
+            f"{text} needs at least one plate and two cycles.")
+    return plates, cycles
+
+
+def scale_key(plates, cycles):
+    return f"{plates}x{cycles}"
+
+
+def run_pipeline(raw_data_dir, name_file_dir, curve_dir, profiler=None):
+    """Runs all stages on the synthetic run in raw_data_dir with the name
+    files in name_file_dir. The raw data stages are the steps of a raw data
+    run of the GUI (raw_data.RawDataRun), which writes its intermediate
+    files to raw_data_dir as the working directory. Returns the wall time of
+    every stage in seconds. The stages selected by profiler are profiled.
+    """
+    steps = raw_data.RawDataRun(
+        raw_data_dir,
+        reporter_name=REPORTER_NAME,
+        blank_wells=", ".join(synthetic_data.BLANK_WELLS),
+        name_file_dir=name_file_dir)
+    with instrumentation.run_report("benchmark",
+                                    profiler=profiler) as report:
+        if not steps.run():
+            raise RuntimeError(f"Raw data run of {raw_data_dir} failed.")
+        with instrumentation.span("reorder"):
+            reorder.reorder_all_time_points(
+                steps.merged_files[1], synthetic_data.NUM_REPLICATES,
+                long_format=True)
+        with instrumentation.span("dose-response"):
+            for drc in dose_response.data_in_directory(
+                    curve_dir, num_replicates=synthetic_data.NUM_REPLICATES):
+                dose_response.curve_metrics(drc)
+    return {stage.path[-1]: stage.wall_s
+            for stage in report.top_level_stages()}
+
+
+def benchmark_scale(plates, cycles, repeats=3, raw_format="asc", seed=0,
+                    profiler=None):
+    """Times the pipeline on fresh synthetic data of plates with cycles
+    measurements repeats times. Returns the best time of every stage.
+    """
+    best = {}
+    for _ in range(repeats):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            raw_data_dir, name_file_dir, curve_dir = (
+                os.path.join(tmp_dir, sub_dir)
+                for sub_dir in ("raw", "names", "curves"))
+            for directory in (raw_data_dir, name_file_dir, curve_dir):
+                os.mkdir(directory)
+            synthetic_data.generate_run(
+                raw_data_dir, plates, cycles, (REPORTER_NAME,), raw_format,
+                name_file_dir, seed)
+            synthetic_data.generate_curves(curve_dir, plates, cycles, seed)
+            working_dir = os.getcwd()
+            try:
+                timings = run_pipeline(raw_data_dir, name_file_dir,
+                                       curve_dir, profiler)
+            finally:
+                os.chdir(working_dir)
+        for stage, seconds in timings.items():
+            best[stage] = min(seconds, best.get(stage, seconds))
+    logger.info(f"Benchmarked {plates} plate(s) with {cycles} cycle(s) in "
+                + f"{sum(best.values()):.2f} s.")
+    return {stage: round(best[stage], 4) for stage in STAGES}
+
+
+def run_benchmark(scales=DEFAULT_SCALES, repeats=3, raw_format="asc",
+                  seed=0, profiler=None):
+    """Benchmarks every (plates, cycles) scale. Returns the results, which
+    map the scale keys to the stage timings, together with the settings.
+    The stages selected by profiler are profiled across all runs.
+    """
+    results = {}
+    for plates, cycles in scales:
+        timings = benchmark_scale(plates, cycles, repeats, raw_format, seed,
+                                  profiler)
+        results[scale_key(plates, cycles)] = timings
+        print(f"{scale_key(plates, cycles):>8}: "
+              + ", ".join(f"{stage} {seconds:.3f} s"
+                          for stage, seconds in timings.items()))
+    return {
+        "settings": {"repeats": repeats, "raw_format": raw_format,
+                     "seed": seed},
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(results, baseline, tolerance=TOLERANCE,
+            min_slowdown=MIN_SLOWDOWN_S):
+    """Compares benchmark results with the results of a baseline run.
+    Returns a message for every stage of a scale present in both that is
+    slower than the baseline by more than tolerance (relative) and
+    min_slowdown (seconds).
+    """
+    regressions = []
+    for key, timings in results["results"].items():
+        baseline_timings = baseline["results"].get(key, {})
+        for stage, seconds in timings.items():
+            if stage not in baseline_timings:
+                continue
+            reference = baseline_timings[stage]
+            if (seconds > reference * (1 + tolerance)
+                    and seconds - reference > min_slowdown):
+                regressions.append(
+                    f"{stage} at {key}: {seconds:.3f} s instead of "
+                    + f"{reference:.3f} s (+{seconds / reference - 1:.0%}).")
+    return regressions
+
+
+def read_results(results_file):
+    with open(results_file) as infile:
+        return json.load(infile)
+
+
+def write_results(results, results_file):
+    with open(results_file, "w") as out:
+        json.dump(results, out, indent=2)
+
+
+def parse_arguments(argv):
+    parser = argparse.ArgumentParser(
+        description="Benchmark of the OCUTaF raw data pipeline on "
+        + "synthetic data.")
+    parser.add_argument(
+        "--scales", type=scale, nargs="+", default=list(DEFAULT_SCALES),
+        help="Scales given as <plates>x<cycles> (default: "
+        + " ".join(scale_key(*default) for default in DEFAULT_SCALES) + ").")
+    parser.add_argument(
+        "--repeats", type=int, default=3,
+        help="Repeats per scale, the best time is kept (default: 3).")
+    parser.add_argument(
+        "--format", dest="raw_format", default="asc",
+        choices=synthetic_data.RAW_DATA_FORMATS,
+        help="Format of the raw data files (default: asc).")
+    parser.add_argument(
+        "--seed", type=int, default=0,
+        help="Seed of the synthetic data (default: 0).")
+    parser.add_argument(
+        "--output", default=RESULTS_FILE,
+        help=f"File the results are written to (default: {RESULTS_FILE}).")
+    parser.add_argument(
+        "--profile", nargs="*", default=None, metavar="STAGE",
+        help="Profile the given stages (all without stages) with cProfile "
+        + f"and write {profiling.PROFILE_NAME}.prof next to the results. "
+        + f"Also requested by {profiling.PROFILE_VARIABLE}.")
+    parser.add_argument(
+        "--baseline", default=None,
+        help="Results of an earlier run to check for regressions.")
+    parser.add_argument(
+        "--tolerance", type=float, default=TOLERANCE,
+        help="Relative slowdown reported as regression "
+        + f"(default: {TOLERANCE}).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    if args.profile is None:
+        profiler = profiling.profiler_for_run()
+    else:
+        profiler = profiling.StageProfiler(set(args.profile)
+                                           or profiling.ALL_STAGES)
+    results = run_benchmark(args.scales, args.repeats, args.raw_format,
+                            args.seed, profiler)
+    write_results(results, args.output)
+    print(f"Results written to {args.output}.")
+    if profiler is not None:
+        profile_file = profiler.write(
+            os.path.dirname(os.path.abspath(args.output)))
+        print(f"Profile written to {profile_file}.")
+    if args.baseline is None:
+        return 0
+    regressions = compare(results, read_results(args.baseline),
+                          args.tolerance)
+    for regression in regressions:
+        logger.warning(f"Regression: {regression}")
+        print(f"Regression: {regression}")
+    print(f"{len(regressions)} regression(s) compared to {args.baseline}.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+
+if __name__ != "__main__":
+    constants.announce("Initialized benchmark module.")
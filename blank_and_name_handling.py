@@ -3,9 +3,10 @@ import logging
 import re
 from statistics import mean
 
-import pandas as pd
-
 import constants
+import instrumentation
+
+pd = constants.lazy_import("pandas")
 
 
 # Initialize logger.
@@ -30,6 +31,7 @@ class DataHandler:
         self.exclude_blank_correction_for_reporter = \
             exclude_blank_correction_for_reporter
 
+    @instrumentation.measured("DataHandler")
     def process(self):
         self.determine_shape_of_input_file()
         self.read_data_from_input_file()
@@ -58,25 +60,27 @@ class DataHandler:
                         first_fu = last_od + 3
                         last_fu = first_fu + total_cycle_number
                         self.lines_fu = range(first_fu, last_fu + 1)
-                        seen_cycle = False
+                        # Later blocks (e.g. the empty line ending Excel
+                        #  exports) must not change the shape again.
+                        break
                 if line.startswith("Cycle"):
                     seen_cycle = True
 
     def read_data_from_input_file(self):
+        od_lines = []
+        fu_lines = []
         with open(self.file) as file:
             for line_idx, line in enumerate(file):
                 if line_idx in self.lines_od:
                     # Finds lines that correspond to OD data.
-                    vals = line.strip().split()
-                    for val_idx, val in enumerate(vals):
-                        self.od[constants.col_names[val_idx]].append(
-                            constants.parse_number(val))
+                    od_lines.append(line)
                 elif line_idx in self.lines_fu:
                     # Finds lines that correspond to reporter data.
-                    vals = line.strip().split()
-                    for val_idx, val in enumerate(vals):
-                        self.fu[constants.col_names[val_idx]].append(
-                            constants.parse_number(val))
+                    fu_lines.append(line)
+        for wrapper, lines in ((self.od, od_lines), (self.fu, fu_lines)):
+            block = constants.parse_number_block(lines, sep="\t")
+            for col_name, column in zip(constants.col_names, block.T):
+                wrapper[col_name] += column.tolist()
 
     def collect_blanks(self):
         blanks_od = []
@@ -140,20 +144,11 @@ def write_blank_corrected(wrapper_dict, outfile):
     units as input and writes it to Excel readible CSV outfile. Returns True
     to indicate successful completion for debugging purposes.
     """
-    to_write = ""
-    for key in wrapper_dict:
-        to_write += key
-        to_write += constants.SEP
-        length_of_datapoints = len(wrapper_dict[key])
-    to_write += "\n"
-    for i in range(length_of_datapoints):
-        for key in wrapper_dict:
-            to_write += str(wrapper_dict[key][i]).replace(".", ",")
-            to_write += constants.SEP
-        to_write += "\n"
-
+    rows = constants.format_numbers(list(zip(*wrapper_dict.values())))
     with open(outfile, "w") as out:
-        out.write(to_write)
+        out.write("".join(key + constants.SEP for key in wrapper_dict) + "\n")
+        out.writelines("".join(cell + constants.SEP for cell in row) + "\n"
+                       for row in rows)
 
     return True
 
@@ -240,6 +235,10 @@ def process_multi_entry(inp_list):
 # BAPTIZE AND MERGE
 # ==============================================================================
 
+# Well names starting with these strings are removed from sorted output files.
+DISCARD_FROM_DF = ["Unnamed", "medium", "blank"]  # , "empty"]
+DISCARD_PATTERNS = [re.compile(entry) for entry in DISCARD_FROM_DF]
+
 
 def baptize(data_file, name_csv, remove_quatation_marks_from_namefile):
     if remove_quatation_marks_from_namefile:
@@ -335,14 +334,16 @@ def process_input_to_primary_dataframe(dataframe_or_csv_file):
     return primary_df
 
 
+def is_discarded_name(name):
+    """Returns True if a well name is removed from sorted output files."""
+    return not name or match_iterable(name, DISCARD_PATTERNS)
+
+
 def generate_filtering_list(primary_df):
     # Define what entries to remove from the CSV file and compiling REs
-    discard_from_df = ["Unnamed", "medium", "blank"]  # , "empty"]
-    discard_patterns = [re.compile(entry) for entry in discard_from_df]
     keep_once = ["cycle", "time", "temp"]
     keep_patterns = [re.compile(string) for string in keep_once]
-    for pattern in discard_patterns:
-        keep_patterns.append(pattern)
+    keep_patterns.extend(DISCARD_PATTERNS)
     # CREATE SORTER LIST
     # Remove unwanted entries and duplications from primary_df
     to_keep = [entry for entry in primary_df
@@ -357,4 +358,4 @@ def generate_filtering_list(primary_df):
 
 
 if __name__ != "__main__":
-    print("\tInitialized blank correction module.")
+    constants.announce("Initialized blank correction module.")
@@ -3,8 +3,48 @@
 # ==============================================================================
 
 import os
+import sys
+import math
+import queue
+import atexit
+import shutil
 import logging
-import tkinter as tk
+import tempfile
+import importlib
+import multiprocessing
+import logging.handlers
+
+import numpy as np
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on its first attribute
+    access. GUI toolkits and optional dependencies are thereby only loaded
+    by the code paths using them. Import errors are raised at the first
+    access.
+    """
+    __module = None
+
+    def __init__(self, name):
+        self.__name = name
+
+    def __getattr__(self, attribute):
+        if self.__module is None:
+            self.__module = importlib.import_module(self.__name)
+        return getattr(self.__module, attribute)
+
+    def __repr__(self):
+        return f"<lazily imported module '{self.__name}'>"
+
+
+def lazy_import(name):
+    """Returns the module name if it has already been imported, otherwise
+    a LazyModule importing it on first use.
+    """
+    return sys.modules.get(name) or LazyModule(name)
+
+
+tk = lazy_import("tkinter")
 
 # Common seperator for output files.
 #   ";" makes CSV files readible for German version of Excel.
@@ -22,6 +62,31 @@ BTN_WIDTH_NORMAL = 11
 BTN_WIDTH_BIG = 30
 BTN_WIDTH_SMALL = 7
 
+# Log file next to the source files, independent of the working directory.
+LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
+# Used if LOG_DIR is not writable, e.g. in a read-only installation.
+FALLBACK_LOG_DIR = os.path.join(tempfile.gettempdir(), "OCUTaF_logs")
+LOG_FILE = "OCUTaF.log"
+LOG_MAX_BYTES = 2 * 1024 ** 2  # Size at which the log file is rotated.
+LOG_BACKUP_COUNT = 3
+# Environment variable overriding the log level of all modules, e.g. INFO.
+LOG_LEVEL_VARIABLE = "OCUTAF_LOG_LEVEL"
+# Environment variable enabling the initialization messages of all modules.
+BANNER_VARIABLE = "OCUTAF_BANNERS"
+
+# Suffixes of the files written by the processing steps, which are not
+#  picked up as input files again (see is_output_file).
+SUMMARY_SUFFIX = "_summary"
+OUTLIER_SUFFIX = "_outliers"
+SMOOTHED_SUFFIX = "_smoothed"
+DERIVATIVE_SUFFIX = "_derivative"
+PROMOTER_ACTIVITY_SUFFIX = "_promoter_activity"
+GROWTH_SUFFIX = "_growth"
+OUTPUT_SUFFIXES = (SUMMARY_SUFFIX, OUTLIER_SUFFIX, SMOOTHED_SUFFIX,
+                   DERIVATIVE_SUFFIX, PROMOTER_ACTIVITY_SUFFIX, GROWTH_SUFFIX)
+REORDERED_MARKER = "_reordered"
+ROW_INDEX_SUFFIX = ".rows"  # Row index cache of the reorder step.
+
 col_names = ['cycle', 'time', 'temp', 'A1', 'A2', 'A3', 'A4',
              'A5', 'A6', 'A7', 'A8', 'A9', 'A10', 'A11', 'A12', 'B1', 'B2',
              'B3', 'B4', 'B5', 'B6', 'B7', 'B8', 'B9', 'B10', 'B11', 'B12',
@@ -118,30 +183,192 @@ class ToolTip(object):
             self.tw.destroy()
 
 
+class SharedQueueHandler(logging.handlers.QueueHandler):
+    """Hands log records to the background thread writing the log file.
+    Records are formatted by the writing thread, so logging costs the caller
+    little more than putting the record into the queue. Only the main
+    process writes the log file: worker processes put their records into
+    the queue passed to init_worker_logging, which the main process
+    forwards to the log file. Without it, they only report warnings and
+    errors on the console.
+    """
+
+    def __init__(self, log_queue, file_handler):
+        super().__init__(log_queue)
+        self.file_handler = file_handler
+        self.pid = os.getpid() if file_handler is not None else None
+
+    def prepare(self, record):
+        if os.getpid() == self.pid:
+            return record
+        return super().prepare(record)  # Picklable for the worker queue.
+
+    def enqueue(self, record):
+        if os.getpid() == self.pid:
+            super().enqueue(record)
+        elif _worker_queue is not None:
+            _worker_queue.put_nowait(record)
+        elif record.levelno >= logging.lastResort.level:
+            logging.lastResort.handle(record)
+
+
+_shared_handler = None
+_worker_queue = None
+_worker_listener = None
+
+
+def writable_log_file(log_dirs=(LOG_DIR, FALLBACK_LOG_DIR)):
+    """Returns the path of the log file in the first of log_dirs it can be
+    written to or None if it cannot be written to any of them.
+    """
+    for log_dir in log_dirs:
+        log_file = os.path.join(log_dir, LOG_FILE)
+        try:
+            os.makedirs(log_dir, exist_ok=True)
+            with open(log_file, "a", encoding="utf-8"):
+                pass
+        except OSError:
+            continue
+        return log_file
+    return None
+
+
+def get_shared_handler():
+    """Returns the handler shared by all loggers. The rotating log file
+    handler and the queue listener feeding it are started on the first call
+    and stopped at exit after writing all remaining records. If LOG_DIR is
+    not writable, the log is written to FALLBACK_LOG_DIR or, failing that,
+    to the console.
+    """
+    global _shared_handler
+    if _shared_handler is None and multiprocessing.parent_process():
+        # Spawned worker process, see init_worker_logging.
+        _shared_handler = SharedQueueHandler(None, None)
+    if _shared_handler is None:
+        log_file = writable_log_file()
+        if log_file is None:
+            file_handler = logging.StreamHandler()
+        else:
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_file,
+                maxBytes=LOG_MAX_BYTES,
+                backupCount=LOG_BACKUP_COUNT,
+                encoding="utf-8",
+                delay=True
+            )
+        file_handler.setFormatter(logging.Formatter(
+            "%(asctime)s:%(levelname)s:%(name)s:%(message)s"))
+        log_queue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(log_queue, file_handler)
+        listener.start()
+        atexit.register(listener.stop)
+        _shared_handler = SharedQueueHandler(log_queue, file_handler)
+        if log_file != os.path.join(LOG_DIR, LOG_FILE):
+            logging.getLogger(__name__).warning(
+                f"Cannot write to {LOG_DIR}. Logging to "
+                + f"{log_file or 'the console'} instead.")
+    return _shared_handler
+
+
+def worker_log_queue():
+    """Returns the queue worker processes put their log records into (see
+    init_worker_logging). Records are written to the log file by a
+    listener thread of the main process, started on the first call.
+    """
+    global _worker_queue, _worker_listener
+    if _worker_listener is None:
+        _worker_queue = multiprocessing.Queue()
+        _worker_listener = logging.handlers.QueueListener(
+            _worker_queue, get_shared_handler().file_handler)
+        _worker_listener.start()
+        atexit.register(_worker_listener.stop)
+    return _worker_queue
+
+
+def init_worker_logging(log_queue):
+    """Initializer of worker processes (e.g. of a ProcessPoolExecutor)
+    sending their log records to log_queue of the main process.
+    """
+    global _worker_queue
+    _worker_queue = log_queue
+
+
+_invalid_log_levels = set()
+
+
+def log_level_from_environment(default):
+    """Returns the level set in LOG_LEVEL_VARIABLE, given by name in any
+    case (DEBUG, INFO, WARNING, ERROR, CRITICAL) or as number, e.g. 20.
+    Returns default if the variable is not set or holds no valid level.
+    """
+    value = os.environ.get(LOG_LEVEL_VARIABLE, "").strip()
+    if not value:
+        return default
+    if value.isdigit():
+        return int(value)
+    level = logging.getLevelName(value.upper())
+    if isinstance(level, int):
+        return level
+    if value not in _invalid_log_levels:
+        _invalid_log_levels.add(value)
+        logging.getLogger(__name__).warning(
+            f"Invalid log level {value} in {LOG_LEVEL_VARIABLE}. Using "
+            + f"{logging.getLevelName(default)}.")
+    return default
+
+
 def setup_logger(log_level, logger_name):
-    """Returns a logger with default setup callable for each module."""
-    if not os.path.exists("logs"):
-        os.makedirs("logs")
+    """Returns a logger with default setup callable for each module.
+    The level set in the environment variable LOG_LEVEL_VARIABLE takes
+    precedence over log_level.
+    """
     logger = logging.getLogger(logger_name)
-    logger.setLevel(log_level)  # DEBUG, INFO, WARNING, ERROR, CRITICAL
-    formatter = logging.Formatter(
-        "%(asctime)s:%(levelname)s:%(name)s:%(message)s")
-    log_file_handler = logging.FileHandler(os.path.join("logs", "OCUTaF.log"))
-    log_file_handler.setFormatter(formatter)
-    logger.addHandler(log_file_handler)
+    handler = get_shared_handler()
+    if handler not in logger.handlers:
+        logger.addHandler(handler)
+    logger.setLevel(log_level_from_environment(log_level))
     return logger
 
 
 def remove_double_quotest_from_file(file):
     """Takes a file handle as input.
     Overrides the files content with all double quotation marks (' " ') removed
+    and returns True if the file had to be rewritten.
+    """
+    return rewrite_file(file, lambda line: line.replace('"', ''))
+
+
+def rewrite_file(file, transform_line):
+    """Applies transform_line to every line of file and atomically replaces
+    file with the result. The lines are streamed to a temporary file in the
+    same directory. Files whose lines all stay the same are left untouched.
+    Returns True if the file was rewritten.
     """
-    clean_string = ""
     with open(file) as infile:
-        for line in infile:
-            clean_string += line.replace('"', '')
-    with open(file, "w") as newfile:
-        newfile.write(clean_string)
+        if all(transform_line(line) == line for line in infile):
+            return False
+    directory = os.path.dirname(os.path.abspath(file))
+    with tempfile.NamedTemporaryFile(
+            "w", dir=directory, suffix=".tmp", delete=False) as outfile:
+        try:
+            with open(file) as infile:
+                outfile.writelines(map(transform_line, infile))
+        except BaseException:
+            outfile.close()
+            os.remove(outfile.name)
+            raise
+    shutil.copymode(file, outfile.name)
+    os.replace(outfile.name, file)
+    return True
+
+
+def is_output_file(file):
+    """Returns True for files written by the processing steps themselves."""
+    file = os.path.basename(file)
+    stem = os.path.splitext(file)[0]
+    return (REORDERED_MARKER in file
+            or file.endswith(ROW_INDEX_SUFFIX)
+            or stem.endswith(OUTPUT_SUFFIXES))
 
 
 def relative(od_val, fu_val):
@@ -171,5 +398,88 @@ def num_to_str(number):
     return str(number).replace(".", ",")
 
 
+def parse_number_block(lines, sep=SEP):
+    """Parses a block of decimal comma lines separated by sep (not a comma)
+    into a float array of shape (line, cell). The commas of the whole block
+    are replaced in a single pass. Empty lines are skipped, whitespace
+    around a line and trailing separators are ignored, and empty cells as
+    well as the cells missing from short lines are NaN.
+    """
+    rows = [to_floats(line.strip().rstrip(sep).split(sep)) for line
+            in "\n".join(lines).replace(",", ".").splitlines()
+            if line.strip()]
+    width = max(map(len, rows), default=0)
+    if all(len(row) == width for row in rows):
+        return np.array(rows, dtype=float).reshape(len(rows), width)
+    block = np.full((len(rows), width), np.nan)
+    for idx, row in enumerate(rows):
+        block[idx, :len(row)] = row
+    return block
+
+
+def to_floats(fields):
+    """Converts decimal point strings to floats, empty fields to NaN."""
+    try:
+        return list(map(float, fields))
+    except ValueError:
+        return [float(field) if field.strip() else math.nan
+                for field in fields]
+
+
+def format_numbers(values, missing=None):
+    """Array version of num_to_str. Returns an object array of the shape of
+    values holding the decimal comma strings of all values, which are
+    converted in a single pass. Integers keep their integer notation. If
+    missing is given, it replaces the strings of NaN values.
+    """
+    values = np.asarray(values, dtype=object)
+    flat = values.ravel().tolist()
+    if not flat:
+        return np.empty(values.shape, dtype=object)
+    strings = np.array(
+        "\n".join(map(str, flat)).replace(".", ",").split("\n"),
+        dtype=object).reshape(values.shape)
+    if missing is not None:
+        strings[values != values] = missing  # Only NaN is unequal to itself.
+    return strings
+
+
+def split_name(name):
+    """Splits a well name of the form "construct, condition" into a tuple
+    (construct, condition). Names without a condition return an empty string
+    as condition.
+    """
+    construct, _, condition = name.partition(",")
+    return construct.strip(), condition.strip()
+
+
+def split_names(names):
+    """Array version of split_name for the column names of a merged file.
+    The replicate suffixes pandas added to duplicate column names are
+    removed first: the n-th repetition of a name is suffixed with ".n", so a
+    suffix is only removed if the name without it occurred n times before.
+    Decimal conditions such as "construct, 0.5" are kept.
+    """
+    counts = {}
+    split = []
+    for name in names:
+        name = name.strip()
+        stem, dot, suffix = name.rpartition(".")
+        stem = stem.strip()
+        if dot and suffix.isdigit() and counts.get(stem) == int(suffix):
+            name = stem
+        counts[name] = counts.get(name, 0) + 1
+        split.append(split_name(name))
+    return split
+
+
+def announce(message):
+    """Prints the initialization message of a module if the environment
+    variable BANNER_VARIABLE is set to a value other than 0.
+    """
+    if os.environ.get(BANNER_VARIABLE, "0") not in ("", "0"):
+        print("\t" + message)
+
+
 if __name__ != "__main__":
-    print("\tInitialized constants and helper functions.")
+    announce("Initialized constants and helper functions.")
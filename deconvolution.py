@@ -1,11 +1,37 @@
+"""Deconvolution of reporter kinetics into promoter activity per cell.
+
+The reporter signal F of a well is produced at a rate proportional to the
+number of cells (OD) and lost with the degradation rate gamma:
+
+    dF/dt = P * OD - gamma * F
+
+The promoter activity per cell therefore is P = (dF/dt + gamma * F) / OD.
+Differentiating noisy data amplifies the noise, so dF/dt is obtained by a
+regularized (Tikhonov) inversion of the integration operator: dF/dt is the
+derivative u minimizing
+
+    |A u - (F - F_0)|^2 + regularization * |D u|^2
+
+where A integrates over time with the trapezoidal rule and D is the first
+difference operator. The normal equations only depend on the times, so a
+single linear solve handles all wells of a plate at once.
+"""
+
 import os
+import glob
 import logging
 
-import tkinter as tk
-from tkinter import ttk
-from tkinter.filedialog import askdirectory, askopenfilename
+import numpy as np
 
 import constants
+import kinetics
+
+pd = constants.lazy_import("pandas")
+
+# GUI toolkit, only imported when the GUI is built.
+tk = constants.lazy_import("tkinter")
+ttk = constants.lazy_import("tkinter.ttk")
+filedialog = constants.lazy_import("tkinter.filedialog")
 
 
 # Initialize logger.
@@ -14,37 +40,50 @@ logger = constants.setup_logger(
     logger_name=__name__
 )
 
+REGULARIZATION = 1e-2
+DEGRADATION_RATE = 0.0
+PROMOTER_ACTIVITY_SUFFIX = constants.PROMOTER_ACTIVITY_SUFFIX
+
 
 class IntegrateDeconvolutionAlgorithm:
     def __init__(self, other, parent, *args, **kwargs):
         self.parent = parent
         self.frame = tk.Frame(parent)
-        other.nb.add(self.frame, text="MatLab Conversions")
+        other.nb.add(self.frame, text="Deconvolution")
 
         welcome_label = tk.Label(
             self.frame,
-            text="Incorporate the MatLab deconvultion "
-            + "algorithm to OCUTaF.\n Chose your raw data folder "
-            + "to generate MatLab compatible TECAN files.\n"
-            + "Use the file from the MatLab analysis together "
-            + "with optional naming files to generate standard output."
+            text="Calculate promoter activities per cell from blank "
+            + "corrected or merged data.\nChose the directory containing "
+            + "the OD and relative reporter files."
         )
 
-        self.reporter_name = tk.StringVar()
-        self.reporter_name.set("LUX")
-
-        self.get_file_button = tk.Button(
+        self.data_dir = tk.StringVar()
+        self.data_dir.set("")
+        self.get_dir_button = tk.Button(
             self.frame,
-            text="Set File",
-            command=self.get_file
+            text="Set Directory",
+            command=self.get_dir
         )
-        self.input_file_name = tk.StringVar()
-        self.input_file_path = tk.StringVar()
-        self.input_file_label = tk.Label(
+        self.data_dir_label = tk.Label(
             self.frame,
-            textvariable=self.input_file_name
+            textvariable=self.data_dir
         )
 
+        self.degradation_rate = tk.DoubleVar()
+        self.degradation_rate.set(DEGRADATION_RATE)
+        self.degradation_label = tk.Label(
+            self.frame, text="Degradation Rate [1/min]:")
+        self.degradation_entry = tk.Entry(
+            self.frame, textvariable=self.degradation_rate, width=10)
+
+        self.regularization = tk.DoubleVar()
+        self.regularization.set(REGULARIZATION)
+        self.regularization_label = tk.Label(
+            self.frame, text="Regularization:")
+        self.regularization_entry = tk.Entry(
+            self.frame, textvariable=self.regularization, width=10)
+
         # Subframe for symmetrical buttons
         self.subframe = tk.Frame(self.frame)
         self.run_button = tk.Button(
@@ -68,54 +107,182 @@ class IntegrateDeconvolutionAlgorithm:
         self.response_label = tk.Label(
             self.frame, textvariable=self.user_response)
 
+        constants.ToolTip(
+            self.degradation_entry,
+            "Rate at which the reporter signal decays.\nUse 0 for stable "
+            + "reporters."
+            )
+        constants.ToolTip(
+            self.regularization_entry,
+            "Larger values give smoother promoter activities."
+            )
+
         # Register widgets.
         welcome_label.grid(row=0, columnspan=2, padx=5, pady=5)
 
         ttk.Separator(self.frame).grid(columnspan=5, sticky="ew", pady=10)
 
-        self.input_file_label.grid(row=2, column=0, sticky="E", padx=5, pady=5)
-        self.get_file_button.grid(row=2, column=1, sticky="W", padx=5, pady=5)
+        self.data_dir_label.grid(row=2, column=0, sticky="E", padx=5, pady=5)
+        self.configure_btn(self.get_dir_button,
+                           btn_width=constants.BTN_WIDTH_BIG)
+        self.get_dir_button.grid(row=2, column=1, sticky="W", padx=5, pady=5)
+        self.degradation_label.grid(row=3, column=0, sticky="E", padx=5)
+        self.degradation_entry.grid(row=3, column=1, sticky="W", padx=5)
+        self.regularization_label.grid(row=4, column=0, sticky="E", padx=5)
+        self.regularization_entry.grid(row=4, column=1, sticky="W", padx=5)
 
-        self.response_label.grid(row=4, columnspan=2, padx=5, pady=15)
+        self.response_label.grid(row=5, columnspan=2, padx=5, pady=15)
 
         self.subframe.grid(row=11, columnspan=2)
-        self.run_button.grid(row=0, column=0, padx=5)
-        self.reset_button.grid(row=0, column=1, padx=5)
-        self.exit_button.grid(row=0, column=2, padx=5)
+        self.configure_btn(self.run_button)
+        self.run_button.grid(row=0, column=0, pady=5, padx=5)
+        self.configure_btn(self.reset_button)
+        self.reset_button.grid(row=0, column=1, pady=5, padx=5)
+        self.configure_btn(self.exit_button)
+        self.exit_button.grid(row=0, column=2, pady=5, padx=5)
 
-    def get_file(self):
-        file_name = askopenfilename()
-        self.input_file_name.set(os.path.basename(file_name))
-        self.input_file_path.set(file_name)
+    def configure_btn(self, btn_widget, btn_width=constants.BTN_WIDTH_NORMAL):
+        btn_widget.configure(
+            width=btn_width,
+            font=(constants.FONT_FAMILY, constants.FONT_SIZE, "bold"),
+            cursor="hand2",
+            background="#bbb",
+            activebackground="#4c4c4c"
+        )
+
+    def get_dir(self):
+        self.data_dir.set(filedialog.askdirectory())
 
     def reset(self):
-        self.input_file_name.set("")
-        self.input_file_path.set("")
+        self.data_dir.set("")
+        self.degradation_rate.set(DEGRADATION_RATE)
+        self.regularization.set(REGULARIZATION)
         self.user_response.set("")
 
     def run(self):
-        self.written_barcodes = read_raw_data(self.reporter_name.get())
-
-        if not os.path.exists(self.input_file_path.get()):
-            self.user_response.set("ERROR: INPUT FILE NOT DETECTED.")
+        if not os.path.isdir(self.data_dir.get()):
+            self.user_response.set("ERROR: DATA DIRECTORY NOT DETECTED.")
             return
-        out = self.reorder_csv_for_single_point_data(
-            self.input_file_path.get(),
-            self.num_replicates_value.get()
-        )
-        output_file_name = "".join([
-            os.path.splitext(self.input_file_name.get())[0],
-            "_reordered",
-            os.path.splitext(self.input_file_name.get())[1]
-        ])
-        output_file_path = os.path.dirname(self.input_file_path.get())
-        output_file = os.path.join(output_file_path, output_file_name)
-        with open(output_file, "w") as output_file:
-            output_file.write(out)
-
+        pairs = find_file_pairs(self.data_dir.get())
+        if not pairs:
+            self.user_response.set(
+                "ERROR: NO PAIRS OF OD AND RELATIVE REPORTER FILES FOUND.")
+            return
+        for od_file, relative_file in pairs:
+            deconvolve_files(
+                od_file,
+                relative_file,
+                degradation_rate=self.degradation_rate.get(),
+                regularization=self.regularization.get())
         self.user_response.set(
-            "Successfully written {}.".format(output_file_name))
+            "Successfully written {} file(s).".format(len(pairs)))
+
+
+# ==============================================================================
+# DECONVOLUTION ENGINE
+# ==============================================================================
+
+
+def integration_matrix(times):
+    """Returns the matrix A of shape (cycle, cycle) such that A @ u holds
+    the trapezoidal integrals of u from the first time point to each time
+    point.
+    """
+    steps = np.diff(times) / 2
+    num_cycles = len(times)
+    # Column j enters every integral up to a later time point with half of
+    # the interval before it and half of the interval after it.
+    return (np.tri(num_cycles) * np.concatenate(([0], steps))
+            + np.tri(num_cycles, k=-1) * np.concatenate((steps, [0])))
+
+
+def difference_matrix(num_cycles):
+    """Returns the first difference operator of shape (cycle - 1, cycle)."""
+    return np.eye(num_cycles - 1, num_cycles, k=1) \
+        - np.eye(num_cycles - 1, num_cycles)
+
+
+def regularized_derivative(times, values, regularization=REGULARIZATION):
+    """Tikhonov regularized time derivative of all columns of values
+    (cycle, well). regularization is relative to the scale of the
+    integration operator, so that it does not depend on the time unit or the
+    number of cycles.
+    """
+    times = np.asarray(times, dtype=float)
+    values = np.asarray(values, dtype=float)
+    integrate = integration_matrix(times)
+    difference = difference_matrix(len(times))
+    normal = integrate.T @ integrate
+    penalty = difference.T @ difference
+    weight = regularization * np.trace(normal) / max(np.trace(penalty), 1)
+    return np.linalg.solve(normal + weight * penalty,
+                           integrate.T @ (values - values[0]))
+
+
+def promoter_activity(times, od, reporter,
+                      degradation_rate=DEGRADATION_RATE,
+                      regularization=REGULARIZATION,
+                      min_od=kinetics.MIN_OD):
+    """Returns the promoter activity per cell (dF/dt + gamma * F) / OD for
+    all wells, where reporter holds the absolute reporter signal F and od
+    the OD, both of shape (cycle, well). Cycles with an OD below min_od are
+    NaN.
+    """
+    od = np.asarray(od, dtype=float)
+    reporter = np.asarray(reporter, dtype=float)
+    production = (regularized_derivative(times, reporter, regularization)
+                  + degradation_rate * reporter)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(od >= min_od, production / od, np.nan)
+
+
+def find_file_pairs(directory):
+    """Returns the sorted pairs (od_file, relative_file) of blank corrected
+    files (<name>_OD_corrected.csv and <name>_relative_<reporter>_corrected
+    .csv) and merged files (all_OD.csv and all_relative_<reporter>.csv) in
+    directory. Output files of other processing steps are skipped.
+    """
+    pairs = []
+    for relative_file in sorted(glob.glob(os.path.join(
+            directory, "*_relative_*_corrected.csv"))):
+        stem = relative_file[:relative_file.rindex("_relative_")]
+        pairs.append((stem + "_OD_corrected.csv", relative_file))
+    for relative_file in sorted(glob.glob(os.path.join(
+            directory, "all_relative_*.csv"))):
+        if not constants.is_output_file(relative_file):
+            pairs.append((os.path.join(directory, "all_OD.csv"),
+                          relative_file))
+    return [(od_file, relative_file) for od_file, relative_file in pairs
+            if os.path.isfile(od_file)]
+
+
+def deconvolve_files(od_file, relative_file, outfile=None,
+                     degradation_rate=DEGRADATION_RATE,
+                     regularization=REGULARIZATION):
+    """Calculates the promoter activities from an OD file and the matching
+    relative reporter file (reporter per OD) and writes them to outfile
+    (default: <relative_file>_promoter_activity.csv without "_corrected").
+    Returns the name of the written file.
+    """
+    if outfile is None:
+        stem, extension = os.path.splitext(relative_file)
+        outfile = (stem.replace("_corrected", "") + PROMOTER_ACTIVITY_SUFFIX
+                   + extension)
+    times, names, od = kinetics.read_data_matrix(od_file)
+    relative_times, relative_names, relative = kinetics.read_data_matrix(
+        relative_file)
+    if names != relative_names or not np.array_equal(times, relative_times):
+        raise ValueError(f"{od_file} and {relative_file} do not contain the "
+                         + "same wells and time points.")
+    activity = promoter_activity(times, od, relative * od, degradation_rate,
+                                 regularization)
+    frame = pd.DataFrame(activity, columns=names)
+    frame.insert(0, "time", times)
+    frame.to_csv(outfile, sep=constants.SEP, decimal=",", index=False)
+    logger.info(f"Written promoter activities of {len(names)} wells to "
+                + f"{outfile}.")
+    return outfile
 
 
 if __name__ != "__main__":
-    print("\tInitialized deconvolution module.")
+    constants.announce("Initialized deconvolution module.")
@@ -1,14 +1,18 @@
+import io
 import os
+import sys
 import logging
 import math
-from statistics import mean
 
-import tkinter as tk
-from tkinter import ttk
-from tkinter.filedialog import askdirectory, askopenfilename
+import numpy as np
 
 import constants
 
+# GUI toolkit, only imported when the GUI is built.
+tk = constants.lazy_import("tkinter")
+ttk = constants.lazy_import("tkinter.ttk")
+
+
 # Initialize logger.
 logger = constants.setup_logger(
     log_level=logging.DEBUG,
@@ -17,7 +21,10 @@ logger = constants.setup_logger(
 
 INDUCTION_TIME_IN_MIN = 220
 NUM_REPLICATES = 3
-DATA_DIR = os.getcwd()
+DYNAMIC_RANGE_TIME_POINTS = (840, 1120)
+METRICS_TABLE_FILE = "dose_response_metrics.csv"
+TIME_DELAY_FOLD = 2
+NO_CROSSING = -1
 
 
 class GUIDoseResponseGUI:
@@ -42,82 +49,154 @@ class DoseResponseCurve:
             induction_time=INDUCTION_TIME_IN_MIN,
             num_replicates=NUM_REPLICATES):
         """Initialize DoseResponseCurve from a data CSV."""
+        self.__metrics = {}
         self.num_replicates = num_replicates
         self.name = os.path.splitext(os.path.basename(input_csv_file))[0]
         self.ind_time = induction_time
         self.__sep = sep_in_csv
         self.__path = input_csv_file
-        self.data = self.__read_infile()
+        self.__read_infile()
 
     def __repr__(self):
         return (f"DoseResponseCurve of {self.name} with {self.num_replicates} "
-                + f"replicates and {len(self.data)} data points")
+                + f"replicates and {len(self.times)} data points")
+
+    @property
+    def times(self):
+        return self.__times
+
+    @property
+    def values(self):
+        return self.__values
+
+    @property
+    def ind_time(self):
+        return self.__ind_time
+
+    @ind_time.setter
+    def ind_time(self, induction_time):
+        self.__ind_time = induction_time
+        self.__metrics.clear()
+
+    def set_data(self, time_points, values):
+        """Replaces the data of the curve by values of shape (time,
+        condition, replicate) measured at time_points. Both are sorted by time
+        and made read-only, so that cached metrics are only invalidated here.
+        """
+        order = np.argsort(time_points, kind="stable")
+        self.__times = np.array(time_points, dtype=float)[order]
+        self.__values = np.array(values, dtype=float)[order]
+        self.__times.flags.writeable = False
+        self.__values.flags.writeable = False
+        self.__metrics.clear()
+
+    def apply_mask(self, mask):
+        """Sets the values for which mask is True to NaN, so that they are
+        left out of all metrics. mask is a boolean array of shape (time,
+        condition, replicate) in the order of self.times, e.g. derived from
+        outliers.outlier_mask.
+        """
+        self.set_data(self.times, np.where(mask, np.nan, self.values))
+
+    def __cached(self, key, compute):
+        """Returns the metric stored under key, computing it on first use."""
+        if key not in self.__metrics:
+            self.__metrics[key] = compute()
+        return self.__metrics[key]
 
     def __read_infile(self):
-        data_constructor = {}
+        """Reads the input CSV into the sorted time vector self.times and the
+        array self.values of shape (time, condition, replicate).
+        """
         with open(self.__path) as infile:
-            for i, line in enumerate(infile):
-                if i == 0:  # Read Headline.
-                    self.conditions = [any_string for any_string
-                                       in line.strip().split(self.__sep)[1:]
-                                       if any_string]
-                    continue
-                cells = line.split(self.__sep)
-                current_time_point = constants.parse_number(cells[0])
-                data_by_replicates = self.__get_values_from_cells(cells)
-
-                data_constructor = self.__add_timepoint(data_constructor,
-                                                        current_time_point,
-                                                        data_by_replicates)
-        return data_constructor
-
-    def __get_values_from_cells(self, list_of_cells):
-        """Takes a FULL list of cells read from the input CSV that is NOT the
-        headline as input.
-        Returns a list of lists where the inner lists correspond to biological
-        replicates.
+            headline = infile.readline()
+            self.conditions = [any_string for any_string
+                               in headline.strip().split(self.__sep)[1:]
+                               if any_string]
+            lines = [line for line in infile
+                     if line.split(self.__sep, 1)[0].strip()]
+        self.condition_index = {condition: idx for idx, condition
+                                in enumerate(self.conditions)}
+        block = constants.parse_number_block(lines, self.__sep)
+        self.set_data(block[:, 0] if len(block) else [],
+                      self.__get_values_from_block(block).reshape(
+                          len(block), len(self.conditions),
+                          self.num_replicates))
+
+    def __get_values_from_block(self, block):
+        """Takes the parsed data lines of the input CSV (without the
+        headline) as input.
+        Returns an array with num_replicates values for every condition per
+        line.
+        """
+        num_values = len(self.conditions) * self.num_replicates
+        if not len(block):
+            return np.empty((0, num_values))
+        values = block[:, 1:num_values + 1]
+        if values.shape[1] != num_values or np.isnan(values).any():
+            raise ValueError(
+                f"Expected {num_values} values for {len(self.conditions)} "
+                + f"conditions in {self.num_replicates} replicates per line "
+                + f"in {self.__path}, but found missing values.")
+        return values
+
+    def __condition_idx(self, *condition_labels):
+        """Returns the index of the first of condition_labels contained in the
+        curve's conditions.
         """
-        list_of_lists = []
-        inner_list = []
-        for i, cell in enumerate(list_of_cells[1:]):
-            data_point = constants.parse_number(cell)
-            inner_list.append(data_point)
-            if (i + 1) % self.num_replicates == 0:  # self.num_replicates:
-                list_of_lists.append(list(inner_list))
-                inner_list = []
-        self.__validate_inner_list(list_of_lists)
-        return list_of_lists
-
-    def __validate_inner_list(self, master_list):
-        assert master_list
-        for inner_list in master_list:
-            assert len(inner_list) == self.num_replicates
-
-    def __add_timepoint(self, data_dict, time_point, data_by_replicates):
-        mod_dict = data_dict.copy()
-        sub_dict = {condition: data for condition, data
-                    in zip(self.conditions, data_by_replicates)}
-        mod_dict[time_point] = sub_dict
-        return mod_dict
-
-    def dynamic_range_at(self, time_point):
-        time_point_key = self.__select_closest_key_from_time_point(time_point)
-        try:
-            high = mean(self.data[time_point_key]["500 uM"])
-            low = mean(self.data[time_point_key]["0 uM"])
-        except KeyError:
-            high = mean(self.data[time_point_key]["500"])
-            low = mean(self.data[time_point_key]["0"])
-        return self.__safe_divide(high, low)
-
-    def __select_closest_key_from_time_point(self, time_point):
-        min_diff = float("inf")
-        for valid_time_point in self.data.keys():
-            difference = abs(time_point - valid_time_point)
-            if difference < min_diff:
-                min_diff = difference
-                closest = valid_time_point
-        return closest
+        for condition in condition_labels:
+            if condition in self.condition_index:
+                return self.condition_index[condition]
+        raise KeyError(condition_labels[0])
+
+    def dynamic_range_at(self, time_point, interpolate=False):
+        """Returns the ratio of the mean responses at 500 uM and 0 uM at the
+        measured time point closest to time_point. With interpolate=True, the
+        responses are linearly interpolated at time_point instead.
+        """
+        return self.__cached(
+            ("dynamic_range_at", time_point, interpolate),
+            lambda: float(self.dynamic_range_profile(time_point, interpolate)))
+
+    def dynamic_range_profile(self, time_points, interpolate=False):
+        """Vectorized dynamic_range_at for a whole array of time points.
+        Returns an array of the shape of time_points.
+        """
+        time_points = np.asarray(time_points, dtype=float)
+        high = self.mean_response("500 uM", "500")
+        low = self.mean_response("0 uM", "0")
+        if interpolate:
+            high = np.interp(time_points, self.times, high)
+            low = np.interp(time_points, self.times, low)
+        else:
+            time_idx = self.closest_time_idx(time_points)
+            high = high[time_idx]
+            low = low[time_idx]
+        return safe_divide(high, low)
+
+    def mean_response(self, *condition_labels):
+        """Returns the replicate mean over time of the first of
+        condition_labels contained in the curve's conditions.
+        """
+        return self.__cached(
+            ("mean_response", condition_labels),
+            lambda: nan_mean(self.values[
+                :, self.__condition_idx(*condition_labels)], axis=1))
+
+    def closest_time_idx(self, time_points):
+        """Returns the index of the measured time point closest to each of
+        time_points by bisection of the sorted time vector. Ties resolve to the
+        earlier time point.
+        """
+        time_points = np.asarray(time_points, dtype=float)
+        if len(self.times) == 1:
+            return np.zeros(time_points.shape, dtype=np.int64)
+        right = np.clip(np.searchsorted(self.times, time_points),
+                        1, len(self.times) - 1)
+        left = right - 1
+        closer_to_left = ((time_points - self.times[left])
+                          <= (self.times[right] - time_points))
+        return np.where(closer_to_left, left, right)
 
     def time_delay(self):
         """Calculates the time delay as defined by Pinto et al. (2018):
@@ -125,74 +204,236 @@ class DoseResponseCurve:
         the time at which the luciferase activity first exceeded its average
         pre-induction value by 2-fold, and the time point ofinducer addition.'
         """
-        response_treshold = 2 * self.mean_before_induction()
-        time_of_threshold_reached = None
-        for time, measurement_point in self.data.items():
-            try:
-                response = mean(measurement_point["500 uM"])
-            except KeyError:
-                response = mean(measurement_point["500"])
-            if response >= response_treshold and time > self.ind_time:
-                time_of_threshold_reached = time
-                break
-        if time_of_threshold_reached is None:  # Happens with inactive switches
-            time_delay = -1
-        else:
-            time_delay = time_of_threshold_reached - self.ind_time
-        return time_delay
+        return self.__cached("time_delay", self.__compute_time_delay)
+
+    def __compute_time_delay(self):
+        # NO_CROSSING happens with inactive switches.
+        return float(threshold_crossing_times(
+            self.times,
+            self.mean_response("500 uM", "500"),
+            2 * self.mean_before_induction(),
+            self.ind_time))
+
+    def time_delays(self, fold=TIME_DELAY_FOLD, conditions=None,
+                    interpolate=False):
+        """Returns the time delay of each of conditions (all conditions if
+        None) as an array, using fold times the pre-induction mean as the
+        threshold. With interpolate=True, the crossing is interpolated
+        linearly between the two samples enclosing it.
+        """
+        if conditions is None:
+            conditions = self.conditions
+        condition_idx = [self.condition_index[condition]
+                         for condition in conditions]
+        return threshold_crossing_times(
+            self.times,
+            nan_mean(self.values[:, condition_idx], axis=2).T,
+            fold * self.mean_before_induction(),
+            self.ind_time,
+            interpolate)
 
     def mean_before_induction(self):
-        time_point_key = self.__select_closest_key_from_time_point(
-            self.ind_time)
-        # print(f"Instead of {self.ind_time}, showing dynamic range at {time_point_key}")
-        at_ind_time = self.data[time_point_key]
-        all_values_before_induction = []
-        for data in at_ind_time.values():
-            all_values_before_induction += data
-        return mean(all_values_before_induction)
+        return self.__cached(
+            "mean_before_induction", lambda: self.mean_at(self.ind_time))
+
+    def mean_at(self, time_point):
+        """Returns the mean of all conditions and replicates at the measured
+        time point closest to time_point.
+        """
+        return float(nan_mean(
+            self.values[self.closest_time_idx(time_point)]))
+
+
+def nan_mean(array, axis=None):
+    """Mean ignoring NaN values. Returns NaN without a warning where all
+    values are NaN.
+    """
+    valid = ~np.isnan(array)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (np.where(valid, array, 0.0).sum(axis=axis)
+                / valid.sum(axis=axis))
+
+
+def safe_divide(divident, divisor):
+    """Element-wise division that returns NaN where divisor is 0."""
+    divident, divisor = np.broadcast_arrays(
+        np.asarray(divident, dtype=float), np.asarray(divisor, dtype=float))
+    quotient = np.full(divident.shape, math.nan)
+    np.divide(divident, divisor, out=quotient, where=divisor != 0)
+    return quotient
+
+
+def threshold_crossing_times(times, responses, thresholds,
+                             induction_time=INDUCTION_TIME_IN_MIN,
+                             interpolate=False):
+    """Returns the time after induction_time at which responses first reach
+    thresholds.
+
+    responses has time as its last axis, e.g. (curve, condition, time), and
+    times either has the shape (time,) or that of responses. thresholds and
+    induction_time broadcast against responses without the time axis. Only
+    samples after induction_time count. Where the threshold is never
+    reached, NO_CROSSING is returned. With interpolate=True, the crossing
+    time is interpolated linearly between the last sample below and the
+    first sample above the threshold, but never before induction_time.
+    NaN responses never cross.
+    """
+    responses = np.asarray(responses, dtype=float)
+    times = np.broadcast_to(np.asarray(times, dtype=float), responses.shape)
+    batch_shape = responses.shape[:-1]
+    thresholds = np.broadcast_to(thresholds, batch_shape)[..., np.newaxis]
+    induction_time = np.broadcast_to(induction_time, batch_shape)
+    with np.errstate(invalid="ignore"):
+        reached = ((responses >= thresholds)
+                   & (times > induction_time[..., np.newaxis]))
+    crossed = reached.any(axis=-1)
+    first = np.argmax(reached, axis=-1)[..., np.newaxis]
+    crossing = np.take_along_axis(times, first, axis=-1)[..., 0]
+    if interpolate:
+        previous = np.maximum(first - 1, 0)
+        previous_time = np.take_along_axis(times, previous, axis=-1)[..., 0]
+        previous_response = np.take_along_axis(
+            responses, previous, axis=-1)[..., 0]
+        fraction = safe_divide(
+            thresholds[..., 0] - previous_response,
+            np.take_along_axis(responses, first, axis=-1)[..., 0]
+            - previous_response)
+        fraction = np.clip(np.where(np.isnan(fraction), 1, fraction), 0, 1)
+        crossing = np.maximum(
+            previous_time + fraction * (crossing - previous_time),
+            induction_time)
+    return np.where(crossed, crossing - induction_time, NO_CROSSING)
 
-    def __safe_divide(self, divident, divisor):
-        try:
-            return divident / divisor
-        except ZeroDivisionError:
-            return math.nan
 
+def time_delays(list_of_dose_responses, conditions=None,
+                fold=TIME_DELAY_FOLD, induction_time=None, interpolate=False):
+    """Time delays of many DoseResponseCurve objects in a single array
+    operation. Returns an array of shape (curve, condition) and the list of
+    conditions. conditions defaults to all conditions in order of their first
+    appearance; a curve lacking a condition never crosses. induction_time
+    defaults to the induction time of each curve.
 
-def data_in_directory():
-    for file in get_all_csv_names():
-        yield DoseResponseCurve(file)
+    The time delay is defined as in DoseResponseCurve.time_delay, with fold
+    replacing the factor of 2.
+    """
+    if conditions is None:
+        conditions = list(dict.fromkeys(
+            condition for drc in list_of_dose_responses
+            for condition in drc.conditions))
+    num_times = max((len(drc.times) for drc in list_of_dose_responses),
+                    default=0)
+    times = np.full((len(list_of_dose_responses), num_times), np.nan)
+    responses = np.full(
+        (len(list_of_dose_responses), len(conditions), num_times), np.nan)
+    induction_times = np.empty(len(list_of_dose_responses))
+    baselines = np.empty(len(list_of_dose_responses))
+    for curve_idx, drc in enumerate(list_of_dose_responses):
+        induction_times[curve_idx] = (drc.ind_time if induction_time is None
+                                      else induction_time)
+        baselines[curve_idx] = drc.mean_at(induction_times[curve_idx])
+        times[curve_idx, :len(drc.times)] = drc.times
+        for condition_idx, condition in enumerate(conditions):
+            if condition in drc.condition_index:
+                responses[curve_idx, condition_idx, :len(drc.times)] = \
+                    drc.mean_response(condition)
+    delays = threshold_crossing_times(
+        times[:, np.newaxis, :],
+        responses,
+        fold * baselines[:, np.newaxis],
+        induction_times[:, np.newaxis],
+        interpolate)
+    return delays, conditions
+
+
+def dynamic_range_profiles(list_of_dose_responses, time_points,
+                           interpolate=False):
+    """Returns an array of shape (curve, time point) holding the dynamic
+    range of every DoseResponseCurve at every one of time_points.
+    """
+    return np.array([drc.dynamic_range_profile(time_points, interpolate)
+                     for drc in list_of_dose_responses]).reshape(
+                         len(list_of_dose_responses), np.size(time_points))
 
 
-def get_all_csv_names():
-    return [os.path.join(DATA_DIR, file) for file in os.listdir(DATA_DIR)
-            if ".csv" in file and not "all_relative_lux" in file]
+def data_in_directory(directory=None, **curve_options):
+    """Yields a DoseResponseCurve for every curve CSV in directory, which
+    defaults to the current working directory at the time of the call.
+    """
+    for file in get_all_csv_names(directory):
+        yield DoseResponseCurve(file, **curve_options)
+
 
+def get_all_csv_names(directory=None):
+    if directory is None:
+        directory = os.getcwd()
+    return sorted(os.path.join(directory, file)
+                  for file in os.listdir(directory) if is_curve_file(file))
 
-def construct_csv(list_of_dose_responses, sep=";"):
+
+def is_curve_file(file):
+    """Returns False for files in a data directory that are no single curve
+    CSVs, i.e. merged data files and metric tables written by this module.
+    """
+    file = os.path.basename(file)
+    return (".csv" in file and "all_relative_" not in file
+            and file != METRICS_TABLE_FILE)
+
+
+def curve_metrics(drc, time_points=DYNAMIC_RANGE_TIME_POINTS):
+    """Returns the row of the metrics table for a single DoseResponseCurve:
+    name, mean before induction, time delay and the dynamic range at each of
+    time_points.
+    """
+    return ([drc.name, drc.mean_before_induction(), drc.time_delay()]
+            + [drc.dynamic_range_at(time_point) for time_point in time_points])
+
+
+def metrics_header(time_points=DYNAMIC_RANGE_TIME_POINTS):
+    return (["Name", "Mean Before Induction", "Time Delay [min]"]
+            + [f"Dynamic Range at t={constants.num_to_str(time_point)}"
+               for time_point in time_points])
+
+
+def round_finite(number, ndigits=None):
+    """round for metrics, which may be NaN or infinite if undefined."""
+    return round(number, ndigits) if math.isfinite(number) else number
+
+
+def format_metrics(row):
+    """Formats a row returned by curve_metrics for the metrics table.
+    Undefined metrics are written as nan.
+    """
+    name, mean_before_induction, time_delay, *dynamic_ranges = row
+    return [name] + constants.format_numbers(
+        [round_finite(mean_before_induction), round_finite(time_delay)]
+        + [round_finite(dynamic_range, 2) for dynamic_range in dynamic_ranges]
+        ).tolist()
+
+
+def construct_csv(list_of_dose_responses, sep=";",
+                  time_points=DYNAMIC_RANGE_TIME_POINTS):
     """Takes a list of DoseResponseCurve objects and returns data about them in 
     a human (sep="\t") or Excel (sep=";") readable format.
     """
-    csv_constructor = sep.join((
-        "Name",
-        "Mean Before Induction",
-        "Time Delay [min]",
-        "Dynamic Range at t=840",
-        "Dynamic Range at t=1120"))
-    csv_constructor += "\n"
+    out = io.StringIO()
+    write_csv(list_of_dose_responses, out, sep, time_points)
+    return out.getvalue()
+
+
+def write_csv(list_of_dose_responses, out, sep=";",
+              time_points=DYNAMIC_RANGE_TIME_POINTS):
+    """Writes the table of construct_csv row by row to the stream out.
+    The dynamic range is reported at each of time_points.
+    """
+    out.write(sep.join(metrics_header(time_points)) + "\n")
     for drc in list_of_dose_responses:
-        csv_constructor += sep.join((
-            drc.name,
-            constants.num_to_str(round(drc.mean_before_induction())),
-            constants.num_to_str(round(drc.time_delay())),
-            constants.num_to_str(round(drc.dynamic_range_at(840), 2)),
-            constants.num_to_str(round(drc.dynamic_range_at(1120), 2))))
-        csv_constructor += "\n"
-    return csv_constructor
+        out.write(sep.join(format_metrics(curve_metrics(drc, time_points)))
+                  + "\n")
 
 
 if __name__ == "__main__":
-    print(construct_csv([drc for drc in data_in_directory()], sep="\t"))
+    write_csv(data_in_directory(), sys.stdout, sep="\t")
 
 
 if __name__ != "__main__":
-    print("\tInitialized dose-response curve functionality.")
+    constants.announce("Initialized dose-response curve functionality.")
@@ -0,0 +1,235 @@
+"""Long-format store of all measurements of an experiment.
+
+The store is built during the naming and merging step from the blank
+corrected data files and the corresponding name files. Every measured value
+becomes one row of a table with the columns
+
+    plate, well, construct, condition, replicate, cycle, time, channel, value
+
+Text columns are stored as pandas categoricals. Row positions are indexed by
+construct, condition and (construct, condition) when the store is created, so
+that a lookup is a single dictionary access instead of a scan over the column
+headers of the wide all_*.csv files. The rows found are filtered by channel
+using the categorical codes of the channel column.
+"""
+
+import os
+import logging
+
+import numpy as np
+
+import constants
+import blank_and_name_handling
+
+pd = constants.lazy_import("pandas")
+
+
+# Initialize logger.
+logger = constants.setup_logger(
+    log_level=logging.DEBUG,
+    logger_name=__name__
+)
+
+COLUMNS = ["plate", "well", "construct", "condition", "replicate", "cycle",
+           "time", "channel", "value"]
+CATEGORICAL_COLUMNS = ["plate", "well", "construct", "condition", "channel"]
+OD_CHANNEL = "OD"
+
+
+class ExperimentStore:
+    """Long-format table of an experiment with prebuilt lookup indexes."""
+
+    def __init__(self, table):
+        self.table = table.reset_index(drop=True)
+        for column in CATEGORICAL_COLUMNS:
+            if not isinstance(self.table[column].dtype, pd.CategoricalDtype):
+                self.table[column] = self.table[column].astype("category")
+        self.__build_indexes()
+
+    def __repr__(self):
+        return (f"ExperimentStore with {len(self.table)} values of "
+                + f"{len(self.constructs)} constructs in "
+                + f"{len(self.conditions)} conditions")
+
+    def __len__(self):
+        return len(self.table)
+
+    @property
+    def constructs(self):
+        return list(self.table["construct"].cat.categories)
+
+    @property
+    def conditions(self):
+        return list(self.table["condition"].cat.categories)
+
+    @property
+    def channels(self):
+        return list(self.table["channel"].cat.categories)
+
+    def __build_indexes(self):
+        construct_codes = self.table["construct"].cat.codes.to_numpy()
+        condition_codes = self.table["condition"].cat.codes.to_numpy()
+        num_conditions = len(self.conditions)
+        self.channel_codes = self.table["channel"].cat.codes.to_numpy()
+        self.by_construct = group_positions(
+            construct_codes, self.constructs)
+        self.by_condition = group_positions(
+            condition_codes, self.conditions)
+        pair_labels = [(construct, condition)
+                       for construct in self.constructs
+                       for condition in self.conditions]
+        self.by_construct_and_condition = group_positions(
+            construct_codes.astype(np.int64) * num_conditions
+            + condition_codes,
+            pair_labels)
+
+    def positions(self, construct=None, condition=None, channel=None):
+        """Returns the row positions matching the given construct, condition
+        and channel. Arguments set to None are not used for filtering.
+        """
+        if construct is not None and condition is not None:
+            rows = self.by_construct_and_condition.get(
+                (construct, condition), np.empty(0, dtype=np.int64))
+        elif construct is not None:
+            rows = self.by_construct.get(
+                construct, np.empty(0, dtype=np.int64))
+        elif condition is not None:
+            rows = self.by_condition.get(
+                condition, np.empty(0, dtype=np.int64))
+        else:
+            rows = np.arange(len(self.table))
+        if channel is not None:
+            channels = self.table["channel"].cat.categories
+            if channel not in channels:
+                return np.empty(0, dtype=np.int64)
+            rows = rows[self.channel_codes[rows] == channels.get_loc(channel)]
+        return rows
+
+    def select(self, construct=None, condition=None, channel=None):
+        """Returns a DataFrame with all rows matching the given construct,
+        condition and channel.
+        """
+        return self.table.iloc[self.positions(construct, condition, channel)]
+
+    def replicates(self, construct, condition, channel=OD_CHANNEL):
+        """Returns a DataFrame with time points as rows and replicates as
+        columns for a single construct in a single condition.
+        """
+        selection = self.select(construct, condition, channel)
+        return selection.pivot_table(
+            index="time", columns="replicate", values="value",
+            observed=True)
+
+    def save(self, path):
+        self.table.to_pickle(path)
+        logger.info(f"Saved experiment store with {len(self)} values to "
+                    + f"{path}.")
+
+    @classmethod
+    def load(cls, path):
+        return cls(pd.read_pickle(path))
+
+
+def group_positions(codes, labels):
+    """Takes an array of integer group codes and the labels belonging to the
+    codes as input. Returns a dictionary mapping each label that occurs in
+    codes to the sorted array of row positions carrying that label.
+    """
+    order = np.argsort(codes, kind="stable")
+    counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+    starts = np.concatenate(([0], np.cumsum(counts)))
+    starts += np.count_nonzero(codes < 0)  # Missing values sort first.
+    return {label: order[starts[code]:starts[code + 1]]
+            for code, label in enumerate(labels) if counts[code]}
+
+
+def read_corrected_file(corrected_file):
+    """Reads a blank corrected CSV as written by write_blank_corrected.
+    Returns a DataFrame with numeric cycle, time, temp and well columns.
+    """
+    frame = pd.read_csv(corrected_file, sep=constants.SEP, decimal=",")
+    return frame[[column for column in frame.columns
+                  if not column.startswith("Unnamed")]]
+
+
+def plate_to_frame(barcode, corrected_file, channel, label_dict,
+                   replicate_counter):
+    """Converts a single blank corrected data file of one plate into a long
+    format DataFrame using the well names defined in label_dict.
+    replicate_counter maps (construct, condition, channel) to the number of
+    replicates seen so far and is updated in place.
+    """
+    wide = read_corrected_file(corrected_file)
+    wells = [well for well in constants.data_names
+             if well in wide.columns and not
+             blank_and_name_handling.is_discarded_name(
+                 label_dict.get(well, ""))]
+    constructs, conditions, replicates = [], [], []
+    for well in wells:
+        construct, condition = constants.split_name(label_dict[well])
+        key = (construct, condition, channel)
+        replicate_counter[key] = replicate_counter.get(key, 0) + 1
+        constructs.append(construct)
+        conditions.append(condition)
+        replicates.append(replicate_counter[key])
+    num_cycles = len(wide)
+    return pd.DataFrame({
+        "plate": barcode,
+        "well": np.tile(wells, num_cycles),
+        "construct": np.tile(constructs, num_cycles),
+        "condition": np.tile(conditions, num_cycles),
+        "replicate": np.tile(replicates, num_cycles),
+        "cycle": np.repeat(wide["cycle"].to_numpy().astype(int), len(wells)),
+        "time": np.repeat(wide["time"].to_numpy(), len(wells)),
+        "channel": channel,
+        "value": wide[wells].to_numpy().ravel(),
+    })
+
+
+def build_store(plates):
+    """Takes a list of tuples (barcode, name_csv, {channel: corrected_file})
+    as input and returns an ExperimentStore containing all plates.
+
+    Replicates are numbered starting at 1 in order of plates and wells for
+    each combination of construct, condition and channel.
+    """
+    frames = []
+    replicate_counter = {}
+    for barcode, name_csv, files_by_channel in plates:
+        label_dict = blank_and_name_handling.generate_label_dict(name_csv)
+        for channel, corrected_file in files_by_channel.items():
+            frames.append(plate_to_frame(
+                barcode, corrected_file, channel, label_dict,
+                replicate_counter))
+    table = pd.concat(frames, ignore_index=True)
+    logger.info(f"Built experiment store from {len(plates)} plate(s) with "
+                + f"{len(table)} values.")
+    return ExperimentStore(table[COLUMNS])
+
+
+def build_store_from_directory(barcode_to_namefile, reporter_name,
+                               directory="."):
+    """Builds an ExperimentStore from the blank corrected files of each
+    barcode found in directory. barcode_to_namefile maps the barcodes to their
+    name files as in the naming and merging step.
+    """
+    corrected_files = [file for file in os.listdir(directory)
+                       if "corrected" in file and "bap" not in file]
+    plates = []
+    for barcode, name_csv in barcode_to_namefile.items():
+        files_by_channel = {}
+        for file in corrected_files:
+            if barcode not in file:
+                continue
+            if "_OD_corrected" in file:
+                files_by_channel[OD_CHANNEL] = os.path.join(directory, file)
+            elif f"_relative_{reporter_name}_corrected" in file:
+                files_by_channel[f"relative_{reporter_name}"] = \
+                    os.path.join(directory, file)
+        if files_by_channel:
+            plates.append((barcode, name_csv, files_by_channel))
+    return build_store(plates)
+
+
+if __name__ != "__main__":
+    constants.announce("Initialized experiment store.")
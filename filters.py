@@ -0,0 +1,124 @@
+"""Smoothing and derivative filters for kinetic data.
+
+The filters work on matrices with cycles as rows and wells (or named columns)
+as columns together with the measured times, which do not need to be evenly
+spaced. For every cycle a polynomial is fitted by least squares to the
+window of cycles around it (Savitzky-Golay filter). Since the filter
+coefficients only depend on the times, they are computed once for all
+cycles as a stack of small pseudo inverses and applied to all wells in a
+single tensor contraction. A polynomial order of 0 gives a moving average.
+At the start and the end of a run the window is shifted inwards.
+"""
+
+import os
+import logging
+
+import numpy as np
+
+import constants
+import kinetics
+
+pd = constants.lazy_import("pandas")
+
+
+# Initialize logger.
+logger = constants.setup_logger(
+    log_level=logging.DEBUG,
+    logger_name=__name__
+)
+
+WINDOW = 7
+POLYORDER = 2
+SMOOTHED_SUFFIX = constants.SMOOTHED_SUFFIX
+DERIVATIVE_SUFFIX = constants.DERIVATIVE_SUFFIX
+
+
+def window_starts(num_cycles, window):
+    """Returns the first cycle of the window belonging to every cycle."""
+    return np.clip(np.arange(num_cycles) - window // 2, 0,
+                   num_cycles - window)
+
+
+def savgol_coefficients(times, window=WINDOW, polyorder=POLYORDER, deriv=0):
+    """Returns the filter coefficients of shape (cycle, window) that
+    evaluate the deriv-th derivative of the local polynomial fit at every
+    cycle, and the window start of every cycle.
+    """
+    times = np.asarray(times, dtype=float)
+    window = min(window, len(times))
+    if not 0 <= polyorder < window:
+        raise ValueError(f"The polynomial order {polyorder} must be smaller "
+                         + f"than the window of {window} cycles.")
+    if deriv > polyorder:
+        raise ValueError(f"A polynomial of order {polyorder} has no "
+                         + f"derivative of order {deriv}.")
+    starts = window_starts(len(times), window)
+    offsets = times[starts[:, np.newaxis] + np.arange(window)] \
+        - times[:, np.newaxis]
+    # Scale the times of each window for a well conditioned fit.
+    scale = np.abs(offsets).max(axis=1, keepdims=True)
+    scale[scale == 0] = 1
+    design = (offsets / scale)[..., np.newaxis] ** np.arange(polyorder + 1)
+    # Row deriv of the pseudo inverse maps the window to the polynomial
+    # coefficient of order deriv at the centre cycle.
+    coefficients = np.linalg.pinv(design)[:, deriv, :]
+    factorial = np.prod(np.arange(1, deriv + 1))
+    return coefficients * factorial / scale ** deriv, starts
+
+
+def apply_filter(values, coefficients, starts):
+    """Applies coefficients as returned by savgol_coefficients to all
+    columns of values (cycle, well) at once.
+    """
+    values = np.asarray(values, dtype=float)
+    window = coefficients.shape[1]
+    windows = values[starts[:, np.newaxis] + np.arange(window)]
+    return np.einsum("ck,ckw->cw", coefficients, windows)
+
+
+def smooth(times, values, window=WINDOW, polyorder=POLYORDER):
+    """Savitzky-Golay smoothing of all columns of values (cycle, well)."""
+    return apply_filter(
+        values, *savgol_coefficients(times, window, polyorder, deriv=0))
+
+
+def derivative(times, values, window=WINDOW, polyorder=POLYORDER):
+    """First derivative with respect to time of all columns of values
+    (cycle, well) from the local polynomial fits.
+    """
+    return apply_filter(
+        values, *savgol_coefficients(times, window, max(polyorder, 1),
+                                     deriv=1))
+
+
+def output_file_name(in_file, suffix):
+    """Returns the name of a filtered output file. "_corrected" is removed
+    from the name, so that filtered files are not taken for blank corrected
+    data by later runs.
+    """
+    stem, extension = os.path.splitext(in_file)
+    return stem.replace("_corrected", "") + suffix + extension
+
+
+def filter_file(in_file, window=WINDOW, polyorder=POLYORDER):
+    """Writes the smoothed values and the first derivative of a blank
+    corrected or merged file next to it. Returns the names of the written
+    files.
+    """
+    times, names, values = kinetics.read_data_matrix(in_file)
+    written_files = []
+    for suffix, filtered in (
+            (SMOOTHED_SUFFIX, smooth(times, values, window, polyorder)),
+            (DERIVATIVE_SUFFIX, derivative(times, values, window,
+                                           polyorder))):
+        outfile = output_file_name(in_file, suffix)
+        frame = pd.DataFrame(filtered, columns=names)
+        frame.insert(0, "time", times)
+        frame.to_csv(outfile, sep=constants.SEP, decimal=",", index=False)
+        written_files.append(outfile)
+    logger.info(f"Written smoothed data and derivatives of {in_file}.")
+    return written_files
+
+
+if __name__ != "__main__":
+    constants.announce("Initialized smoothing and derivative filters.")
@@ -4,6 +4,7 @@ import logging
 import datetime
 
 import constants
+import instrumentation
 
 
 # Initialize logger.
@@ -33,6 +34,7 @@ def time_from_asc(line):
     return datetime.datetime(year, month, day, hour, min, sec)
 
 
+@instrumentation.measured("read .asc files")
 def read_raw_data(reporter_name, appendix="_results.txt"):
 
     written_barcodes = [] # List for user feedback
@@ -3,9 +3,10 @@ import os
 import logging
 import datetime
 
-from openpyxl import load_workbook
-
 import constants
+import instrumentation
+
+openpyxl = constants.lazy_import("openpyxl")
 
 
 # Initialize logger.
@@ -35,6 +36,7 @@ def time_from_excel(cell_value):
     return datetime.datetime(year, month, day, hour, min, second)
 
 
+@instrumentation.measured("read .xlsx files")
 def read_raw_data(appendix="_results.txt", reporter_name="this-is-a-dummy-variable"):
     """Reads raw data from excel file.
     Assumes only ONE raw data file containing several data sheets. Those sheets
@@ -50,7 +52,7 @@ def read_raw_data(appendix="_results.txt", reporter_name="this-is-a-dummy-variab
     for file in all_files:
         to_write = ""
         barcode = file.split(sep=".")[0]
-        data_wb = load_workbook(file)
+        data_wb = openpyxl.load_workbook(file)
         first_timepoint = "not_defined"
         valid_sheets = [sheet for sheet in data_wb.sheetnames if "Sheet" in sheet]
         valid_sheets.sort()
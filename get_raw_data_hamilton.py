@@ -2,10 +2,11 @@
 import os
 import logging
 
-import xlrd
-from openpyxl import Workbook as openpyxlWorkbook
-
 import constants
+import instrumentation
+
+xlrd = constants.lazy_import("xlrd")
+openpyxl = constants.lazy_import("openpyxl")
 
 # Initialize logger.
 logger = constants.setup_logger(
@@ -18,6 +19,7 @@ logger = constants.setup_logger(
 # READ DATA FROM HAMILTON ROBOT AS EXCEL FILE
 #==============================================================================
 
+@instrumentation.measured("read .xls files")
 def read_raw_data(reporter_name, appendix="_results.txt"):
     BARCODE = "THIS-IS-A-GENERIC-PLACEHOLDER-FOR-ANY-BARCODE-IN-DATA-FILES" 
     written_barcodes = [] # User feedback on GUI; function return value.
@@ -97,7 +99,7 @@ def xls_to_xlsx_conversion(file):
     https://gist.github.com/malexandre/730223fc089f70c65a7d
     """
     xlsBook = xlrd.open_workbook(filename=file)
-    workbook = openpyxlWorkbook()
+    workbook = openpyxl.Workbook()
 
     for i in range(0, xlsBook.nsheets):
         xlsSheet = xlsBook.sheet_by_index(i)
@@ -0,0 +1,296 @@
+"""Batched fitting of four-parameter logistic (Hill) curves.
+
+Each curve is described by
+
+    y = bottom + (top - bottom) / (1 + (ec50 / x) ** hill)
+
+with the inducer concentration x. Many curves are fitted at once by a
+Levenberg-Marquardt iteration in which residuals, Jacobians and the damped
+normal equations of all curves are evaluated as single array operations.
+EC50 is fitted on a log10 scale. Every curve has its own damping factor and
+convergence flag, so curves that converge early stop changing while the
+remaining curves keep iterating.
+"""
+
+import re
+import math
+import logging
+
+import numpy as np
+
+import constants
+
+
+# Initialize logger.
+logger = constants.setup_logger(
+    log_level=logging.DEBUG,
+    logger_name=__name__
+)
+
+MAX_ITERATIONS = 200
+TOLERANCE = 1e-10
+INITIAL_DAMPING = 1e-3
+CONCENTRATION_UNITS = {"nM": 1e-3, "uM": 1.0, "µM": 1.0, "mM": 1e3, "M": 1e6}
+CONCENTRATION_PATTERN = re.compile(
+    r"^\s*([-+]?\d+(?:[.,]\d*)?(?:[eE][-+]?\d+)?)\s*(nM|uM|µM|mM|M)?\s*$")
+
+
+class HillFit:
+    """Parameters of a batch of fitted Hill curves. All attributes are arrays
+    with one entry per curve.
+    """
+    def __init__(self, bottom, top, ec50, hill, converged, iterations, sse):
+        self.bottom = bottom
+        self.top = top
+        self.ec50 = ec50
+        self.hill = hill
+        self.converged = converged
+        self.iterations = iterations
+        self.sse = sse
+
+    def __repr__(self):
+        return (f"HillFit of {len(self)} curves, "
+                + f"{int(self.converged.sum())} converged")
+
+    def __len__(self):
+        return len(self.bottom)
+
+
+def parse_concentration(condition):
+    """Returns the concentration in uM given by a condition label such as
+    "500 uM", "0,5 mM" or "500". Labels without a number return NaN.
+    """
+    match = CONCENTRATION_PATTERN.match(condition)
+    if match is None:
+        return math.nan
+    number, unit = match.groups()
+    return constants.parse_number(number) * CONCENTRATION_UNITS.get(unit, 1.0)
+
+
+def hill(concentrations, bottom, top, ec50, hill_coefficient):
+    """Evaluates the four-parameter logistic function. The parameters
+    broadcast against concentrations.
+    """
+    response, _ = _evaluate(
+        np.asarray(concentrations, dtype=float),
+        *(np.asarray(parameter, dtype=float) for parameter
+          in (bottom, top, np.log10(ec50), hill_coefficient)),
+        with_jacobian=False)
+    return response
+
+
+def initial_guess(concentrations, responses):
+    """Data driven start values of shape (curve, 4) for bottom, top,
+    log10(ec50) and the Hill coefficient.
+
+    bottom and top are the mean responses at the lowest and highest
+    concentration of each curve. log10(ec50) is where the responses cross
+    the midpoint between them, interpolated on a log scale, and the Hill
+    coefficient starts at 1.
+    """
+    concentrations, responses = np.broadcast_arrays(concentrations, responses)
+    valid = ~np.isnan(responses) & ~np.isnan(concentrations)
+    lowest = np.where(valid, concentrations, np.inf).min(
+        axis=1, keepdims=True)
+    highest = np.where(valid, concentrations, -np.inf).max(
+        axis=1, keepdims=True)
+    bottom = _masked_mean(responses, valid & (concentrations == lowest))
+    top = _masked_mean(responses, valid & (concentrations == highest))
+
+    positive = valid & (concentrations > 0)
+    log_concentrations = np.log10(np.where(positive, concentrations, 1.0))
+    # Fraction of the response between bottom and top at every point.
+    span = np.where(top == bottom, 1.0, top - bottom)
+    fraction = (responses - bottom[:, np.newaxis]) / span[:, np.newaxis]
+    # The closest point to the midpoint from below and from above.
+    below = positive & (fraction <= 0.5)
+    above = positive & (fraction > 0.5)
+    log_below = np.where(below, log_concentrations, -np.inf).max(axis=1)
+    log_above = np.where(above, log_concentrations, np.inf).min(axis=1)
+    fallback = _masked_mean(log_concentrations, positive)
+    crossed = np.isfinite(log_below) & np.isfinite(log_above)
+    log_ec50 = np.where(
+        crossed,
+        (np.where(crossed, log_below, 0) + np.where(crossed, log_above, 0))
+        / 2,
+        fallback)
+    log_ec50 = np.where(np.isnan(log_ec50), 0.0, log_ec50)
+    return np.stack(
+        [bottom, top, log_ec50, np.ones_like(bottom)], axis=1)
+
+
+def fit(concentrations, responses, max_iterations=MAX_ITERATIONS,
+        tolerance=TOLERANCE, initial_parameters=None):
+    """Fits a Hill curve to each row of responses.
+
+    concentrations is either an array of shape (point,) shared by all curves
+    or of shape (curve, point). responses has the shape (curve, point).
+    Missing responses are NaN and are ignored. Returns a HillFit.
+    """
+    responses = np.atleast_2d(np.asarray(responses, dtype=float))
+    concentrations = np.broadcast_to(
+        np.asarray(concentrations, dtype=float), responses.shape)
+    valid = ~np.isnan(responses) & ~np.isnan(concentrations)
+    responses = np.where(valid, responses, 0.0)
+    concentrations = np.where(valid, concentrations, 1.0)
+    parameters = (initial_guess(np.where(valid, concentrations, np.nan),
+                                np.where(valid, responses, np.nan))
+                  if initial_parameters is None
+                  else np.array(initial_parameters, dtype=float))
+    num_curves = len(responses)
+    damping = np.full(num_curves, INITIAL_DAMPING)
+    converged = np.zeros(num_curves, dtype=bool)
+    failed = np.zeros(num_curves, dtype=bool)
+    iterations = np.zeros(num_curves, dtype=np.int64)
+    residuals, jacobian = _residuals_and_jacobian(
+        concentrations, responses, valid, parameters)
+    sse = np.einsum("nk,nk->n", residuals, residuals)
+    diagonal_idx = np.arange(parameters.shape[1])
+
+    for _ in range(max_iterations):
+        active = np.flatnonzero(~converged & ~failed)
+        if not len(active):
+            break
+        iterations[active] += 1
+        hessian = np.einsum("nki,nkj->nij", jacobian[active],
+                            jacobian[active])
+        gradient = np.einsum("nki,nk->ni", jacobian[active],
+                             residuals[active])
+        hessian[:, diagonal_idx, diagonal_idx] += (
+            damping[active, np.newaxis]
+            * np.maximum(hessian[:, diagonal_idx, diagonal_idx], 1e-12))
+        step = _solve(hessian, gradient)
+        candidate = parameters[active] + step
+        new_residuals, new_jacobian = _residuals_and_jacobian(
+            concentrations[active], responses[active], valid[active],
+            candidate)
+        new_sse = np.einsum("nk,nk->n", new_residuals, new_residuals)
+
+        improved = np.isfinite(candidate).all(axis=1) & (new_sse <= sse[active])
+        accepted = active[improved]
+        small_change = (sse[active] - new_sse
+                        <= tolerance * (sse[active] + tolerance))
+        small_step = (np.abs(step) <= tolerance
+                      * (np.abs(parameters[active]) + tolerance)).all(axis=1)
+        parameters[accepted] = candidate[improved]
+        residuals[accepted] = new_residuals[improved]
+        jacobian[accepted] = new_jacobian[improved]
+        sse[accepted] = new_sse[improved]
+        damping[accepted] /= 10
+        damping[active[~improved]] *= 10
+        converged[active[improved & (small_change | small_step)]] = True
+        failed[active] |= ((damping[active] > 1e16)
+                           | ~np.isfinite(parameters[active]).all(axis=1))
+
+    logger.info(f"Fitted {num_curves} Hill curves, {int(converged.sum())} "
+                + "converged.")
+    return HillFit(
+        bottom=parameters[:, 0],
+        top=parameters[:, 1],
+        ec50=10 ** parameters[:, 2],
+        hill=parameters[:, 3],
+        converged=converged,
+        iterations=iterations,
+        sse=sse)
+
+
+def fit_curves(list_of_dose_responses, time_points=None, **fit_options):
+    """Fits a Hill curve to the replicates of every DoseResponseCurve at each
+    of time_points (all measured time points if None). Conditions whose label
+    is no concentration are left out.
+    Returns a list of rows [name, time, bottom, top, ec50, hill, converged].
+    """
+    labels = []
+    concentrations = []
+    responses = []
+    for drc in list_of_dose_responses:
+        condition_concentrations = np.array(
+            [parse_concentration(condition) for condition in drc.conditions])
+        usable = ~np.isnan(condition_concentrations)
+        if time_points is None:
+            time_idx = np.arange(len(drc.times))
+        else:
+            time_idx = drc.closest_time_idx(np.atleast_1d(time_points))
+        values = drc.values[time_idx][:, usable]  # (time, condition, rep)
+        points = np.repeat(condition_concentrations[usable],
+                           drc.num_replicates)
+        for time_point, row in zip(drc.times[time_idx],
+                                   values.reshape(len(time_idx), -1)):
+            labels.append((drc.name, float(time_point)))
+            concentrations.append(points)
+            responses.append(row)
+    if not labels:
+        return []
+    num_points = max(len(points) for points in concentrations)
+    result = fit(_pad(concentrations, num_points),
+                 _pad(responses, num_points),
+                 **fit_options)
+    return [[name, time_point, float(bottom), float(top), float(ec50),
+             float(hill_coefficient), bool(converged)]
+            for (name, time_point), bottom, top, ec50, hill_coefficient,
+            converged in zip(labels, result.bottom, result.top, result.ec50,
+                             result.hill, result.converged)]
+
+
+def _evaluate(concentrations, bottom, top, log_ec50, hill_coefficient,
+              with_jacobian=True):
+    """Returns the responses and, if requested, the Jacobian with respect to
+    bottom, top, log10(ec50) and the Hill coefficient stacked along a new
+    last axis. The parameters broadcast against concentrations. Zero
+    concentrations evaluate to bottom for positive Hill coefficients.
+    """
+    positive = concentrations > 0
+    log_ratio = np.where(
+        positive,
+        log_ec50 * math.log(10)
+        - np.log(np.where(positive, concentrations, 1.0)),
+        0.0)
+    exponent = np.where(positive, hill_coefficient * log_ratio,
+                        np.copysign(np.inf, hill_coefficient))
+    # fraction = 1 / (1 + (ec50 / x) ** hill)
+    fraction = 1 / (1 + np.exp(np.clip(exponent, -700, 700)))
+    response = bottom + (top - bottom) * fraction
+    if not with_jacobian:
+        return response, None
+    slope = -(top - bottom) * fraction * (1 - fraction)
+    jacobian = np.stack(np.broadcast_arrays(
+        1 - fraction,
+        fraction,
+        slope * hill_coefficient * math.log(10),
+        slope * log_ratio), axis=-1)
+    return response, jacobian
+
+
+def _residuals_and_jacobian(concentrations, responses, valid, parameters):
+    response, jacobian = _evaluate(
+        concentrations, *(parameters[:, idx, np.newaxis] for idx in range(4)))
+    residuals = np.where(valid, responses - response, 0.0)
+    jacobian = np.where(valid[..., np.newaxis], jacobian, 0.0)
+    return residuals, jacobian
+
+
+def _solve(matrices, vectors):
+    """Solves a stack of linear systems, falling back to the pseudo inverse
+    if any of them is singular.
+    """
+    try:
+        return np.linalg.solve(matrices, vectors[..., np.newaxis])[..., 0]
+    except np.linalg.LinAlgError:
+        return np.einsum("nij,nj->ni", np.linalg.pinv(matrices), vectors)
+
+
+def _masked_mean(values, mask):
+    counts = mask.sum(axis=1)
+    sums = np.where(mask, values, 0.0).sum(axis=1)
+    return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def _pad(rows, length):
+    padded = np.full((len(rows), length), np.nan)
+    for idx, row in enumerate(rows):
+        padded[idx, :len(row)] = row
+    return padded
+
+
+if __name__ != "__main__":
+    constants.announce("Initialized Hill curve fitting.")
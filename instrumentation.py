@@ -0,0 +1,363 @@
+"""Timing and memory instrumentation of the pipeline stages.
+
+Stages are measured by spans, which are used as context managers or, with
+measured, as decorators. Spans only record while a run report is active in
+the thread:
+
+    with instrumentation.run_report("raw data run", "run_report.json"):
+        with instrumentation.span("ingest"):
+            ...
+
+    @instrumentation.measured("read .asc files")
+    def read_raw_data(reporter_name):
+        ...
+
+A span records its wall time, the CPU time of the process, the data files
+read and written, the size in bytes of the files opened for reading (once
+per opening, as the reads themselves are not seen) and of the files
+written and, if enabled, the peak memory allocated by Python
+(tracemalloc). Memory tracing slows down a run
+considerably and is therefore only enabled by the trace_memory argument of
+run_report or the environment variable OCUTAF_TRACE_MEMORY. Spans of the
+same name within the same parent span are accumulated, so that a function
+called once per plate shows up as a single stage with its number of calls.
+
+Files are detected by an audit hook (sys.addaudithook) on the "open" and
+"os.rename" events of the interpreter, so that readers and writers need no
+changes. Directories, Python sources and the files of the Python
+installation and of the log directory are ignored.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import datetime
+import platform
+import functools
+import threading
+import contextlib
+import tracemalloc
+
+import constants
+
+
+# Initialize logger.
+logger = constants.setup_logger(
+    log_level=logging.DEBUG,
+    logger_name=__name__
+)
+
+REPORT_FILE = "run_report.json"
+MEMORY_VARIABLE = "OCUTAF_TRACE_MEMORY"
+IGNORED_SUFFIXES = (".py", ".pyc", ".pyd", ".so", ".dll")
+IGNORED_DIRS = tuple({sys.prefix, sys.base_prefix, sys.exec_prefix,
+                      constants.LOG_DIR})
+WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_APPEND | os.O_CREAT
+
+_local = threading.local()
+_audit_hook_installed = False
+
+
+def active_spans():
+    """Returns the stack of active spans of the current thread."""
+    if not hasattr(_local, "spans"):
+        _local.spans = []
+    return _local.spans
+
+
+def memory_tracing_requested():
+    return os.environ.get(MEMORY_VARIABLE, "").strip() not in ("", "0")
+
+
+def is_data_file(path):
+    return not (path.endswith(IGNORED_SUFFIXES)
+                or path.startswith(IGNORED_DIRS)
+                or os.path.isdir(path))
+
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def format_bytes(num_bytes):
+    if num_bytes < 1000:
+        return f"{num_bytes} B"
+    for unit in ("kB", "MB"):
+        num_bytes /= 1000
+        if num_bytes < 1000:
+            return f"{num_bytes:.1f} {unit}"
+    return f"{num_bytes / 1000:.1f} GB"
+
+
+def audit(event, args):
+    """Audit hook passing the data files opened or renamed by the
+    interpreter to the active spans of the current thread. Must never raise.
+    """
+    if event not in ("open", "os.rename"):
+        return
+    spans = getattr(_local, "spans", None)
+    if not spans:
+        return
+    try:
+        if event == "open":
+            path, mode, flags = args
+            if isinstance(path, int):  # Open file descriptor.
+                return
+            path = os.path.abspath(os.fsdecode(path))
+            if not is_data_file(path):
+                return
+            if mode is None:  # os.open
+                writing = bool(flags & WRITE_FLAGS)
+            else:
+                writing = any(char in mode for char in "wax+")
+            for active in spans:
+                active.opened(path, writing)
+        else:
+            source, destination = (os.path.abspath(os.fsdecode(path))
+                                   for path in args[:2])
+            for active in spans:
+                active.renamed(source, destination)
+    except Exception:
+        pass
+
+
+def install_audit_hook():
+    """Installs the audit hook once. Audit hooks cannot be removed."""
+    global _audit_hook_installed
+    if not _audit_hook_installed:
+        sys.addaudithook(audit)
+        _audit_hook_installed = True
+
+
+class Span:
+    """Measurement of a single pass through a stage. Spans without a run
+    report measure their time, but are not recorded.
+    """
+    def __init__(self, name, parent=None, report=None):
+        self.name = name
+        self.report = parent.report if parent is not None else report
+        self.path = (parent.path if parent is not None else ()) + (name,)
+        self.bytes_opened = 0
+        self.files_read = set()
+        self.files_written = set()
+        self.bytes_written = 0
+        self.wall_s = self.cpu_s = 0.0
+        self.peak_memory = None
+        self.__traces_memory = False
+        if self.report is not None:
+            self.report.enter(self.path)
+            self.__traces_memory = self.report.trace_memory
+        if self.__traces_memory:
+            self.__start_memory_trace()
+        self.__start_wall = time.perf_counter()
+        self.__start_cpu = time.process_time()
+        self.__profiled = (self.report is not None
+                           and self.report.profiler is not None
+                           and self.report.profiler.enter(name))
+
+    def __start_memory_trace(self):
+        self.__stops_tracing = not tracemalloc.is_tracing()
+        if self.__stops_tracing:
+            tracemalloc.start()
+        else:
+            # Resetting the peak hides it from the enclosing spans, which
+            # therefore keep the peak seen so far.
+            peak = tracemalloc.get_traced_memory()[1]
+            for active in active_spans():
+                active.peak_seen = max(active.peak_seen, peak)
+            tracemalloc.reset_peak()
+        self.start_memory = tracemalloc.get_traced_memory()[0]
+        self.peak_seen = 0
+
+    def opened(self, path, writing):
+        if writing:
+            self.files_written.add(path)
+        else:
+            self.files_read.add(path)
+            self.bytes_opened += file_size(path)
+
+    def renamed(self, source, destination):
+        if source in self.files_written:
+            self.files_written.discard(source)
+            self.files_written.add(destination)
+
+    @property
+    def files(self):
+        return self.files_read | self.files_written
+
+    def finish(self):
+        if self.__profiled:
+            self.report.profiler.exit()
+        self.wall_s = time.perf_counter() - self.__start_wall
+        self.cpu_s = time.process_time() - self.__start_cpu
+        self.bytes_written = sum(map(file_size, self.files_written))
+        if self.__traces_memory:
+            peak = max(tracemalloc.get_traced_memory()[1], self.peak_seen)
+            self.peak_memory = max(peak - self.start_memory, 0)
+            if self.__stops_tracing:
+                tracemalloc.stop()
+        if self.report is not None:
+            self.report.add(self)
+
+    def summary(self):
+        """Returns a short summary for status labels."""
+        text = f"{self.wall_s:.2f} s, {len(self.files)} file(s)"
+        if self.peak_memory is not None:
+            text += f", {format_bytes(self.peak_memory)} peak"
+        return text
+
+
+class Stage:
+    """Accumulated measurements of all spans with the same path."""
+    def __init__(self, path):
+        self.path = path
+        self.calls = 0
+        self.wall_s = self.cpu_s = 0.0
+        self.bytes_opened = self.bytes_written = 0
+        self.files = set()
+        self.peak_memory = None
+
+    def add(self, span):
+        self.calls += 1
+        self.wall_s += span.wall_s
+        self.cpu_s += span.cpu_s
+        self.bytes_opened += span.bytes_opened
+        self.bytes_written += span.bytes_written
+        self.files |= span.files
+        if span.peak_memory is not None:
+            self.peak_memory = max(self.peak_memory or 0, span.peak_memory)
+
+    def as_dict(self):
+        return {
+            "stage": self.path[-1],
+            "path": " / ".join(self.path),
+            "depth": len(self.path) - 1,
+            "calls": self.calls,
+            "wall_s": round(self.wall_s, 4),
+            "cpu_s": round(self.cpu_s, 4),
+            "bytes_opened": self.bytes_opened,
+            "bytes_written": self.bytes_written,
+            "files": sorted(self.files),
+            "peak_memory_bytes": self.peak_memory,
+        }
+
+
+class RunReport:
+    """Stages measured during a run, in the order they were first
+    entered.
+    """
+    def __init__(self, name, trace_memory=None, profiler=None):
+        self.name = name
+        self.started = datetime.datetime.now()
+        self.trace_memory = (memory_tracing_requested()
+                             if trace_memory is None else trace_memory)
+        self.profiler = profiler
+        self.stages = {}
+        self.root = None
+
+    def enter(self, path):
+        if path not in self.stages:
+            self.stages[path] = Stage(path)
+
+    def add(self, span):
+        self.stages[span.path].add(span)
+
+    def top_level_stages(self):
+        return [stage for stage in self.stages.values()
+                if len(stage.path) == 2]
+
+    def as_dict(self):
+        return {
+            "run": self.name,
+            "started": self.started.isoformat(timespec="seconds"),
+            "trace_memory": self.trace_memory,
+            "python": platform.python_version(),
+            "stages": [stage.as_dict() for stage in self.stages.values()],
+        }
+
+    def summary(self):
+        """Returns a single line with the time of every top level stage and
+        the totals of the run.
+        """
+        stages = ", ".join(f"{stage.path[-1]} {stage.wall_s:.2f} s"
+                           for stage in self.top_level_stages())
+        total = self.stages.get((self.name,))
+        if total is None:
+            return stages
+        totals = (f"total {total.wall_s:.2f} s, {len(total.files)} file(s), "
+                  + f"{format_bytes(total.bytes_opened)} opened, "
+                  + f"{format_bytes(total.bytes_written)} written")
+        if total.peak_memory is not None:
+            totals += f", {format_bytes(total.peak_memory)} peak memory"
+        return f"{stages} ({totals})" if stages else totals
+
+    def write(self, report_file):
+        with open(report_file, "w") as out:
+            json.dump(self.as_dict(), out, indent=2)
+
+
+@contextlib.contextmanager
+def span(name):
+    """Measures the with block as stage name of the active run report."""
+    spans = active_spans()
+    active = Span(name, spans[-1]) if spans else Span(name)
+    if active.report is not None:
+        spans.append(active)
+    try:
+        yield active
+    finally:
+        if active.report is not None:
+            spans.pop()
+        active.finish()
+
+
+def measured(name=None):
+    """Decorator measuring every call of a function as stage name, which
+    defaults to the name of the function.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name or function.__name__):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextlib.contextmanager
+def run_report(name, report_file=None, trace_memory=None, profiler=None):
+    """Measures the with block as run name and yields its RunReport. At the
+    end, the summary is logged and, if report_file is given, the report is
+    written to it as JSON. A profiler (see profiling.StageProfiler) is
+    enabled during the stages it selects. Runs cannot be nested.
+    """
+    spans = active_spans()
+    if spans:
+        raise RuntimeError(f"Cannot start run {name} during run "
+                           + f"{spans[0].report.name}.")
+    install_audit_hook()
+    report = RunReport(name, trace_memory, profiler)
+    report.root = Span(name, report=report)
+    spans.append(report.root)
+    try:
+        yield report
+    finally:
+        spans.pop()
+        report.root.finish()
+        logger.info(f"Run {name}: {report.summary()}")
+        if report_file is not None:
+            try:
+                report.write(report_file)
+                logger.info(f"Wrote run report to {report_file}.")
+            except OSError as error:
+                logger.warning("Could not write run report to "
+                               + f"{report_file}: {error}")
+
+
+if __name__ != "__main__":
+    constants.announce("Initialized instrumentation.")
@@ -0,0 +1,176 @@
+"""Growth kinetics of every well from blank corrected OD data.
+
+All quantities are computed at once for a matrix of OD values with cycles as
+rows and wells as columns:
+
+    max growth rate  maximum slope of ln(OD) over a sliding window of cycles
+    lag time         time at which the tangent at the maximum growth rate
+                     reaches the initial ln(OD)
+    doubling time    ln(2) / max growth rate
+    max OD           largest OD measured
+    AUC              area under the OD curve (trapezoidal rule)
+
+Times are used in the unit of the input files (minutes).
+"""
+
+import math
+import logging
+
+import numpy as np
+
+import constants
+import reorder
+import experiment_store
+
+
+# Initialize logger.
+logger = constants.setup_logger(
+    log_level=logging.DEBUG,
+    logger_name=__name__
+)
+
+GROWTH_WINDOW = 5
+MIN_OD = 1e-3
+GROWTH_SUFFIX = constants.GROWTH_SUFFIX
+GROWTH_TABLE_COLUMNS = [
+    "Well", "Max Growth Rate [1/min]", "Time of Max Growth Rate [min]",
+    "Lag Time [min]", "Doubling Time [min]", "Max OD", "AUC"]
+
+
+def growth_kinetics(times, od, window=GROWTH_WINDOW, min_od=MIN_OD):
+    """Takes times of shape (cycle,) and OD values of shape (cycle, well) as
+    input. Returns a dictionary of arrays with one entry per well:
+    max_growth_rate, time_of_max_growth_rate, lag_time, doubling_time,
+    max_od and auc.
+
+    The growth rate is the least squares slope of ln(OD) over window
+    consecutive cycles. Windows containing an OD below min_od are not used,
+    so wells without growth yield NaN for all rate based quantities. Wells
+    without any OD value also yield NaN as max_od.
+    """
+    times = np.asarray(times, dtype=float)
+    od = np.asarray(od, dtype=float).reshape(len(times), -1)
+    window = max(2, min(window, len(times)))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        log_od = np.log(np.where(od >= min_od, od, np.nan))
+    slopes, window_times, window_log_od = sliding_slopes(
+        times, log_od, window)
+
+    usable = ~np.isnan(slopes).all(axis=0)
+    best = np.argmax(np.where(np.isnan(slopes), -np.inf, slopes), axis=0)
+    wells = np.arange(od.shape[1])
+    max_growth_rate = np.where(usable, slopes[best, wells], np.nan)
+    time_of_max = np.where(usable, window_times[best], np.nan)
+    # Tangent through the centre of the best window, intersected with the
+    # first usable ln(OD).
+    initial_log_od = first_valid(log_od)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        lag_time = (time_of_max - (window_log_od[best, wells] - initial_log_od)
+                    / max_growth_rate)
+        lag_time = np.where(max_growth_rate > 0,
+                            np.maximum(lag_time, times[0]), np.nan)
+        doubling_time = np.where(max_growth_rate > 0,
+                                 math.log(2) / max_growth_rate, np.nan)
+    return {
+        "max_growth_rate": max_growth_rate,
+        "time_of_max_growth_rate": time_of_max,
+        "lag_time": lag_time,
+        "doubling_time": doubling_time,
+        "max_od": np.where(~np.isnan(od).all(axis=0), np.max(
+            np.where(np.isnan(od), -np.inf, od), axis=0), np.nan),
+        "auc": area_under_curve(times, od),
+    }
+
+
+def sliding_slopes(times, values, window):
+    """Least squares slopes of values (cycle, well) against times over all
+    windows of window consecutive cycles, computed from cumulative sums.
+    Returns the slopes of shape (window position, well) together with the
+    mean time (window position,) and mean value (window position, well) of
+    each window. Windows containing NaN have NaN slopes.
+    """
+    def window_sums(array):
+        cumulative = np.concatenate(
+            (np.zeros((1,) + array.shape[1:]), np.cumsum(array, axis=0)))
+        return cumulative[window:] - cumulative[:-window]
+
+    missing = np.isnan(values)
+    filled = np.where(missing, 0.0, values)
+    # Centre the times for numerical stability of the sums.
+    centred = times - times.mean()
+    sum_t = window_sums(centred)
+    sum_tt = window_sums(centred ** 2)
+    sum_y = window_sums(filled)
+    sum_ty = window_sums(centred[:, np.newaxis] * filled)
+    num_missing = window_sums(missing.astype(float))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slopes = ((window * sum_ty - sum_t[:, np.newaxis] * sum_y)
+                  / (window * sum_tt - sum_t ** 2)[:, np.newaxis])
+    slopes[num_missing > 0] = np.nan
+    return (slopes, sum_t / window + times.mean(),
+            np.where(num_missing > 0, np.nan, sum_y / window))
+
+
+def first_valid(values):
+    """Returns the first value of each column of values that is not NaN."""
+    valid = ~np.isnan(values)
+    first = np.argmax(valid, axis=0)
+    return np.where(valid.any(axis=0),
+                    values[first, np.arange(values.shape[1])], np.nan)
+
+
+def area_under_curve(times, values):
+    """Trapezoidal area under each column of values. Intervals with a
+    missing value do not contribute.
+    """
+    heights = (values[1:] + values[:-1]) / 2
+    return np.nansum(heights * np.diff(times)[:, np.newaxis], axis=0)
+
+
+def od_matrix_from_wrapper(od_wrapper):
+    """Takes an OD wrapper dictionary as returned by
+    blank_and_name_handling.get_wrappers as input. Returns the times, the
+    wells and the OD matrix of shape (cycle, well).
+    """
+    wells = [well for well in constants.data_names if od_wrapper.get(well)]
+    return (np.array(od_wrapper["time"], dtype=float), wells,
+            np.array([od_wrapper[well] for well in wells], dtype=float).T)
+
+
+def read_data_matrix(in_file):
+    """Reads the times, the column names and the value matrix of shape
+    (cycle, well) from a blank corrected (e.g. *_OD_corrected.csv) or merged
+    (e.g. all_OD.csv) file.
+    """
+    with open(in_file) as infile:
+        headline = infile.readline()
+    if headline.startswith(constants.SEP):  # Merged file of sort_df.
+        names, _, times, values = reorder.read_merged_file(in_file)
+        return times, names, values
+    frame = experiment_store.read_corrected_file(in_file)
+    wells = [well for well in constants.data_names if well in frame.columns]
+    return frame["time"].to_numpy(dtype=float), wells, \
+        frame[wells].to_numpy(dtype=float)
+
+
+def write_growth_table(wells, kinetics, outfile):
+    """Writes the per well results of growth_kinetics to an Excel readable
+    CSV outfile.
+    """
+    keys = ["max_growth_rate", "time_of_max_growth_rate", "lag_time",
+            "doubling_time", "max_od", "auc"]
+    columns = constants.format_numbers([kinetics[key] for key in keys])
+    with open(outfile, "w") as out:
+        out.write(constants.SEP.join(GROWTH_TABLE_COLUMNS) + "\n")
+        for well, row in zip(wells, columns.T):
+            out.write(constants.SEP.join([well, *row]) + "\n")
+    logger.info(f"Written growth kinetics of {len(wells)} wells to {outfile}.")
+
+
+def write_growth_table_from_file(in_file, outfile, window=GROWTH_WINDOW):
+    times, wells, od = read_data_matrix(in_file)
+    write_growth_table(wells, growth_kinetics(times, od, window), outfile)
+
+
+if __name__ != "__main__":
+    constants.announce("Initialized growth kinetics.")
@@ -0,0 +1,185 @@
+"""Detection of outlier replicate wells in merged, named data files.
+
+Replicate columns are grouped by construct and condition as in the
+aggregation module and arranged in an array of shape
+(time, group, replicate), padded with NaN. Two robust criteria are available:
+
+    "pointwise"  robust z-score of every value against the median and the
+                 median absolute deviation (MAD) of its group at the same
+                 time point
+    "curve"      robust z-score of the mean distance of a whole trajectory to
+                 the replicate median trajectory, compared within its group
+
+Deviations from the median are scaled by an estimate of the SD of the
+group, which is the MAD of every time point corrected for the number of
+replicates (MEDIAN_MAD_OF_NORMAL) and pooled over all time points by its
+median. The scale is floored at MIN_RELATIVE_SCALE times the level of the
+group, so that replicates without spread do not score infinity. Values of
+groups with fewer than MIN_GROUP_SIZE replicates are never flagged.
+
+The result is a boolean mask of the shape of the data values (time, column)
+that is True for outliers. The aggregation, reorder and dose-response
+functions accept such a mask and treat masked values as missing (NaN).
+
+The raw data run flags the outliers of the merged files with the pointwise
+method and lists them in <merged file>_outliers.csv. Unless disabled in the
+Options menu, they are left out of the replicate summaries and, if the list
+is found next to the input file, of the reorder tab (see
+reorder.read_outlier_mask). batch.py reorders without outliers if
+--exclude-outliers is given.
+"""
+
+import logging
+
+import numpy as np
+
+import constants
+import reorder
+import aggregation
+
+
+# Initialize logger.
+logger = constants.setup_logger(
+    log_level=logging.DEBUG,
+    logger_name=__name__
+)
+
+Z_THRESHOLD = 3.5
+MAD_TO_SD = 0.6745  # Scales the MAD to the SD of a normal distribution.
+MIN_GROUP_SIZE = 3  # Fewer replicates cannot tell an outlier apart.
+MIN_RELATIVE_SCALE = 0.01  # Floor of the scale relative to the level.
+# Median of the MAD of n values drawn from a standard normal distribution
+#  (simulated). The MAD of few replicates underestimates the SD.
+MEDIAN_MAD_OF_NORMAL = {2: 0.477, 3: 0.361, 4: 0.453, 5: 0.504, 6: 0.534,
+                        7: 0.558, 8: 0.573, 9: 0.586, 10: 0.595}
+METHODS = ("pointwise", "curve")
+OUTLIER_SUFFIX = constants.OUTLIER_SUFFIX
+
+
+def replicate_array(codes, num_groups, values):
+    """Arranges values of shape (time, column) into an array of shape
+    (time, group, replicate) padded with NaN. codes holds the group index of
+    every column. Returns the array and the replicate index of every column.
+    """
+    order = np.argsort(codes, kind="stable")
+    counts = np.bincount(codes, minlength=num_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    replicate_idx = np.empty(len(codes), dtype=np.int64)
+    replicate_idx[order] = np.arange(len(codes)) - starts[codes[order]]
+    grouped = np.full(
+        (len(values), num_groups, max(counts.max(initial=0), 1)), np.nan)
+    grouped[:, codes, replicate_idx] = values
+    return grouped, replicate_idx
+
+
+def median_mad_of_normal(counts):
+    """Returns the median MAD of counts standard normal values for an
+    integer array counts. Counts below 2 yield NaN.
+    """
+    sizes = np.arange(max(np.max(counts, initial=0), 10) + 1)
+    table = np.where(sizes > 1, MAD_TO_SD * (1 - 1.2 / np.maximum(sizes, 1)),
+                     np.nan)
+    for size, median_mad in MEDIAN_MAD_OF_NORMAL.items():
+        table[size] = median_mad
+    return table[counts]
+
+
+def pooled_over_time(array):
+    """Median of array of shape (time, group, 1) over all time points
+    ignoring NaN. Returns an array of shape (1, group, 1).
+    """
+    return np.moveaxis(nanmedian(np.moveaxis(array, 0, -1)), -1, 0)
+
+
+def robust_z_scores(grouped, level=None, min_group_size=MIN_GROUP_SIZE):
+    """Robust z-scores of all values of grouped of shape (time, group,
+    replicate) against the median of their group and time point. The scale
+    is the SD estimated from the MAD pooled over all time points, floored
+    at MIN_RELATIVE_SCALE times level (default: the absolute median).
+    Time points with fewer than min_group_size values and groups without
+    any scale (no spread at a level of 0) score NaN, which is never flagged.
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        median = nanmedian(grouped)
+        deviation = np.abs(grouped - median)
+        counts = (~np.isnan(grouped)).sum(axis=-1, keepdims=True)
+        scale = pooled_over_time(
+            nanmedian(deviation) / median_mad_of_normal(counts))
+        if level is None:
+            level = np.abs(median)
+        scale = np.fmax(scale, MIN_RELATIVE_SCALE * level)
+        z_scores = np.where(scale > 0, deviation / scale, np.nan)
+    return np.where(counts >= min_group_size, z_scores, np.nan)
+
+
+def nanmedian(array):
+    """Median along the last axis ignoring NaN, keeping the dimensions.
+    Slices containing only NaN yield NaN without a warning.
+    """
+    valid = ~np.isnan(array)
+    counts = valid.sum(axis=-1, keepdims=True)
+    ordered = np.sort(array, axis=-1)  # NaN sorts last.
+    lower = np.take_along_axis(
+        ordered, np.maximum((counts - 1) // 2, 0), axis=-1)
+    upper = np.take_along_axis(ordered, np.maximum(counts // 2, 0), axis=-1)
+    return np.where(counts > 0, (lower + upper) / 2, np.nan)
+
+
+def outlier_mask(names, values, method="pointwise", threshold=Z_THRESHOLD,
+                 min_group_size=MIN_GROUP_SIZE):
+    """Takes the column names and the values of shape (time, column) of a
+    merged file as input. Returns a boolean mask of the shape of values that
+    is True for outliers according to method (see METHODS). Groups with
+    fewer than min_group_size replicates are not checked.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown outlier method {method}. Use one of "
+                         + f"{', '.join(METHODS)}.")
+    groups, codes = aggregation.group_columns(names)
+    grouped, replicate_idx = replicate_array(codes, len(groups), values)
+    if method == "pointwise":
+        flagged = robust_z_scores(
+            grouped, min_group_size=min_group_size) > threshold
+    else:
+        deviation = np.abs(grouped - nanmedian(grouped))
+        valid = ~np.isnan(deviation)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            distances = (np.where(valid, deviation, 0).sum(axis=0)
+                         / valid.sum(axis=0))[np.newaxis]
+        # The distances are floored relative to the level of the values.
+        level = pooled_over_time(np.abs(nanmedian(grouped)))
+        flagged = np.broadcast_to(
+            robust_z_scores(distances, level, min_group_size) > threshold,
+            grouped.shape)
+    mask = flagged[:, codes, replicate_idx]
+    logger.info(f"Flagged {int(mask.sum())} of {mask.size} values in "
+                + f"{len(groups)} groups as outliers ({method}).")
+    return mask
+
+
+def flag_merged_file(in_file, method="pointwise", threshold=Z_THRESHOLD,
+                     outfile=None):
+    """Detects outliers in the merged file in_file and lists them in outfile
+    (default: <in_file>_outliers.csv) with one row per flagged value.
+    Returns the outlier mask of shape (time, column).
+    """
+    if outfile is None:
+        outfile = reorder.outlier_file(in_file)
+    names, cycles, times, values = reorder.read_merged_file(in_file)
+    mask = outlier_mask(names, values, method, threshold)
+    time_idx, column_idx = np.nonzero(mask)
+    with open(outfile, "w") as out:
+        out.write(constants.SEP.join(["column", "cycle", "time", "value"])
+                  + "\n")
+        for column, cycle, time, value in zip(
+                [names[idx] for idx in column_idx],
+                cycles[time_idx].astype(int),
+                constants.format_numbers(times[time_idx]),
+                constants.format_numbers(values[time_idx, column_idx])):
+            out.write(constants.SEP.join([column, str(cycle), time, value])
+                      + "\n")
+    return mask
+
+
+if __name__ != "__main__":
+    constants.announce("Initialized outlier detection.")
@@ -0,0 +1,141 @@
+"""Opt-in function level profiling of pipeline runs with cProfile.
+
+Profiling is requested by the Options menu of the GUI or by the environment
+variable OCUTAF_PROFILE, which also works for headless runs:
+
+    OCUTAF_PROFILE=1                  profile every stage of a run
+    OCUTAF_PROFILE=ingest,merge       profile only these stages
+
+The stages are the spans of instrumentation.py, e.g. "ingest", "blank
+correction", "baptize" or "merge" of a raw data run. The profiler is only
+enabled while a selected stage is running, so that the rest of the run does
+not slow down. The profile is written as <name>.prof, which can be read by
+pstats, snakeviz and similar tools, together with a text summary of the
+functions ranked by cumulative time.
+"""
+
+import os
+import io
+import pstats
+import logging
+import cProfile
+
+import constants
+
+
+# Initialize logger.
+logger = constants.setup_logger(
+    log_level=logging.DEBUG,
+    logger_name=__name__
+)
+
+PROFILE_VARIABLE = "OCUTAF_PROFILE"
+ALL_STAGES = "all"
+PROFILE_NAME = "run_profile"
+TOP_FUNCTIONS = 40
+
+
+def requested_stages(value=None):
+    """Returns the stages selected by value, which defaults to the
+    environment variable OCUTAF_PROFILE: None if profiling is not requested,
+    ALL_STAGES for "1", "all", "yes" or "true", otherwise the set of comma
+    separated stage names.
+    """
+    if value is None:
+        value = os.environ.get(PROFILE_VARIABLE, "")
+    value = value.strip()
+    if value.lower() in ("", "0", "no", "false"):
+        return None
+    if value.lower() in ("1", ALL_STAGES, "yes", "true"):
+        return ALL_STAGES
+    return {stage.strip() for stage in value.split(",") if stage.strip()}
+
+
+class StageProfiler:
+    """cProfile profiler that is only enabled during the selected stages.
+    Stages nested in a selected stage are profiled as part of it.
+    """
+    def __init__(self, stages=ALL_STAGES):
+        self.stages = stages
+        self.profile = cProfile.Profile()
+        self.profiled_stages = []
+        self.__depth = 0
+
+    def __repr__(self):
+        return f"StageProfiler of {self.describe_stages()}"
+
+    def describe_stages(self):
+        if self.stages == ALL_STAGES:
+            return "all stages"
+        return (("the stages " if len(self.stages) > 1 else "the stage ")
+                + ", ".join(sorted(self.stages)))
+
+    def selects(self, stage):
+        return self.stages == ALL_STAGES or stage in self.stages
+
+    def enter(self, stage):
+        """Enables the profiler for a selected stage. Returns True if exit
+        has to be called at the end of the stage.
+        """
+        if not self.__depth and not self.selects(stage):
+            return False
+        if not self.__depth:
+            self.profiled_stages.append(stage)
+            self.profile.enable()
+        self.__depth += 1
+        return True
+
+    def exit(self):
+        self.__depth -= 1
+        if not self.__depth:
+            self.profile.disable()
+
+    def summary(self, top=TOP_FUNCTIONS):
+        """Returns the top functions ranked by cumulative time as text."""
+        out = io.StringIO()
+        out.write(f"Profile of {self.describe_stages()}. Profiled: "
+                  + ", ".join(dict.fromkeys(self.profiled_stages)) + "\n\n")
+        stats = pstats.Stats(self.profile, stream=out)
+        stats.strip_dirs().sort_stats(pstats.SortKey.CUMULATIVE)
+        stats.print_stats(top)
+        return out.getvalue()
+
+    def write(self, directory, name=PROFILE_NAME):
+        """Writes the profile to <name>.prof and its summary to <name>.txt
+        in directory. Returns the path of the profile or None if nothing
+        was profiled or the files could not be written.
+        """
+        if not self.profiled_stages:
+            logger.warning(f"No stage of {self.describe_stages()} ran. "
+                           + "Wrote no profile.")
+            return None
+        profile_file = os.path.join(directory, name + ".prof")
+        try:
+            self.profile.dump_stats(profile_file)
+            with open(os.path.join(directory, name + ".txt"), "w") as out:
+                out.write(self.summary())
+        except OSError as error:
+            logger.warning(f"Could not write profile to {directory}: "
+                           + f"{error}")
+            return None
+        logger.info(f"Wrote profile of {self.describe_stages()} to "
+                    + f"{profile_file}.")
+        return profile_file
+
+
+def profiler_for_run(enabled=False):
+    """Returns a StageProfiler if profiling is enabled in the GUI or
+    requested by OCUTAF_PROFILE, otherwise None. Stages selected by
+    OCUTAF_PROFILE also apply to runs profiled from the GUI.
+    """
+    stages = requested_stages()
+    if stages is None and not enabled:
+        return None
+    profiler = StageProfiler(ALL_STAGES if stages is None else stages)
+    logger.info(f"Profiling {profiler.describe_stages()} in process "
+                + f"{os.getpid()}.")
+    return profiler
+
+
+if __name__ != "__main__":
+    constants.announce("Initialized profiling.")
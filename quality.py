@@ -18,14 +18,34 @@ def check_name_file(name_file):
     pass
 
 
-def is_name_file_csv(name_file):
+def sniff_separator(name_file):
+    """Returns the separator of a name file: constants.SEP, a tab character
+    if the file was saved as TSV by Excel, or None if no line contains
+    either of them. Only the lines up to the first separator are read."""
     with open(name_file) as infile:
         for line in infile:
             if constants.SEP in line:
-                return name_file
+                return constants.SEP
             elif "\t" in line:
-                return rewrite_tsv(name_file)
+                return "\t"
+    return None
+
+
+def is_name_file_csv(name_file):
+    """Returns name_file if it is separated by constants.SEP (or contains no
+    separator at all), otherwise the name of a rewritten CSV copy."""
+    if sniff_separator(name_file) == "\t":
+        return rewrite_tsv(name_file)
+    return name_file
+
 
+def normalize_name_file(name_file):
+    """Rewrites an Excel TSV name file in place with the separators specified
+    in constants.py. Returns True if the file had to be rewritten."""
+    if sniff_separator(name_file) != "\t":
+        return False
+    return constants.rewrite_file(
+        name_file, lambda line: line.replace("\t", constants.SEP))
 
 
 def rewrite_tsv(name_file):
@@ -33,19 +53,16 @@ def rewrite_tsv(name_file):
     Re-writes all Excel induced tab characters to valid seperators as specified
     in constants.py in a new file and returns that file name."""
     csv_file_name = name_file.split(sep=".")[:-1][0] + "_as_csv.csv"
-    to_write = ""
-    for corrected_line in tabs_to_seps(name_file):
-        to_write += corrected_line
     with open(csv_file_name, "w") as outfile:
-        outfile.write(to_write)
+        outfile.writelines(tabs_to_seps(name_file))
     return csv_file_name
 
 
 def tabs_to_seps(file):
     with open(file, "r") as f:
-	    for line in f:
-		    yield line.replace("\t", constants.SEP)
+        for line in f:
+            yield line.replace("\t", constants.SEP)
 
 
 if __name__ != "__main__":
-    print("\tInitialized quality control module.")
+    constants.announce("Initialized quality control module.")
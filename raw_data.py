@@ -1,16 +1,24 @@
 import os
 import logging
 
-import tkinter as tk
-# from tkinter import ttk
-from tkinter.filedialog import askdirectory
-
 import constants
 import get_raw_data_asc
 import get_raw_data_excel
 import get_raw_data_hamilton
 import blank_and_name_handling
+import experiment_store
+import aggregation
+import outliers
+import kinetics
 import quality
+import validation
+import instrumentation
+import profiling
+
+# GUI toolkit, only imported when the GUI is built.
+tk = constants.lazy_import("tkinter")
+filedialog = constants.lazy_import("tkinter.filedialog")
+
 
 # Initialize logger.
 logger = constants.setup_logger(
@@ -18,23 +26,293 @@ logger = constants.setup_logger(
     logger_name=__name__
     )
 
+# Long-format store of all named data written by the naming and merging step.
+EXPERIMENT_STORE_FILE = "experiment_store.pkl"
+
 
 def read_raw_data(raw_data_dir, reporter_name):
+    """Reads the raw data files in raw_data_dir, which becomes the working
+    directory. Of several formats, only the first one returned by
+    validation.raw_data_format is read, independent of the file order.
+    """
     path_to_file_dir = raw_data_dir
     os.chdir(path_to_file_dir)
-    all_files = [file for file in os.listdir()]
-    for file in all_files:
-        if ".asc" in file:
-            logger.info("Found asc files. Expecting data from TECAN robot.")
-            return get_raw_data_asc.read_raw_data(reporter_name)
-        elif ".xlsx" in file:
-            logger.info("Found xlsx files. Expecting data from TECAN reader"
-                        + " in Excel format.")
-            return get_raw_data_excel.read_raw_data(
-                reporter_name=reporter_name)
-        elif ".xls" in file:
-            logger.info("Found xls files. Expecting data from Hamilton robot.")
-            return get_raw_data_hamilton.read_raw_data(reporter_name)
+    formats = validation.raw_data_format(os.listdir())
+    if not formats:
+        return None
+    if formats[0] == "asc":
+        logger.info("Found asc files. Expecting data from TECAN robot.")
+        return get_raw_data_asc.read_raw_data(reporter_name)
+    elif formats[0] == "xlsx":
+        logger.info("Found xlsx files. Expecting data from TECAN reader"
+                    + " in Excel format.")
+        return get_raw_data_excel.read_raw_data(
+            reporter_name=reporter_name)
+    else:
+        logger.info("Found xls files. Expecting data from Hamilton robot.")
+        return get_raw_data_hamilton.read_raw_data(reporter_name)
+
+
+class RawDataRun:
+    """Steps of a raw data run from reading the raw data to the named and
+    merged files, independent of the GUI. The outcome of every step is
+    passed to report(step, message) with the step index 0 (ingest), 1 (blank
+    correction) or 2 (naming and merging), messages for the user to
+    notify(title, message). Both only log by default. The steps are
+    measured as spans of instrumentation.py, and the raw data directory is
+    the working directory of the run. The outliers of the merged files are
+    always listed, and left out of the replicate summaries if
+    exclude_outliers is set.
+    """
+    def __init__(self, raw_data_dir, reporter_name="lux",
+                 blank_wells="H10, H11, H12", name_file_dir=None,
+                 fixed_blank=False, exclude_reporter_blank=False,
+                 remove_quotation_marks=True, exclude_outliers=True,
+                 report=None, notify=None):
+        self.raw_data_dir = raw_data_dir
+        self.reporter_name = reporter_name
+        self.blank_wells = blank_wells
+        self.name_file_dir = name_file_dir
+        self.fixed_blank = fixed_blank
+        self.exclude_reporter_blank = exclude_reporter_blank
+        self.remove_quotation_marks = remove_quotation_marks
+        self.exclude_outliers = exclude_outliers
+        self.report = report or (lambda step, message: logger.info(message))
+        self.notify = notify or (lambda title, message: logger.warning(
+            f"{title} {message}"))
+        self.name_files_are_csv = True
+        self.written_barcodes = []
+        self.merged_files = []
+
+    def validate_directories(self):
+        """Pre-flight check of the raw data and name file directories. Only
+        problems end the run, warnings are logged by validation.py.
+        """
+        problems, _ = validation.validate_directories(
+            self.raw_data_dir,
+            self.name_file_dir
+            )
+        if problems:
+            self.report(
+                0,
+                f"ERROR: FOUND {len(problems)} PROBLEM(S) IN THE INPUT "
+                + "DIRECTORIES. ANALYSIS ENDED.")
+            self.notify(
+                "Error: Invalid Input Directories!",
+                "Please fix the following problems before the next run:\n\n"
+                + "\n".join(problems)
+                )
+            return False
+        return True
+
+    def organize_raw_data(self):
+        """Read Data. Corresponds to Stephan's original Perl script."""
+        logger.info("Started reordering data into uniform TSV (Stephan's "
+                    + "script.")
+        self.written_barcodes = read_raw_data(self.raw_data_dir,
+                                              self.reporter_name)
+        if not self.written_barcodes:
+            logger.error("Could not read barcodes in data files.")
+            error_msg = "ERROR:DID NOT RETRIEVED ANY BARCODES. ANALYSIS ENDED."
+            self.report(0, error_msg)
+            return False
+
+        written_barcodes_as_str = ", ".join(self.written_barcodes)
+        logger.info("Written uniform TSV for barcodes "
+                    + f"{written_barcodes_as_str}")
+        msg = f"Successfully written barcodes for: {written_barcodes_as_str}"
+        self.report(0, msg)
+        return True
+
+    def perform_blank_correction(self):
+        """Blank Correction."""
+        blanks = blank_and_name_handling.process_well_input(self.blank_wells)
+        logger.info(
+            f"Started blank correction using {blanks} as blank(s).")
+        raw_files = [file for file in os.listdir() if "results.txt" in file]
+        has_written_blank_corrected_file = False
+        for file in raw_files:
+            file_basename = file.split(sep=".")[0]
+            od, rru = blank_and_name_handling.get_wrappers(
+                file,
+                blanks,
+                self.fixed_blank,
+                self.exclude_reporter_blank
+                )
+            blank_and_name_handling.write_blank_corrected(
+                od, file_basename + "_OD_corrected.csv"
+                )
+            times, wells, od_matrix = kinetics.od_matrix_from_wrapper(od)
+            kinetics.write_growth_table(
+                wells,
+                kinetics.growth_kinetics(times, od_matrix),
+                file_basename + f"{kinetics.GROWTH_SUFFIX}.csv"
+                )
+            blank_and_name_handling.write_blank_corrected(
+                rru,
+                file_basename
+                + f"_relative_{self.reporter_name}_corrected.csv"
+                )
+            if not has_written_blank_corrected_file:
+                has_written_blank_corrected_file = True
+
+        if not has_written_blank_corrected_file:
+            logger.error("Unable to write blank corrected files.")
+            error_msg = "ERROR: NO BLANK CORRECTED FILES WERE WRITTEN." \
+                + "ANALYSIS ENDED."
+            self.report(1, error_msg)
+            return False
+        logger.info("Sucessfully written blank corrected files.")
+        self.report(1, "All blank corrected files written.")
+        return True
+
+    def name_columns_and_merge_files(self):
+        """Optional step: Naming and merging with specified naming CSVs."""
+        logger.info("Started optional naming and merging of blank corrected"
+                    + " files.")
+        namefiles = [os.path.join(self.name_file_dir, file)
+                     for file in os.listdir(self.name_file_dir)
+                     ]
+        # Correct Excel TAB character bug:
+        rewritten = [quality.normalize_name_file(name_file)
+                     for name_file in namefiles]
+        if any(rewritten) and self.name_files_are_csv:
+            logger.warning(
+                "Name files are not formatted as expected (CSVs with"
+                + f"{constants.SEP} as seperator)."
+                + "Rewritten TSV formatted name files in place."
+                )
+            self.name_files_are_csv = False
+            self.notify(
+                "Warning: Error in Name File!",
+                "Your name files have been TSV formatted due to an Excel bug."
+                + "\nThe bug has been caught and the name files have been"
+                + "\ncorrected in place."
+                )
+
+        corrected_files = [file for file in os.listdir()
+                           if "corrected" in file and "bap" not in file]
+
+        if len(self.written_barcodes) != len(namefiles):
+            logger.error("Encountered unequal numbers of corrected data files"
+                         + " and name files.")
+            self.report(
+                2,
+                "ERROR: More or less encountered"
+                + "barcodes than name files!\n"
+                + "ANALYSIS ENDED!"
+                )
+            return False
+
+        barcode_to_file = {
+            self.written_barcodes[i]: namefiles[i] for i in range(
+                len(self.written_barcodes))
+            }
+        with instrumentation.span("baptize"):
+            self.baptize_files(barcode_to_file, corrected_files)
+
+        # Merge and Sort final output files
+        with instrumentation.span("merge"):
+            self.merged_files = self.merge_files()
+        with instrumentation.span("outlier detection"):
+            masks = [outliers.flag_merged_file(merged_file)
+                     for merged_file in self.merged_files]
+        with instrumentation.span("aggregation"):
+            for merged_file, mask in zip(self.merged_files, masks):
+                aggregation.aggregate_merged_file(
+                    merged_file,
+                    mask=mask if self.exclude_outliers else None
+                    )
+            store = experiment_store.build_store_from_directory(
+                barcode_to_file,
+                self.reporter_name
+                )
+            store.save(EXPERIMENT_STORE_FILE)
+        self.report(2, "Naming and sorting of data complete.")
+        return True
+
+    def baptize_files(self, barcode_to_file, corrected_files):
+        for barcode in barcode_to_file:
+            for file in corrected_files:
+                if barcode in file:
+                    blank_and_name_handling.baptize(
+                        data_file=file,
+                        name_csv=barcode_to_file[barcode],
+                        remove_quatation_marks_from_namefile=self.remove_quotation_marks
+                        )
+                    logger.debug("Baptized data for {}".format(barcode))
+
+    def merge_files(self):
+        """Merges and sorts the baptized files. Returns the names of the
+        written files.
+        """
+        od = [file for file in os.listdir() if "OD" in file and "bap" in file]
+        rfu = [file for file in os.listdir()
+               if "relative" in file and "bap" in file]
+        if len(od) > 1:
+            merged_files = [
+                "all_OD.csv",
+                "all_relative_{}.csv".format(self.reporter_name)
+                ]
+            blank_and_name_handling.merge(
+                od,
+                outfile=merged_files[0],
+                write=True
+                )
+            blank_and_name_handling.merge(
+                rfu,
+                outfile=merged_files[1],
+                write=True
+                )
+            logger.info("Merged and sorted all corrected data files.")
+        else:
+            merged_files = [
+                "sorted_OD.csv",
+                "sorted_relative_{}.csv".format(self.reporter_name)
+                ]
+            od_dataframe = blank_and_name_handling.sort_df(od[0])
+            od_dataframe.to_csv(merged_files[0], sep=constants.SEP)
+            rfu_dataframe = blank_and_name_handling.sort_df(rfu[0])
+            rfu_dataframe.to_csv(merged_files[1], sep=constants.SEP)
+            logger.info("Sorted corrected data file.")
+        return merged_files
+
+    def run(self):
+        """Runs all steps. Returns True if all of them completed."""
+        # Check the input directories before reading any data.
+        logger.debug("Started read raw data run.")
+        with instrumentation.span("validation"):
+            directories_are_valid = self.validate_directories()
+        if not directories_are_valid:
+            logger.error("Input directories failed the pre-flight checks.")
+            return False
+        # Read Data
+        with instrumentation.span("ingest"):
+            first_step_completed = self.organize_raw_data()
+        if not first_step_completed:
+            logger.error("Could not finish raw data read-out (step 1).")
+            return False
+        if " " in self.reporter_name:
+            self.reporter_name = self.reporter_name.replace(" ", "_")
+            logger.info("Removed whitespace from reporter name: "
+                        + f"{self.reporter_name}")
+        with instrumentation.span("blank correction"):
+            second_step_completed = self.perform_blank_correction()
+        if not second_step_completed:
+            logger.error("Could not finish blank-correction (step 2).")
+            return False
+
+        # This step is entirely optional. If no path to naming files is set,
+        #  this part will be skipped without raising any errors.
+        if self.name_file_dir is not None:
+            with instrumentation.span("naming and merging"):
+                third_step_completed = self.name_columns_and_merge_files()
+            if not third_step_completed:
+                logger.error("Could not finish baptizing and merging files"
+                             + " (step 3).")
+                return False
+        logger.debug("Finished read raw data run.")
+        return True
 
 
 class GUIRawDataProcessing():
@@ -44,8 +322,6 @@ class GUIRawDataProcessing():
         self.frame = tk.Frame(grand_parant)
         self.parent.nb.add(self.frame, text="Raw Data")
 
-        self.name_files_are_csv = True
-
         # User provided variables with default values
         self.reporter_name = tk.StringVar()
         self.reporter_name.set("lux")
@@ -71,6 +347,7 @@ class GUIRawDataProcessing():
         self.first_step_complete = tk.StringVar()
         self.second_step_complete = tk.StringVar()
         self.third_step_complete = tk.StringVar()
+        self.run_summary = tk.StringVar()
 
         self.intro_label = tk.Label(
             self.frame, text="Welcome to One Click to Tabular Format."
@@ -142,6 +419,7 @@ class GUIRawDataProcessing():
         self.label_organize_raw_data = tk.Label(self.frame, textvariable=self.first_step_complete)
         self.label_perform_blank_correction = tk.Label(self.frame, textvariable=self.second_step_complete)
         self.label_name_columns_and_merge_files = tk.Label(self.frame, textvariable=self.third_step_complete)
+        self.label_run_summary = tk.Label(self.frame, textvariable=self.run_summary)
 
         # Defining tooltips
         constants.ToolTip(
@@ -195,8 +473,9 @@ class GUIRawDataProcessing():
         self.label_organize_raw_data.grid(row=8, columnspan=5)
         self.label_perform_blank_correction.grid(row=9, columnspan=5)
         self.label_name_columns_and_merge_files.grid(row=10, columnspan=5)
+        self.label_run_summary.grid(row=11, columnspan=5)
 
-        self.subframe.grid(row=11, columnspan=5)
+        self.subframe.grid(row=12, columnspan=5)
         self.configure_btn(self.run_button)
         self.run_button.grid(row=0, column=0, pady=5, padx=5)
         self.configure_btn(self.reset_button)
@@ -214,7 +493,7 @@ class GUIRawDataProcessing():
         )
 
     def set_dir(self, dir_var, corresponding_bool_var):
-        path = askdirectory()
+        path = filedialog.askdirectory()
         dir_var.set(path)
         if dir_var.get() not in ("", "not_defined"):
             corresponding_bool_var.set(1)
@@ -223,170 +502,46 @@ class GUIRawDataProcessing():
             logger.debug("Tried to set a path variable, but received invalid"
                          + " input.")
 
-    def organize_raw_data(self):
-        """Read Data. Corresponds to Stephan's original Perl script."""
-        logger.info("Started reordering data into uniform TSV (Stephan's "
-                    + "script.")
-        self.written_barcodes = read_raw_data(self.raw_data_dir.get(),
-                                              self.reporter_name.get())
-        if not self.written_barcodes:
-            logger.error("Could not read barcodes in data files.")
-            error_msg = "ERROR:DID NOT RETRIEVED ANY BARCODES. ANALYSIS ENDED."
-            self.first_step_complete.set(error_msg)
-            return False
-
-        written_barcodes_as_str = ", ".join(self.written_barcodes)
-        logger.info("Written uniform TSV for barcodes "
-                    + f"{written_barcodes_as_str}")
-        msg = f"Successfully written barcodes for: {written_barcodes_as_str}"
-        self.first_step_complete.set(msg)
-        return True
-
-    def perform_blank_correction(self):
-        """Blank Correction."""
-        blanks = blank_and_name_handling.process_well_input(
-            self.blank_wells.get())
-        logger.info(
-            f"Started blank correction using {blanks} as blank(s).")
-        raw_files = [file for file in os.listdir() if "results.txt" in file]
-        has_written_blank_corrected_file = False
-        for file in raw_files:
-            file_basename = file.split(sep=".")[0]
-            od, rru = blank_and_name_handling.get_wrappers(
-                file,
-                blanks,
-                self.fixed_blank.get(),
-                self.exclude_reporter_blank.get()
-                )
-            blank_and_name_handling.write_blank_corrected(
-                od, file_basename + "_OD_corrected.csv"
-                )
-            blank_and_name_handling.write_blank_corrected(
-                rru,
-                file_basename
-                + f"_relative_{self.reporter_name.get()}_corrected.csv"
-                )
-            if not has_written_blank_corrected_file:
-                has_written_blank_corrected_file = True
-
-        if not has_written_blank_corrected_file:
-            logger.error("Unable to write blank corrected files.")
-            error_msg = "ERROR: NO BLANK CORRECTED FILES WERE WRITTEN." \
-                + "ANALYSIS ENDED."
-            self.second_step_complete.set(error_msg)
-            return False
-        logger.info("Sucessfully written blank corrected files.")
-        self.second_step_complete.set("All blank corrected files written.")
-        return True
-
-    def name_columns_and_merge_files(self):
-        """Optional step: Naming and merging with specified naming CSVs."""
-        logger.info("Started optional naming and merging of blank corrected"
-                    + " files.")
-        namefiles = [os.path.join(self.path_to_namefiles.get(), file)
-                     for file in os.listdir(self.path_to_namefiles.get())
-                     ]
-        # Correct Excel TAB character bug:
-        temp = [quality.is_name_file_csv(name_file) for name_file in namefiles]
-        if (not temp == namefiles) and self.name_files_are_csv:
-            logger.warning(
-                "Name files are not formatted as expected (CSVs with"
-                + f"{constants.SEP} as seperator)."
-                + "Expecting TSV format, trying to resolve name files."
-                )
-            self.name_files_are_csv = False
-            constants.LabelWindow(
-                self.frame,
-                "Your name files have been TSV formatted due to an Excel bug."
-                + "\nThe bug has been caught and corrected for this run.\n"
-                + "\nPlease clean up your name file directory before the next"
-                + "run!",
-                title="Warning: Error in Name File!"
-                )
-
-        namefiles = temp
+    def report_step(self, step, message):
+        """Shows the outcome of a step of RawDataRun below the buttons."""
+        (self.first_step_complete, self.second_step_complete,
+         self.third_step_complete)[step].set(message)
 
-        corrected_files = [file for file in os.listdir()
-                           if "corrected" in file and "bap" not in file]
-
-        if len(self.written_barcodes) != len(namefiles):
-            logger.error("Encountered unequal numbers of corrected data files"
-                         + " and name files.")
-            self.third_step_complete.set(
-                "ERROR: More or less encountered"
-                + "barcodes than name files!\n"
-                + "ANALYSIS ENDED!"
-                )
-            return False
-
-        barcode_to_file = {
-            self.written_barcodes[i]: namefiles[i] for i in range(
-                len(self.written_barcodes))
-            }
-        for barcode in barcode_to_file:
-            for file in corrected_files:
-                if barcode in file:
-                    blank_and_name_handling.baptize(
-                        data_file=file,
-                        name_csv=barcode_to_file[barcode],
-                        remove_quatation_marks_from_namefile=self.parent.remove_quotation_marks.get()
-                        )
-                    logger.debug("Baptized data for {}".format(barcode))
-
-        # Merge and Sort final output files
-        od = [file for file in os.listdir() if "OD" in file and "bap" in file]
-        rfu = [file for file in os.listdir()
-               if "relative" in file and "bap" in file]
-        if len(od) > 1:
-            blank_and_name_handling.merge(
-                od,
-                outfile="all_OD.csv",
-                write=True
-                )
-            blank_and_name_handling.merge(
-                rfu,
-                outfile="all_relative_{}.csv".format(self.reporter_name.get()),
-                write=True
-                )
-            logger.info("Merged and sorted all corrected data files.")
-        else:
-            od_dataframe = blank_and_name_handling.sort_df(od[0])
-            od_dataframe.to_csv("sorted_OD.csv", sep=constants.SEP)
-            rfu_dataframe = blank_and_name_handling.sort_df(rfu[0])
-            rfu_dataframe.to_csv(
-                "sorted_relative_{}.csv".format(self.reporter_name.get()),
-                sep=constants.SEP
-                )
-            logger.info("Sorted corrected data file.")
-        self.third_step_complete.set("Naming and sorting of data complete.")
-        return True
+    def notify(self, title, message):
+        constants.LabelWindow(self.frame, message, title=title)
 
     def run(self):
-        # Read Data
-        logger.debug("Started read raw data run.")
-        first_step_completed = self.organize_raw_data()
-        if not first_step_completed:
-            logger.error("Could not finish raw data read-out (step 1).")
-            return
-        if " " in self.reporter_name.get():
-            self.reporter_name.set(self.reporter_name.get().replace(" ", "_"))
-            logger.info("Removed whitespace from reporter name: "
-                        + f"{self.reporter_name.get()}")
-        second_step_completed = self.perform_blank_correction()
-        if not second_step_completed:
-            logger.error("Could not finish blank-correction (step 2).")
-            return
-
-        # This step is entirely optional. If no path to naming files is set,
-        #  this part will be skipped without raising any errors.
-        if self.path_to_namefiles.get() != "not_defined":
-            third_step_completed = self.name_columns_and_merge_files()
-            if not third_step_completed:
-                logger.error("Could not finish baptizing and merging files"
-                             + " (step 3).")
-                return
-        self.name_files_are_csv = True
-        logger.debug("Finished read raw data run.")
+        """Runs all steps, measuring each of them. The run report is written
+        to the raw data directory and summarized below the step labels. If
+        profiling is enabled, the profile is written next to it.
+        """
+        self.run_summary.set("")
+        name_file_dir = self.path_to_namefiles.get()
+        steps = RawDataRun(
+            self.raw_data_dir.get(),
+            reporter_name=self.reporter_name.get(),
+            blank_wells=self.blank_wells.get(),
+            name_file_dir=(None if name_file_dir == "not_defined"
+                           else name_file_dir),
+            fixed_blank=self.fixed_blank.get(),
+            exclude_reporter_blank=self.exclude_reporter_blank.get(),
+            remove_quotation_marks=self.parent.remove_quotation_marks.get(),
+            exclude_outliers=self.parent.exclude_outliers.get(),
+            report=self.report_step,
+            notify=self.notify
+            )
+        profiler = profiling.profiler_for_run(self.parent.profile_runs.get())
+        with instrumentation.run_report(
+                "raw data run",
+                os.path.join(self.raw_data_dir.get(),
+                             instrumentation.REPORT_FILE),
+                profiler=profiler
+                ) as report:
+            steps.run()
+        self.reporter_name.set(steps.reporter_name)
+        self.run_summary.set(report.summary())
+        if profiler is not None:
+            profiler.write(self.raw_data_dir.get())
 
     def reset(self):
         self.reporter_name.set("lux")
@@ -400,10 +555,9 @@ class GUIRawDataProcessing():
         self.first_step_complete.set("")
         self.second_step_complete.set("")
         self.third_step_complete.set("")
-
-        self.name_files_are_csv = True
+        self.run_summary.set("")
         logger.debug("Reset internal information to default values.")
 
 
 if __name__ != "__main__":
-    print("\tInitialized raw data handling module.")
+    constants.announce("Initialized raw data handling module.")
@@ -11,19 +11,24 @@ TO DO:
 """
 
 import os
+import json
+import locale
 import logging
-from statistics import mean, stdev
-from math import sqrt
 
-import tkinter as tk
-from tkinter import ttk
-from tkinter.filedialog import askdirectory, askopenfilename
+import numpy as np
 
 import constants
 
 
 from pprint import pprint
 
+pd = constants.lazy_import("pandas")
+
+# GUI toolkit, only imported when the GUI is built.
+tk = constants.lazy_import("tkinter")
+ttk = constants.lazy_import("tkinter.ttk")
+filedialog = constants.lazy_import("tkinter.filedialog")
+
 
 # Initialize logger.
 logger = constants.setup_logger(
@@ -59,6 +64,16 @@ class GUIReorderForSinglePointAnalysis:
             self.frame,
             textvariable = self.num_replicates_value
             )
+        self.timepoint_value = tk.IntVar()
+        self.timepoint_value.set(4)
+        self.timepoint_label = tk.Label(
+            self.frame,
+            text = "Time Point (Data Row):"
+            )
+        self.timepoint_entry = tk.Entry(
+            self.frame,
+            textvariable = self.timepoint_value
+            )
         self.get_file_button = tk.Button(
             self.frame,
             text = "Set File",
@@ -90,6 +105,24 @@ class GUIReorderForSinglePointAnalysis:
             onvalue = True,
             offvalue = False
             )
+        self.all_time_points = tk.BooleanVar()
+        self.all_time_points.set(False)
+        self.all_time_points_checkbutton = tk.Checkbutton(
+            self.frame,
+            text = "Reorder All Time Points",
+            variable = self.all_time_points,
+            onvalue = True,
+            offvalue = False
+            )
+        self.long_format = tk.BooleanVar()
+        self.long_format.set(False)
+        self.long_format_checkbutton = tk.Checkbutton(
+            self.frame,
+            text = "Write Single Long-Format File",
+            variable = self.long_format,
+            onvalue = True,
+            offvalue = False
+            )
 
         self.subframe = tk.Frame(self.frame) # Subframe for symmetrical buttons
         self.run_button = tk.Button(
@@ -133,6 +166,21 @@ class GUIReorderForSinglePointAnalysis:
             "Keyword in naming file that indicates background control."
             + "\nOnly necessary if background subtraction is performed."
             )
+        constants.ToolTip(
+            self.timepoint_label,
+            "Data row of the merged file used for single point analysis."
+            + "\nRow 1 is the first measurement cycle."
+            )
+        constants.ToolTip(
+            self.all_time_points_checkbutton,
+            "Reorder every time point of the file instead of a single one."
+            + "\nWrites one file per time point unless the long format is chosen."
+            )
+        constants.ToolTip(
+            self.long_format_checkbutton,
+            "Write all reordered time points to a single file with one value"
+            + "\nper row (cycle, time, condition, construct, replicate, value)."
+            )
 
     def register_widgets(self):
         self.welcome_label.grid(row = 0, columnspan = 2, padx = 5, pady = 5)
@@ -146,7 +194,12 @@ class GUIReorderForSinglePointAnalysis:
         self.change_background_keyword_label.grid(row = 4, column = 0, sticky = "E", padx = 5, pady = 5)
         self.change_background_keyword_entry.grid(row = 4, column = 1, sticky = "W", padx = 5, pady = 5)
 
-        self.response_label.grid(row=5, columnspan=2, padx=5, pady=15)
+        self.timepoint_label.grid(row = 5, column = 0, sticky = "E", padx = 5, pady = 5)
+        self.timepoint_entry.grid(row = 5, column = 1, sticky = "W", padx = 5, pady = 5)
+        self.all_time_points_checkbutton.grid(row = 6, column = 0, sticky = "E")
+        self.long_format_checkbutton.grid(row = 6, column = 1, sticky = "W")
+
+        self.response_label.grid(row=7, columnspan=2, padx=5, pady=15)
 
         self.subframe.grid(row=11, columnspan=2)
         self.configure_btn(self.run_button)
@@ -166,7 +219,7 @@ class GUIReorderForSinglePointAnalysis:
         )
 
     def get_file(self):
-        file_name = askopenfilename()
+        file_name = filedialog.askopenfilename()
         if self.remove_whitespaces_from_input_file:
             constants.remove_double_quotest_from_file(file_name)
         self.input_file_name.set(os.path.basename(file_name))
@@ -177,210 +230,488 @@ class GUIReorderForSinglePointAnalysis:
         self.input_file_path.set("")
         self.user_response.set("")
         self.num_replicates_value.set(3)
-
-    def reorder_csv_for_single_point_data(self, in_file, num_replicates):
-        """Reorders an Excel CSV for easier data analysis for single time point
-        measurements/analysis.
-        Input: An Excel CSV containing two rows: First, column-wise names of certain
-        condition in the form "Name of the Construct, Condition". Conditions
-        usually refers to inducer concentrations. The ',' character may appear
-        only once. Second, corresponding values to the construct/condition pairs.
-        Return: A string representing the reorder Excel CSV.
-        """
-        processed_file_as_str = self.get_single_data_point_info_from_file(in_file)
-        first_line, second_line = processed_file_as_str.split("\n")
-        data_wrapper = self.initialize_data_wrapper_dict(first_line, second_line)
-        if self.background_subtraction.get():
-            return self.create_bg_corrected_csv_string(data_wrapper)
-        else:
-            return self.create_csv_string(data_wrapper)
-        
-    def initialize_data_wrapper_dict(self, first_line, second_line):
-        data_wrapper_dict, idx_to_name = self.initialize_from_first_line(
-            first_line)
-        data_wrapper_dict = self.initialize_from_second_line(
-            second_line,
-            data_wrapper_dict,
-            idx_to_name)
-        data_wrapper_dict = self.fill_data_wrapper_with_conditions_as_keys(
-            data_wrapper_dict)
-        return data_wrapper_dict
-  
-    def initialize_from_first_line(self, first_line):
-        idx_to_name = {}
-        data_wrapper_dict = {}
-        all_conditions = []
-        for idx, name in enumerate(first_line.split(sep=constants.SEP)):
-            if not name:
-                continue
-            try:
-                construct, condition = name.split(sep=",")
-            except ValueError:
-                print(
-                    f"The name {name} is invalid! Make sure to conform to (construct, condition) format!")
-                raise ValueError
-            # Replicates are marked with ".1", ".2", ...
-            condition = condition.split(sep=".")[0].strip()
-            all_conditions.append(condition)
-            idx_to_name[idx] = (construct, condition)
-            
-        for condition in all_conditions:
-            data_wrapper_dict[condition] = {}
-        
-        return data_wrapper_dict, idx_to_name
-
-    def initialize_from_second_line(self, second_line, data_wrapper_dict, idx_to_name):
-        for idx, value in enumerate(second_line.split(sep=constants.SEP)):
-            if not value:
-                continue
-            construct, condition = idx_to_name[idx]
-            if not construct in data_wrapper_dict[condition]:
-                data_wrapper_dict[condition][construct] = []
-
-            if not len(data_wrapper_dict[condition][construct]) >= self.num_replicates_value.get():
-                # Prevents overflow with background controls
-                data_wrapper_dict[condition][construct].append(value)
-            else:
-                logger.warning("Overflow in data_wrapper for {0}, {1}".format(
-                    construct, condition))
-        return data_wrapper_dict
-
-    def fill_data_wrapper_with_conditions_as_keys(self, data_wrapper_dict):
-        captured_conditions = []
-        _length = None
-        for condition in data_wrapper_dict:
-            captured_conditions.append(condition)
-            if _length is None:
-                _length = len(data_wrapper_dict[condition])
-            else:
-                if not _length == len(data_wrapper_dict[condition]):
-                    error_msg = "The condition {0} contained {1} constructs, but parents contain {2}".format(
-                        condition,
-                        len(data_wrapper_dict[condition]),
-                        _length
-                    )
-                    logger.critical(error_msg)
-                    raise ValueError(error_msg)
-        logger.info("Reordered data from {0}. Captured the conditions {1}".format(
-            self.input_file_name.get(),
-            ", ".join(captured_conditions)
-        ))
-        return data_wrapper_dict
-
-    def assemble_headline(self, data_wrapper_dict):
-        header = constants.SEP  # Initialize header line with empty cell
-        for any_condition in data_wrapper_dict:
-            for construct in data_wrapper_dict[any_condition]:
-                # Creates num_replicate cells in header
-                header += construct + self.num_replicates_value.get() * constants.SEP
-            break # This loop must be executed exactly once to write a correct header.
-        header += "\n"
-        return header
-
-    def create_csv_string(self, final_data_wrapper_dict):
-        to_print = self.assemble_headline(final_data_wrapper_dict)
-        for condition in final_data_wrapper_dict:
-            current_line = condition + constants.SEP
-            for construct in final_data_wrapper_dict[condition]:
-                values = final_data_wrapper_dict[condition][construct]
-                for val in values:
-                    current_line += val + constants.SEP
-            current_line += "\n"
-            to_print += current_line
-        return to_print
-
-    def create_bg_corrected_csv_string(self, final_data_wrapper_dict):
-        # Gather data about statistical background (if chosen)
-        processed_file_as_str = self.get_single_data_point_info_from_file(
-            self.input_file_path.get())
-        first_line, second_line = processed_file_as_str.split("\n")
-        idx_to_name = self._get_idx_to_name(first_line)
-        all_background = []
-        for idx, value in enumerate(second_line.split(sep=constants.SEP)):
-            construct, condition = idx_to_name[idx]
-            if self.background_keyword.get() in construct:
-                logger.debug(
-                    f"Added {construct} to background constructs.")
-                all_background.append(float(value.replace(",", ".")))
-        bg_mean = mean(all_background)
-        bg_stdev = stdev(all_background)    
-        # If background subtraction is chosen, the evaluation writes a
-        #  different format than the non-corrected version. The output file
-        #  will contain 3 columns per construct in the form: (mean, S.D., N)
-        to_print = self.assemble_headline(final_data_wrapper_dict)
-        for condition in final_data_wrapper_dict:
-            current_line = condition + constants.SEP # Name for current row.
-            for value_list in final_data_wrapper_dict[condition]:
-                values = final_data_wrapper_dict[condition][value_list]
-                values = [float(val.replace(",", ".")) for val in values]
-                val_mean = str(mean(values) - bg_mean).replace(".", ",")
-                val_stdev = str(
-                    sqrt(stdev(values)**2 + bg_stdev**2)
-                    ).replace(".", ",")
-                val_num_rep = str(len(values)).replace(".", ",")
-                current_line += ";".join((val_mean, val_stdev, val_num_rep)) \
-                                + constants.SEP
-            current_line += "\n"
-            to_print += current_line
-        return to_print
-
-    def _get_idx_to_name(self, first_line):
-        return self.initialize_from_first_line(first_line)[1]
-
-    def get_single_data_point_info_from_file(self, in_file, timepoint_idx=4):
-        """Uses the merged and baptized data file from the raw_data module and
-        returns data from a single measurement timepoint necessary for the 
-        reordering functionalities.
-        """
-        with open(in_file) as file:
-            for row_idx, line in enumerate(file):
-                if row_idx == 0:  # Read head_line
-                    head_line, start_col_idx = self.read_headline_and_start_col_idx(
-                        line)
-                elif row_idx == timepoint_idx:  # read data_line
-                    dataline = self.read_dataline(line, start_col_idx)
-        return head_line.strip() + "\n" + dataline
-
-    def read_headline_and_start_col_idx(self, line):
-        to_ignore = ["", "temp", "time", "cycle"]  # non-data column titles
-        start_col_idx = None
-        headline = ""
-        for col_idx, cell in enumerate(line.split(constants.SEP)):
-            if cell.strip() in to_ignore:
-                continue
-            elif start_col_idx is None:
-                start_col_idx = col_idx
-            if start_col_idx and cell:
-                headline += cell.strip() + constants.SEP
-        return headline, start_col_idx
-
-    def read_dataline(self, line, start_col_idx):
-        dataline = ""
-        for col_idx, cell in enumerate(line.split(constants.SEP)):
-            if col_idx >= start_col_idx and cell:
-                dataline += cell.strip() + constants.SEP
-        return dataline
+        self.timepoint_value.set(4)
+        self.all_time_points.set(False)
+        self.long_format.set(False)
 
     def run(self):
         if not os.path.exists(self.input_file_path.get()):
             self.user_response.set("ERROR: INPUT FILE NOT DETECTED.")
             return
-        output_data_as_str = self.reorder_csv_for_single_point_data(
-            self.input_file_path.get(),
-            self.num_replicates_value.get()
-            )
-        output_file_name = self.input_file_name.get().replace(".csv", "_reordered.csv")
         if self.background_subtraction.get():
-            output_file_name = output_file_name.replace(
-                "_reordered",
-                "_reordered_and_bg_corrected"
+            background_keyword = self.background_keyword.get()
+        else:
+            background_keyword = None
+        mask = None
+        if self.parent.exclude_outliers.get():
+            names, cycles, _, _ = read_merged_file(self.input_file_path.get())
+            mask = read_outlier_mask(self.input_file_path.get(), names, cycles)
+        if self.all_time_points.get():
+            written_files = reorder_all_time_points(
+                self.input_file_path.get(),
+                self.num_replicates_value.get(),
+                long_format = self.long_format.get(),
+                background_keyword = background_keyword,
+                mask = mask
                 )
-        output_file_dir = os.path.dirname(self.input_file_path.get())
-        output_file = os.path.join(output_file_dir, output_file_name)
-        with open(output_file, "w") as output_file:
-            output_file.write(output_data_as_str)
+            self.user_response.set("Successfully written {} file(s).".format(
+                len(written_files)))
+            return
+        output_file, _ = write_reordered_single_point(
+            self.input_file_path.get(),
+            self.num_replicates_value.get(),
+            timepoint_idx = self.timepoint_value.get(),
+            background_keyword = background_keyword,
+            mask = mask
+            )
+        output_file_name = os.path.basename(output_file)
         self.user_response.set("Successfully written {}.".format(output_file_name))
 
 
+# ==============================================================================
+# REORDER ENGINE
+# ==============================================================================
+
+# Column titles of the merged file that do not contain data.
+NON_DATA_COLUMNS = ["", "temp", "time", "cycle"]
+# Suffix of the cached row offsets written next to merged data files.
+ROW_INDEX_SUFFIX = constants.ROW_INDEX_SUFFIX
+
+
+def read_merged_file(in_file):
+    """Reads a merged and baptized data file from the raw_data module in a
+    single pass.
+    Returns a tuple (names, cycles, times, values) where names contains the
+    titles of all data columns and values is an array of shape
+    (time points, data columns).
+    """
+    with open(in_file) as file:
+        headline = file.readline()
+        lines = [line for line in file if line.strip()]
+    return parse_lines(headline, lines)
+
+
+def read_time_point(in_file, timepoint_idx=4):
+    """Reads the headline and a single data row (timepoint_idx counts the
+    lines of the file, the headline being line 0) of a merged data file.
+    The data row is fetched with a single seek using the row offsets from
+    get_row_offsets.
+    Returns a tuple (names, cycles, times, values) like read_merged_file with
+    a single time point.
+    """
+    offsets = get_row_offsets(in_file)
+    if not 1 <= timepoint_idx < len(offsets):
+        raise ValueError(f"{in_file} has no time point {timepoint_idx}.")
+    encoding = locale.getpreferredencoding(False)
+    with open(in_file, "rb") as file:
+        headline = file.readline().decode(encoding)
+        file.seek(offsets[timepoint_idx])
+        line = file.readline().decode(encoding)
+    return parse_lines(headline, [line])
+
+
+def outlier_file(in_file):
+    """Returns the list of outliers written next to the merged file in_file
+    by outliers.flag_merged_file.
+    """
+    stem, extension = os.path.splitext(in_file)
+    return stem + constants.OUTLIER_SUFFIX + extension
+
+
+def read_outlier_mask(in_file, names, cycles):
+    """Returns the outlier mask of shape (time, column) of the merged file
+    in_file with the given column names and cycles, marking the values
+    listed in its outlier_file. Returns None if there is no such list.
+    Listed values that are not part of in_file are ignored.
+    """
+    list_file = outlier_file(in_file)
+    if not os.path.isfile(list_file):
+        return None
+    column_idx = {name: idx for idx, name in enumerate(names)}
+    time_idx = {int(cycle): idx for idx, cycle in enumerate(cycles)}
+    mask = np.zeros((len(cycles), len(names)), dtype=bool)
+    with open(list_file) as infile:
+        next(infile, None)  # Headline
+        for line in infile:
+            column, cycle = line.rstrip("\n").split(constants.SEP)[:2]
+            if column in column_idx and int(cycle) in time_idx:
+                mask[time_idx[int(cycle)], column_idx[column]] = True
+    logger.info(f"Read {int(mask.sum())} outlier(s) of {in_file} from "
+                + f"{list_file}.")
+    return mask
+
+
+def get_row_offsets(in_file):
+    """Returns a list with the byte offset of every line of in_file.
+    The offsets are cached in a ".rows" file next to in_file and only rebuilt
+    if the size or modification time of in_file has changed. The cache is
+    skipped if the directory of in_file is not writable.
+    """
+    stat = os.stat(in_file)
+    index_file = os.path.splitext(in_file)[0] + ROW_INDEX_SUFFIX
+    try:
+        with open(index_file) as index:
+            cached = json.load(index)
+        if (cached["mtime_ns"], cached["size"]) == (stat.st_mtime_ns,
+                                                    stat.st_size):
+            return cached["offsets"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    offsets = []
+    position = 0
+    with open(in_file, "rb") as file:
+        for line in file:
+            offsets.append(position)
+            position += len(line)
+    if os.access(os.path.dirname(os.path.abspath(index_file)), os.W_OK):
+        try:
+            with open(index_file, "w") as index:
+                json.dump({"mtime_ns": stat.st_mtime_ns,
+                           "size": stat.st_size, "offsets": offsets}, index)
+        except OSError as error:
+            logger.debug(f"Could not write row index {index_file}: {error}")
+    logger.debug(f"Indexed {len(offsets)} rows of {in_file}.")
+    return offsets
+
+
+def parse_lines(headline, lines):
+    """Parses the headline and a list of data lines of a merged data file.
+    Returns a tuple (names, cycles, times, values) like read_merged_file.
+    """
+    head_cells = [cell.strip() for cell in headline.split(constants.SEP)]
+    data_col_idx = [col_idx for col_idx, cell in enumerate(head_cells)
+                    if cell not in NON_DATA_COLUMNS]
+    time_col_idx = head_cells.index("time")
+    cycle_col_idx = head_cells.index("cycle")
+    block = constants.parse_number_block(lines)
+    if block.shape[1] < len(head_cells):  # Empty cells at the line ends.
+        block = np.pad(block, ((0, 0), (0, len(head_cells) - block.shape[1])),
+                       constant_values=np.nan)
+    names = [head_cells[col_idx] for col_idx in data_col_idx]
+    return (names, block[:, cycle_col_idx], block[:, time_col_idx],
+            block[:, data_col_idx])
+
+
+def column_index(names):
+    """Takes the data column titles of a merged file as input.
+    Returns a pandas MultiIndex with the levels (condition, construct,
+    replicate). Conditions and constructs are categoricals ordered by their
+    first appearance, replicates are numbered starting at 1.
+    """
+    split_names = constants.split_names(names)
+    for name, (_, condition) in zip(names, split_names):
+        if not condition:
+            raise ValueError(
+                f"The name {name} is invalid! Make sure to conform to "
+                + "(construct, condition) format!")
+    conditions = [condition for _, condition in split_names]
+    constructs = [construct for construct, _ in split_names]
+    frame = pd.DataFrame({
+        "condition": pd.Categorical(
+            conditions, categories=pd.unique(np.array(conditions))),
+        "construct": pd.Categorical(
+            constructs, categories=pd.unique(np.array(constructs))),
+    })
+    frame["replicate"] = frame.groupby(
+        ["condition", "construct"], observed=True, sort=False).cumcount() + 1
+    return pd.MultiIndex.from_frame(frame)
+
+
+def kept_replicates(index, num_replicates):
+    """Returns a boolean array marking the columns of index that belong to
+    the first num_replicates replicates. Logs a warning for every construct
+    and condition with more replicates.
+    """
+    keep = index.get_level_values("replicate").to_numpy() <= num_replicates
+    for condition, construct, _ in index[~keep].unique():
+        logger.warning(
+            f"Overflow in data_wrapper for {construct}, {condition}")
+    return keep
+
+
+def masked(values, mask=None):
+    """Returns values with all entries for which mask is True set to NaN.
+    mask is a boolean array of the shape of values as returned by
+    outliers.outlier_mask.
+    """
+    if mask is None:
+        return values
+    return np.where(mask, np.nan, values)
+
+
+def reorder_time_points(names, values, num_replicates, mask=None):
+    """Takes the data column titles and values as returned from
+    read_merged_file as input.
+    Returns a tuple (reordered, conditions, constructs) where reordered is an
+    array of shape (time points, conditions, constructs * num_replicates).
+    Conditions and constructs are ordered by their first appearance. Missing
+    replicates and values masked as outliers are filled with NaN.
+    """
+    values = masked(values, mask)
+    index = column_index(names)
+    keep = kept_replicates(index, num_replicates)
+    conditions = list(index.levels[0])
+    constructs = list(index.levels[1])
+    condition_codes = np.asarray(index.codes[0], dtype=np.int64)
+    construct_codes = np.asarray(index.codes[1], dtype=np.int64)
+    flat_position = (
+        (condition_codes * len(constructs) + construct_codes) * num_replicates
+        + index.get_level_values("replicate").to_numpy() - 1)
+    reordered = np.full(
+        (len(values), len(conditions) * len(constructs) * num_replicates),
+        np.nan)
+    reordered[:, flat_position[keep]] = values[:, keep]
+    return (reordered.reshape(len(values), len(conditions), -1),
+            conditions, constructs)
+
+
+def replicate_statistics(names, values, num_replicates,
+                         background_keyword=None, mask=None):
+    """Calculates mean, standard deviation and number of replicates for all
+    constructs in all conditions at all time points at once.
+
+    If background_keyword is given, the mean of all columns whose construct
+    contains the keyword is subtracted from the means and the standard
+    deviations are propagated as sqrt(stdev**2 + bg_stdev**2).
+
+    Values masked as outliers are left out of all statistics.
+
+    Returns a tuple (means, stdevs, counts, conditions, constructs) where the
+    first three are arrays of shape (time points, conditions, constructs).
+    """
+    values = masked(values, mask)
+    index = column_index(names)
+    keep = kept_replicates(index, num_replicates)
+    conditions = list(index.levels[0])
+    constructs = list(index.levels[1])
+    grouped = pd.DataFrame(values[:, keep].T, index=index[keep]).groupby(
+        level=["condition", "construct"], observed=False, sort=True)
+    shape = (len(conditions), len(constructs), len(values))
+    means = grouped.mean().to_numpy().reshape(shape).transpose(2, 0, 1)
+    stdevs = grouped.std().to_numpy().reshape(shape).transpose(2, 0, 1)
+    counts = grouped.count().to_numpy().reshape(shape).transpose(2, 0, 1)
+
+    if background_keyword is not None:
+        is_background = np.array([
+            background_keyword in construct
+            for construct in index.get_level_values("construct")],
+            dtype=bool)
+        if not is_background.any():
+            raise ValueError("No background constructs containing "
+                             + f"'{background_keyword}' found.")
+        logger.debug("Added {} to background constructs.".format(", ".join(
+            index[is_background].get_level_values("construct").unique())))
+        bg_mean = np.nanmean(values[:, is_background], axis=1)
+        bg_stdev = np.nanstd(values[:, is_background], axis=1, ddof=1)
+        means = means - bg_mean[:, None, None]
+        stdevs = np.sqrt(stdevs**2 + bg_stdev[:, None, None]**2)
+    return means, stdevs, counts, conditions, constructs
+
+
+def check_conditions_share_constructs(counts, conditions):
+    """Raises a ValueError if not all conditions contain the same constructs.
+    counts is an array of shape (conditions, constructs) as returned by
+    replicate_statistics for a single time point.
+    """
+    constructs_per_condition = np.count_nonzero(counts, axis=1)
+    for condition, num_constructs in zip(conditions,
+                                         constructs_per_condition):
+        if num_constructs != constructs_per_condition[0]:
+            error_msg = "The condition {0} contained {1} constructs, but " \
+                "parents contain {2}".format(
+                    condition, num_constructs, constructs_per_condition[0])
+            logger.critical(error_msg)
+            raise ValueError(error_msg)
+
+
+def assemble_headline(constructs, cells_per_construct):
+    return constants.SEP + "".join(
+        construct + cells_per_construct * constants.SEP
+        for construct in constructs) + "\n"
+
+
+def format_reordered_time_point(reordered_time_point, conditions, constructs,
+                                num_replicates):
+    """Returns a single reordered time point as Excel CSV string with
+    conditions as rows and construct replicates as columns.
+    """
+    to_write = [assemble_headline(constructs, num_replicates)]
+    for condition, row in zip(conditions, constants.format_numbers(
+            reordered_time_point, missing="")):
+        to_write.append(condition + constants.SEP + "".join(
+            cell + constants.SEP for cell in row) + "\n")
+    return "".join(to_write)
+
+
+def format_statistics_time_point(means, stdevs, counts, conditions,
+                                 constructs):
+    """Returns the replicate statistics of a single time point as Excel CSV
+    string. Every construct is written as three columns in the form
+    (mean, standard deviation, number of replicates).
+    """
+    to_write = [assemble_headline(constructs, 3)]
+    means = constants.format_numbers(means, missing="")
+    stdevs = constants.format_numbers(stdevs, missing="")
+    for condition, row in zip(conditions, zip(means, stdevs, counts)):
+        to_write.append(condition + constants.SEP + "".join(
+            constants.SEP.join((val_mean, val_stdev, str(int(val_num_rep))))
+            + constants.SEP
+            for val_mean, val_stdev, val_num_rep in zip(*row)) + "\n")
+    return "".join(to_write)
+
+
+def reorder_single_point(in_file, num_replicates, timepoint_idx=4,
+                         background_keyword=None, mask=None):
+    """Reorders a single time point of a merged data file.
+    Returns the reordered Excel CSV as string. If background_keyword is
+    given, the output contains background corrected replicate statistics in
+    the form (mean, standard deviation, number of replicates) instead of the
+    replicate values. mask is an outlier mask of the whole file.
+    """
+    return build_single_point_table(
+        in_file, num_replicates, timepoint_idx, background_keyword, mask)[0]
+
+
+def write_reordered_single_point(in_file, num_replicates, timepoint_idx=4,
+                                 background_keyword=None, mask=None):
+    """Reorders a single time point of a merged data file and writes it next
+    to in_file as "_reordered.csv" or, with a background_keyword,
+    "_reordered_and_bg_corrected.csv".
+    Returns a tuple (output_file, constructs).
+    """
+    to_write, _, constructs = build_single_point_table(
+        in_file, num_replicates, timepoint_idx, background_keyword, mask)
+    output_file = os.path.splitext(in_file)[0] + "_reordered"
+    if background_keyword is not None:
+        output_file += "_and_bg_corrected"
+    output_file += ".csv"
+    with open(output_file, "w") as out:
+        out.write(to_write)
+    return output_file, constructs
+
+
+def build_single_point_table(in_file, num_replicates, timepoint_idx=4,
+                             background_keyword=None, mask=None):
+    """Returns a tuple (to_write, conditions, constructs) where to_write is
+    the reordered Excel CSV of a single time point as described in
+    reorder_single_point.
+    """
+    names, _, _, values = read_time_point(in_file, timepoint_idx)
+    if mask is not None:
+        values = masked(values, mask[timepoint_idx - 1:timepoint_idx])
+    if background_keyword is not None:
+        means, stdevs, counts, conditions, constructs = replicate_statistics(
+            names, values, num_replicates, background_keyword)
+        check_conditions_share_constructs(counts[0], conditions)
+        to_write = format_statistics_time_point(
+            means[0], stdevs[0], counts[0], conditions, constructs)
+    else:
+        reordered, conditions, constructs = reorder_time_points(
+            names, values, num_replicates)
+        counts = np.count_nonzero(~np.isnan(reordered[0].reshape(
+            len(conditions), len(constructs), num_replicates)), axis=2)
+        check_conditions_share_constructs(counts, conditions)
+        to_write = format_reordered_time_point(
+            reordered[0], conditions, constructs, num_replicates)
+    logger.info("Reordered data from {0}. Captured the conditions {1}".format(
+        os.path.basename(in_file), ", ".join(conditions)))
+    return to_write, conditions, constructs
+
+
+def reorder_all_time_points(in_file, num_replicates, long_format=False,
+                            background_keyword=None, mask=None):
+    """Reorders every time point of a merged data file after reading it once.
+    Writes one "_reordered_cycle<N>.csv" file per time point or, if
+    long_format is set, a single "_reordered_long.csv" file with one value per
+    row. With a background_keyword, background corrected replicate statistics
+    are written instead of the replicate values. Values for which the
+    outlier mask is True are left out. Returns the list of written files.
+    """
+    names, cycles, times, values = read_merged_file(in_file)
+    values = masked(values, mask)
+    output_base = os.path.splitext(in_file)[0] + "_reordered"
+    if background_keyword is not None:
+        output_base += "_and_bg_corrected"
+        means, stdevs, counts, conditions, constructs = replicate_statistics(
+            names, values, num_replicates, background_keyword)
+    else:
+        reordered, conditions, constructs = reorder_time_points(
+            names, values, num_replicates)
+
+    if long_format:
+        output_file = output_base + "_long.csv"
+        if background_keyword is not None:
+            write_statistics_long_format(output_file, cycles, times, means,
+                                         stdevs, counts, conditions,
+                                         constructs)
+        else:
+            write_long_format(output_file, cycles, times, reordered,
+                              conditions, constructs, num_replicates)
+        written_files = [output_file]
+    else:
+        written_files = []
+        for time_idx, cycle in enumerate(cycles):
+            output_file = "{0}_cycle{1}.csv".format(output_base, int(cycle))
+            if background_keyword is not None:
+                to_write = format_statistics_time_point(
+                    means[time_idx], stdevs[time_idx], counts[time_idx],
+                    conditions, constructs)
+            else:
+                to_write = format_reordered_time_point(
+                    reordered[time_idx], conditions, constructs,
+                    num_replicates)
+            with open(output_file, "w") as out:
+                out.write(to_write)
+            written_files.append(output_file)
+    logger.info("Reordered {0} time points from {1}. Captured the conditions "
+                "{2}".format(len(cycles), in_file, ", ".join(conditions)))
+    return written_files
+
+
+def write_long_format(output_file, cycles, times, reordered, conditions,
+                      constructs, num_replicates):
+    """Writes a reordered array as returned from reorder_time_points with one
+    value per row.
+    """
+    with open(output_file, "w") as out:
+        out.write(constants.SEP.join((
+            "cycle", "time", "condition", "construct", "replicate", "value"))
+            + "\n")
+        cycles_and_times = [
+            constants.SEP.join((str(int(cycle)), time)) for cycle, time
+            in zip(cycles, constants.format_numbers(times))]
+        values = constants.format_numbers(reordered)
+        for time_idx, cond_idx, col_idx in zip(
+                *np.nonzero(~np.isnan(reordered))):
+            out.write(constants.SEP.join((
+                cycles_and_times[time_idx], conditions[cond_idx],
+                constructs[col_idx // num_replicates],
+                str(col_idx % num_replicates + 1),
+                values[time_idx, cond_idx, col_idx])) + "\n")
+
+
+def write_statistics_long_format(output_file, cycles, times, means, stdevs,
+                                 counts, conditions, constructs):
+    """Writes replicate statistics as returned from replicate_statistics
+    with one construct and condition per row.
+    """
+    with open(output_file, "w") as out:
+        out.write(constants.SEP.join((
+            "cycle", "time", "condition", "construct", "mean", "stdev", "n"))
+            + "\n")
+        cycles_and_times = [
+            constants.SEP.join((str(int(cycle)), time)) for cycle, time
+            in zip(cycles, constants.format_numbers(times))]
+        means = constants.format_numbers(means, missing="")
+        stdevs = constants.format_numbers(stdevs, missing="")
+        for idx in zip(*np.nonzero(counts)):
+            time_idx, cond_idx, constr_idx = idx
+            out.write(constants.SEP.join((
+                cycles_and_times[time_idx], conditions[cond_idx],
+                constructs[constr_idx], means[idx], stdevs[idx],
+                str(int(counts[idx])))) + "\n")
+
+
 if __name__ != "__main__":
-    print("\tInitialized data reorganization functionality.")
+    constants.announce("Initialized data reorganization functionality.")
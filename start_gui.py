@@ -11,25 +11,17 @@ __author__ = "Christian Rauch"
 
 
 if __name__ == "__main__":
-    print("Starting Robot Data Analysis Software version", __version__, "\n")
-    print("Loading Python internal modules...")
+    import time
+    start_time = time.perf_counter()
     import os
     import logging
-    from statistics import mean, stdev
-    print("\tDone.\n")
-    print("Loading Graphical Interface...")
+    import importlib
     import tkinter as tk
     import tkinter.font as tkFont
     from tkinter import ttk
-    from tkinter.filedialog import askdirectory, askopenfilename
     # from PIL import ImageTk, Image
-    print("\tDone.\n")
-    print("Loading additional software packages...")
     import constants
-    import raw_data
-    import reorder
-    import dose_response
-    print("\tDone.\n")
+    import_time = time.perf_counter() - start_time
 
 
 # Initialize logger.
@@ -38,6 +30,15 @@ logger = constants.setup_logger(
     logger_name=__name__
 )
 
+# Notebook pages as (tab text, module, widget class). The module of a page is
+# imported and its widget built when the page is selected for the first time.
+TABS = [
+    ("Raw Data", "raw_data", "GUIRawDataProcessing"),
+    ("Re-order", "reorder", "GUIReorderForSinglePointAnalysis"),
+    ("Dose Response", "dose_response", "GUIDoseResponseGUI"),
+    ("Deconvolution", "deconvolution", "IntegrateDeconvolutionAlgorithm"),
+]
+
 
 class MainApplication(tk.Frame):
     def __init__(self, parent, *args, **kwargs):
@@ -46,16 +47,24 @@ class MainApplication(tk.Frame):
         self.parent.title("OCUTaF {}".format(__version__))
         self.remove_quotation_marks = tk.BooleanVar()
         self.remove_quotation_marks.set(True)
+        self.profile_runs = tk.BooleanVar()
+        self.profile_runs.set(False)
+        self.exclude_outliers = tk.BooleanVar()
+        self.exclude_outliers.set(True)
 
         InsertTopBar(self, self.parent)
 
         self.nb = ttk.Notebook(parent)
         self.nb.grid()
-        # Register main widgets as notebook pages.
-        raw_data.GUIRawDataProcessing(self, self.parent)
-        reorder.GUIReorderForSinglePointAnalysis(self, self.parent)
-        dose_response.GUIDoseResponseGUI(self, self.parent)
-        # deconvolution.IntegrateDeconvolutionAlgorithm(self, self.parent)
+        # Register placeholders for the main widgets as notebook pages.
+        self.placeholders = {}
+        for text, module_name, class_name in TABS:
+            placeholder = tk.Frame(parent)
+            tk.Label(placeholder, text="Loading...").grid(padx=50, pady=50)
+            self.nb.add(placeholder, text=text)
+            self.placeholders[str(placeholder)] = (module_name, class_name)
+        self.nb.bind("<<NotebookTabChanged>>", self.build_selected_tab)
+        self.parent.after_idle(self.build_selected_tab)
 
         self.copyright = tk.Label(
             self.parent,
@@ -83,6 +92,24 @@ class MainApplication(tk.Frame):
             )
         )
 
+    def build_selected_tab(self, event=None):
+        """Replaces the placeholder of the selected page by its widget."""
+        placeholder = self.nb.select()
+        if placeholder not in self.placeholders:
+            return
+        module_name, class_name = self.placeholders.pop(placeholder)
+        start_time = time.perf_counter()
+        module = importlib.import_module(module_name)
+        # The widget adds its frame as the last page. Move it to the place of
+        # the placeholder before removing the placeholder.
+        getattr(module, class_name)(self, self.parent)
+        page = self.nb.tabs()[-1]
+        self.nb.insert(placeholder, page)
+        self.nb.select(page)
+        self.nb.forget(placeholder)
+        logger.info(f"Built page {class_name} in "
+                    + f"{time.perf_counter() - start_time:.3f} s.")
+
     def end_app(self):
         self.parent.destroy()
 
@@ -100,16 +127,24 @@ class InsertTopBar:
 
     def add_optionmenu(self):
         optionmenu = tk.Menu(self.menubar, tearoff=0)
-        optionmenu.add_command(
-            label="dummy",
-            command=lambda: None
-        )
         optionmenu.add_checkbutton(
             label="Remove double quotation marks from input CSV files",
             onvalue=True,
             offvalue=False,
             variable=self.parent.remove_quotation_marks
         )
+        optionmenu.add_checkbutton(
+            label="Profile raw data runs (cProfile)",
+            onvalue=True,
+            offvalue=False,
+            variable=self.parent.profile_runs
+        )
+        optionmenu.add_checkbutton(
+            label="Leave out flagged outliers in summaries and reorder",
+            onvalue=True,
+            offvalue=False,
+            variable=self.parent.exclude_outliers
+        )
         self.menubar.add_cascade(label="Options", menu=optionmenu)
 
     def add_helpmenu(self):
@@ -153,6 +188,13 @@ class InsertTopBar:
 if __name__ == "__main__":
     root = tk.Tk()
     MainApplication(root).grid()
+    root.update()
+    startup_report = (
+        f"Started Robot Data Analysis Software version {__version__} in "
+        + f"{time.perf_counter() - start_time:.2f} s (imports "
+        + f"{import_time:.2f} s).")
+    print(startup_report)
+    logger.info(startup_report)
     logger.info("Started GUI session.")
     root.mainloop()
     logger.info("Ended GUI session.")
@@ -0,0 +1,333 @@
+"""Synthetic raw data for tests and benchmarks.
+
+Writes plate reader exports in the formats read by raw_data.py, together
+with matching name files and dose-response curve CSVs:
+
+    .asc   (TECAN robot)    <prefix>_<barcode>_<cycle>.asc per plate and cycle
+    .xlsx  (TECAN reader)   <barcode>.xlsx with one "SheetX" per cycle
+    .xls   (Hamilton robot) BC<barcode>_P4_<cycle>.xls per plate and cycle,
+                            only if the optional xlwt package is installed
+
+Every plate holds seven constructs in triplicates at the inducer
+concentrations of CONCENTRATIONS, medium wells and the blank wells
+H10-H12. The OD follows a logistic growth curve and the reporters follow
+the OD times a Hill function of the inducer concentration after the
+induction time. Values carry multiplicative noise from a seeded random
+generator, so that the same arguments always produce the same files.
+"""
+
+import os
+import datetime
+import logging
+import importlib.util
+
+import numpy as np
+
+import constants
+
+# Optional dependencies, only imported when files of their format are written.
+openpyxl = constants.lazy_import("openpyxl")
+xlwt = constants.lazy_import("xlwt")
+
+
+# Initialize logger.
+logger = constants.setup_logger(
+    log_level=logging.DEBUG,
+    logger_name=__name__
+)
+
+HAS_XLWT = importlib.util.find_spec("xlwt") is not None
+RAW_DATA_FORMATS = ("asc", "xlsx", "xls") if HAS_XLWT else ("asc", "xlsx")
+
+ROWS = "ABCDEFGH"
+COLUMNS = range(1, 12 + 1)
+WELLS = [row + str(column) for row in ROWS for column in COLUMNS]
+ASC_WELLS = [row + str(column) for column in COLUMNS for row in ROWS]
+BLANK_WELLS = ("H10", "H11", "H12")
+MEDIUM_WELLS = ("E10", "E11", "E12", "F10", "F11", "F12", "G10", "G11",
+                "G12")
+
+CONCENTRATIONS = (0, 5, 50, 500)  # Inducer concentrations in uM.
+NUM_REPLICATES = 3
+CONSTRUCTS_PER_PLATE = 7
+BARCODE_BASE = 2018120400
+ASC_PREFIX = "SYN_P1_"
+XLSX_MAX_CYCLES = 9  # The reader takes the cycle from the last character.
+START_TIME = datetime.datetime(2018, 12, 4, 12, 0, 0)
+EXCEL_EPOCH = datetime.datetime(1899, 12, 30)
+CYCLE_MINUTES = 20
+TEMPERATURE = 25.0
+
+# Model of the signals.
+OD_BLANK = 0.04
+OD_START = 0.01
+OD_CAPACITY = 1.2
+GROWTH_RATE = 0.012  # Per minute.
+REPORTER_BLANK = 150
+INDUCTION_TIME = 220  # Minutes, as dose_response.INDUCTION_TIME_IN_MIN.
+BASAL_ACTIVITY = 0.05
+HILL_CONSTANT = 50  # uM
+HILL_COEFFICIENT = 1.5
+NOISE = 0.03
+
+
+def barcode_of(plate):
+    return str(BARCODE_BASE + plate)
+
+
+def condition_name(concentration):
+    return f"{concentration} uM"
+
+
+def concentration_of(well):
+    return CONCENTRATIONS[ROWS.index(well[0]) % len(CONCENTRATIONS)]
+
+
+def construct_indices():
+    """Returns the index of the construct of every well in the order of
+    WELLS. Every three columns hold the replicates of one construct, the
+    constructs of rows A-D are counted before those of rows E-H.
+    """
+    return np.array([ROWS.index(well[0]) // len(CONCENTRATIONS)
+                     * len(COLUMNS) // NUM_REPLICATES
+                     + (int(well[1:]) - 1) // NUM_REPLICATES
+                     for well in WELLS])
+
+
+def plate_layout(plate):
+    """Returns the names of the wells of a plate in the order of WELLS.
+    Rows A-D and E-H hold the concentrations of CONCENTRATIONS.
+    """
+    names = [f"SYN{plate:02d} c{construct + 1}, "
+             + f"{condition_name(concentration_of(well))} IPTG"
+             for construct, well in zip(construct_indices(), WELLS)]
+    for well in MEDIUM_WELLS:
+        names[WELLS.index(well)] = "medium"
+    for well in BLANK_WELLS:
+        names[WELLS.index(well)] = "blank"
+    return names
+
+
+def well_concentrations():
+    """Returns the inducer concentration of every well in the order of
+    WELLS. Medium and blank wells are NaN.
+    """
+    concentrations = np.array([concentration_of(well) for well in WELLS],
+                              dtype=float)
+    concentrations[[WELLS.index(well)
+                    for well in MEDIUM_WELLS + BLANK_WELLS]] = np.nan
+    return concentrations
+
+
+def cycle_times(cycles):
+    """Returns the times of the cycles in minutes."""
+    return np.arange(cycles) * CYCLE_MINUTES
+
+
+def growth(times):
+    """OD of the cells (without the blank) of a logistic growth curve."""
+    return OD_CAPACITY / (
+        1 + (OD_CAPACITY / OD_START - 1) * np.exp(-GROWTH_RATE * times))
+
+
+def activity(times, concentrations):
+    """Promoter activity of shape (time, well) relative to full induction."""
+    concentrations = np.nan_to_num(concentrations)
+    induced = BASAL_ACTIVITY + (1 - BASAL_ACTIVITY) * (
+        concentrations ** HILL_COEFFICIENT
+        / (HILL_CONSTANT ** HILL_COEFFICIENT
+           + concentrations ** HILL_COEFFICIENT))
+    return np.where(np.asarray(times)[:, None] < INDUCTION_TIME,
+                    BASAL_ACTIVITY, induced)
+
+
+def plate_signals(plate, cycles, num_reporters=1, seed=0):
+    """Returns the times in minutes, the OD of shape (cycle, well) and the
+    reporter values of shape (reporter, cycle, well) of a plate, with wells
+    in the order of WELLS.
+    """
+    rng = np.random.default_rng([seed, plate])
+    times = cycle_times(cycles)
+    concentrations = well_concentrations()
+    has_cells = ~np.isnan(concentrations)
+    cells = np.outer(growth(times), has_cells)
+    constructs = construct_indices()
+    strengths = rng.uniform(
+        500, 20000, (num_reporters, constructs.max() + 1))[:, constructs]
+    od = (OD_BLANK + cells) * rng.normal(1, NOISE, cells.shape)
+    reporters = (REPORTER_BLANK + strengths[:, None, :]
+                 * activity(times, concentrations) * cells) \
+        * rng.normal(1, NOISE, (num_reporters,) + cells.shape)
+    return times, od, reporters
+
+
+def measurement_time(minutes):
+    return START_TIME + datetime.timedelta(minutes=float(minutes))
+
+
+def write_name_file(path, plate):
+    """Writes the name file of a plate as CSV separated by constants.SEP."""
+    names = plate_layout(plate)
+    with open(path, "w") as out:
+        out.write(constants.SEP.join([""] + [str(column)
+                                             for column in COLUMNS]) + "\n")
+        for row_idx, row in enumerate(ROWS):
+            row_names = names[row_idx * len(COLUMNS):
+                              (row_idx + 1) * len(COLUMNS)]
+            out.write(constants.SEP.join([row] + row_names) + "\n")
+
+
+def write_asc_plate(directory, barcode, times, od, reporters,
+                    reporter_names):
+    """Writes one .asc file per cycle with CRLF line endings, as written by
+    the TECAN robot. Only the first reporter is read by get_raw_data_asc.
+    """
+    order = [WELLS.index(well) for well in ASC_WELLS]
+    for cycle, minutes in enumerate(times):
+        od_cells = constants.format_numbers(np.round(od[cycle, order], 4))
+        reporter_cells = constants.format_numbers(
+            np.rint(reporters[:, cycle, order]).astype(int))
+        lines = ["\t".join(["Well positions", "OD"] + list(reporter_names))
+                 + "\t"]
+        lines += ["\t".join([well, od_cell] + list(cells)) + "\t"
+                  for well, od_cell, *cells
+                  in zip(ASC_WELLS, od_cells, *reporter_cells)]
+        # The degree sign of the instrument is left out, so that the files
+        #  can be read with any default encoding.
+        lines += ["Synthetic data", f"Barcode: {barcode}"]
+        lines += [f"Meas. temperature: {label}: {TEMPERATURE} C"
+                  for label in ["OD"] + list(reporter_names)]
+        lines.append(f"Date: {measurement_time(minutes):%Y-%m-%d}, "
+                     + f"Time: {measurement_time(minutes):%H:%M:%S}")
+        path = os.path.join(directory,
+                            f"{ASC_PREFIX}{barcode}_{cycle}.asc")
+        with open(path, "w", newline="\r\n") as out:
+            out.write("\n".join(lines) + "\n")
+
+
+def write_xlsx_plate(directory, barcode, times, od, reporters,
+                     reporter_names):
+    """Writes an Excel workbook with one sheet "SheetX" per cycle X
+    (starting at 1), as exported by the TECAN reader. Every sheet holds the
+    start time and one labeled block of wells and values per channel.
+    """
+    if len(times) > XLSX_MAX_CYCLES:
+        raise ValueError(f"Excel exports support at most {XLSX_MAX_CYCLES} "
+                         + f"cycles, not {len(times)}.")
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    channels = [("OD600", od, 4)] + [
+        (name, values, 0) for name, values in zip(reporter_names, reporters)]
+    for cycle, minutes in enumerate(times):
+        sheet = workbook.create_sheet(f"Sheet{cycle + 1}")
+        sheet.append(["Start Time:",
+                      f"{measurement_time(minutes):%d.%m.%Y %H:%M:%S}"])
+        for label, values, decimals in channels:
+            sheet.append([f"Label: {label}"])
+            sheet.append(["Well", "Value"])
+            for well, value in zip(WELLS, values[cycle]):
+                sheet.append([well, round(float(value), decimals)])
+            sheet.append([])
+    workbook.save(os.path.join(directory, f"{barcode}.xlsx"))
+
+
+def write_xls_plate(directory, barcode, times, od, reporters,
+                    reporter_names):
+    """Writes one Excel 97 workbook per cycle, as written by the Hamilton
+    robot: the time in days in H2, OD and the first reporter in C2:C97 and
+    D2:D97. Requires the optional xlwt package.
+    """
+    if not HAS_XLWT:
+        raise ImportError("Writing Hamilton .xls files requires xlwt.")
+    for cycle, minutes in enumerate(times):
+        workbook = xlwt.Workbook()
+        sheet = workbook.add_sheet("Sheet1")
+        for column, title in enumerate(
+                ["", "Well", "OD", reporter_names[0], "", "", "", "Time"]):
+            sheet.write(0, column, title)
+        sheet.write(1, 7, (measurement_time(minutes) - EXCEL_EPOCH)
+                    / datetime.timedelta(days=1))
+        for row, well in enumerate(WELLS, start=1):
+            sheet.write(row, 1, well)
+            sheet.write(row, 2, round(float(od[cycle, row - 1]), 4))
+            sheet.write(row, 3, round(float(reporters[0, cycle, row - 1])))
+        workbook.save(os.path.join(directory,
+                                   f"BC{barcode}_P4_{cycle}.xls"))
+
+
+FORMAT_WRITERS = {
+    "asc": write_asc_plate,
+    "xlsx": write_xlsx_plate,
+    "xls": write_xls_plate,
+}
+
+
+def generate_run(raw_data_dir, plates=1, cycles=10, reporter_names=("lux",),
+                 raw_format="asc", name_file_dir=None, seed=0):
+    """Writes the raw data of a run of plates with cycles measurements each
+    in raw_format to raw_data_dir and, if given, one name file per plate to
+    name_file_dir. Returns a dictionary mapping the barcodes to the paths
+    of their name files (None without name_file_dir).
+    """
+    if raw_format not in RAW_DATA_FORMATS:
+        raise ValueError(f"Cannot write raw data format {raw_format}. "
+                         + "Available formats: "
+                         + ", ".join(RAW_DATA_FORMATS) + ".")
+    name_files = {}
+    for plate in range(1, plates + 1):
+        barcode = barcode_of(plate)
+        times, od, reporters = plate_signals(
+            plate, cycles, len(reporter_names), seed)
+        FORMAT_WRITERS[raw_format](raw_data_dir, barcode, times, od,
+                                   reporters, reporter_names)
+        name_files[barcode] = None
+        if name_file_dir is not None:
+            name_files[barcode] = os.path.join(name_file_dir,
+                                               f"names_{barcode}.csv")
+            write_name_file(name_files[barcode], plate)
+    logger.info(f"Wrote {plates} synthetic plate(s) with {cycles} cycle(s) "
+                + f"as .{raw_format} files to {raw_data_dir}.")
+    return name_files
+
+
+def write_curve_file(path, times, values):
+    """Writes a dose-response curve CSV as read by dose_response.py from the
+    values of shape (time, condition, replicate) for CONCENTRATIONS.
+    """
+    header = ["time"]
+    for concentration in CONCENTRATIONS:
+        header += [condition_name(concentration)] + [""] * (
+            values.shape[2] - 1)
+    rows = constants.format_numbers(np.column_stack(
+        [times, np.round(values.reshape(len(times), -1), 1)]))
+    with open(path, "w") as out:
+        out.write(constants.SEP.join(header) + "\n")
+        out.writelines(constants.SEP.join(row) + "\n" for row in rows)
+
+
+def generate_curves(curve_dir, plates=1, cycles=10, seed=0):
+    """Writes the dose-response curve of every construct of plates with
+    cycles measurements to curve_dir. Returns the written paths.
+    """
+    paths = []
+    for plate in range(1, plates + 1):
+        times, _, reporters = plate_signals(plate, cycles, 1, seed)
+        names = plate_layout(plate)
+        by_construct = {}
+        for well_idx, name in enumerate(names):
+            if name not in ("medium", "blank"):
+                construct, condition = constants.split_name(name)
+                by_construct.setdefault(construct, {}).setdefault(
+                    condition, []).append(reporters[0, :, well_idx])
+        for construct, conditions in by_construct.items():
+            values = np.stack([np.column_stack(replicates)
+                               for replicates in conditions.values()], axis=1)
+            path = os.path.join(curve_dir,
+                                construct.replace(" ", "_") + ".csv")
+            write_curve_file(path, times, values)
+            paths.append(path)
+    return paths
+
+
+if __name__ != "__main__":
+    constants.announce("Initialized synthetic data generator.")
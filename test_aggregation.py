@@ -0,0 +1,58 @@
+import os
+import math
+import unittest
+import tempfile
+
+import numpy as np
+
+import aggregation as module
+from test_reorder import MERGED_FILE_CONTENT
+
+
+class TestAggregation(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.merged_file = os.path.join(self.tmp_dir.name, "all_OD.csv")
+        with open(self.merged_file, "w") as out:
+            out.write(MERGED_FILE_CONTENT)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_group_columns(self):
+        groups, codes = module.group_columns(
+            ["pB, 5 uM", "pA, 0 uM", "pB, 5 uM.1", "pA"])
+        self.assertEqual(groups, [("pB", "5 uM"), ("pA", "0 uM"), ("pA", "")])
+        np.testing.assert_array_equal(codes, [0, 1, 0, 2])
+
+    def test_replicate_summary(self):
+        names = ["a, 1", "b, 1", "a, 1.1", "a, 1.2", "c, 1"]
+        values = np.array([[1.0, 5.0, 2.0, 3.0, np.nan],
+                           [2.0, 6.0, np.nan, 4.0, np.nan]])
+        groups, statistics = module.replicate_summary(names, values)
+        self.assertEqual(groups, [("a", "1"), ("b", "1"), ("c", "1")])
+        np.testing.assert_array_equal(statistics["N"], [[3, 1, 0], [2, 1, 0]])
+        np.testing.assert_allclose(statistics["mean"][:, :2],
+                                   [[2, 5], [3, 6]])
+        self.assertAlmostEqual(statistics["SD"][0, 0], 1)
+        self.assertAlmostEqual(statistics["SD"][1, 0], math.sqrt(2))
+        self.assertAlmostEqual(statistics["SEM"][0, 0], 1 / math.sqrt(3))
+        self.assertAlmostEqual(statistics["CV"][0, 0], 0.5)
+        self.assertTrue(np.isnan(statistics["SD"][:, 1:]).all())
+        self.assertTrue(np.isnan(statistics["mean"][:, 2]).all())
+
+    def test_aggregate_merged_file(self):
+        outfile = module.aggregate_merged_file(self.merged_file)
+        self.assertEqual(os.path.basename(outfile), "all_OD_summary.csv")
+        with open(outfile) as infile:
+            lines = infile.read().splitlines()
+        self.assertEqual(lines[0].split(";"), module.SUMMARY_COLUMNS)
+        self.assertEqual(len(lines), 1 + 4 * 3)
+        self.assertEqual(lines[1].split(";")[:6],
+                         ["pA", "0 uM", "0", "0,0", "2", "1,5"])
+        self.assertEqual(lines[4].split(";")[:6],
+                         ["pA", "5 uM", "0", "0,0", "2", "3,5"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import os
+import json
+import time
+import unittest
+import tempfile
+
+import constants
+import batch as module
+from test_reorder import MERGED_FILE_CONTENT
+from test_dose_response import CURVE_FILE_CONTENT
+
+
+def log_message(message):
+    module.logger.warning(message)
+    return os.getpid()
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.experiments = []
+        for experiment in ("exp1", "exp2"):
+            directory = os.path.join(self.tmp_dir.name, experiment)
+            os.mkdir(directory)
+            with open(os.path.join(directory, "all_relative_lux.csv"),
+                      "w") as out:
+                out.write(MERGED_FILE_CONTENT)
+            self.experiments.append(directory)
+        with open(os.path.join(self.experiments[1], "all_relative_gfp.csv"),
+                  "w") as out:
+            out.write("not a merged file\n")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_find_files(self):
+        files = module.find_files(self.experiments)
+        self.assertEqual(len(files), 3)
+        self.assertEqual(
+            module.find_files([os.path.join(self.tmp_dir.name, "*",
+                                            "all_relative_lux.csv")]),
+            [file for file in files if file.endswith("lux.csv")])
+
+    def test_batch_reorder(self):
+        for processes in (1, 2):
+            summary = module.batch_reorder(
+                self.experiments, num_replicates=2, timepoint_idx=1,
+                background_keyword="pB", processes=processes)
+            self.assertEqual(summary["files_processed"], 2)
+            self.assertEqual(summary["files_failed"], 1)
+            self.assertEqual(summary["constructs_captured"], 2)
+            self.assertIn("all_relative_gfp.csv",
+                          summary["failures"][0]["file"])
+        written = os.listdir(self.experiments[0])
+        self.assertIn("all_relative_lux_reordered.csv", written)
+        self.assertIn("all_relative_lux_reordered_and_bg_corrected.csv",
+                      written)
+        # Reorder outputs are not picked up by later runs.
+        self.assertEqual(len(module.find_files(self.experiments)), 3)
+
+    def test_main(self):
+        summary_file = os.path.join(self.tmp_dir.name, "summary.json")
+        exit_code = module.main([
+            "reorder", self.experiments[0], "--replicates", "2", "--timepoint", "1",
+            "--processes", "1", "--summary", summary_file,
+            "--exclude-outliers", "pointwise"])
+        self.assertEqual(exit_code, 0)
+        with open(summary_file) as infile:
+            summary = json.load(infile)
+        self.assertEqual(summary["files_processed"], 1)
+        self.assertEqual(summary["settings"]["outlier_method"], "pointwise")
+        self.assertIn("all_relative_lux_outliers.csv",
+                      os.listdir(self.experiments[0]))
+
+    def test_worker_logging(self):
+        message = f"Worker log test {time.time()}"
+        # The main process writes the records of the workers, here to a
+        #  temporary log file instead of the one in logs/.
+        file_handler = constants.get_shared_handler().file_handler
+        log_file = os.path.join(self.tmp_dir.name, constants.LOG_FILE)
+        with open(log_file, "a", encoding="utf-8") as log_stream:
+            stream = file_handler.setStream(log_stream)
+            try:
+                pids = module.run_in_pool(log_message, [(message,)] * 2,
+                                          processes=2)
+                self.assertNotIn(os.getpid(), pids)
+                for _ in range(50):
+                    with open(log_file, encoding="utf-8") as infile:
+                        if infile.read().count(message) == 2:
+                            break
+                    time.sleep(0.1)
+                else:
+                    self.fail("Worker records missing from the log file.")
+            finally:
+                file_handler.setStream(stream)
+
+    def test_batch_dose_response(self):
+        for directory, curve in ((self.experiments[1], "pB.csv"),
+                                 (self.experiments[1], "pA.csv"),
+                                 (self.experiments[0], "pA.csv")):
+            with open(os.path.join(directory, curve), "w") as out:
+                out.write(CURVE_FILE_CONTENT)
+        output_file = os.path.join(self.tmp_dir.name, "metrics.csv")
+        summary_file = os.path.join(self.tmp_dir.name, "summary.json")
+        exit_code = module.main([
+            "dose-response", *self.experiments, "--replicates", "2",
+            "--time-points", "300", "840", "--processes", "2",
+            "--output", output_file, "--summary", summary_file])
+        self.assertEqual(exit_code, 0)
+        with open(output_file) as infile:
+            lines = infile.read().splitlines()
+        self.assertEqual(lines[0], (
+            "Name;Mean Before Induction;Time Delay [min];"
+            + "Dynamic Range at t=300;Dynamic Range at t=840;File"))
+        self.assertEqual(
+            [line.split(";")[0] for line in lines[1:]], ["pA", "pA", "pB"])
+        self.assertEqual(lines[1], "pA;2;80;2,0;6,0;" + os.path.join(
+            self.experiments[0], "pA.csv"))
+        with open(summary_file) as infile:
+            self.assertNotIn("table", json.load(infile))
+
+    def test_write_summary(self):
+        summary_file = os.path.join(self.tmp_dir.name, "summary.json")
+        module.write_summary(
+            {"results": [{"metrics": ["pA", float("nan"), 80, float("inf")]}]},
+            summary_file)
+        with open(summary_file) as infile:
+            self.assertEqual(json.load(infile)["results"][0]["metrics"],
+                             ["pA", None, 80, None])
+
+
+if __name__ == "__main__":
+    unittest.main()
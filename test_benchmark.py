@@ -0,0 +1,48 @@
+import os
+import argparse
+import unittest
+import tempfile
+
+import benchmark as module
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_scale(self):
+        self.assertEqual(module.scale("4x25"), (4, 25))
+        self.assertEqual(module.scale("1X10"), (1, 10))
+        for text in ("4", "4x", "ax2", "0x10", "1x1"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                module.scale(text)
+
+    def test_compare(self):
+        baseline = {"results": {"1x10": {"merge": 1.0, "reorder": 0.01}}}
+        results = {"results": {
+            "1x10": {"merge": 1.3, "reorder": 0.05, "ingest": 5.0},
+            "4x25": {"merge": 9.0},
+        }}
+        regressions = module.compare(results, baseline)
+        # The reorder slowdown is below MIN_SLOWDOWN_S, new stages and
+        # scales have no reference.
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("merge at 1x10", regressions[0])
+        self.assertEqual(module.compare(results, baseline, tolerance=0.5), [])
+
+    def test_main(self):
+        working_dir = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = os.path.join(tmp_dir, "results.json")
+            self.assertEqual(module.main(
+                ["--scales", "1x3", "--repeats", "1", "--output", output]), 0)
+            self.assertEqual(os.getcwd(), working_dir)
+            results = module.read_results(output)
+            self.assertEqual(list(results["results"]), ["1x3"])
+            self.assertEqual(list(results["results"]["1x3"]),
+                             list(module.STAGES))
+            # Comparing with itself finds no regressions.
+            self.assertEqual(module.main(
+                ["--scales", "1x3", "--repeats", "1", "--output", output,
+                 "--baseline", output, "--tolerance", "100"]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,9 @@
+import os
 import unittest
+import tempfile
 
 import blank_and_name_handling as module
+import constants
 
 
 class TestBlankAndNameHandling(unittest.TestCase):
@@ -28,6 +31,23 @@ class TestBlankAndNameHandling(unittest.TestCase):
             module.process_well_input("")
         
 
+    def test_determine_shape_of_input_file(self):
+        # Reader results as exported from Excel end with an empty line after
+        #  the reporter block, which must not change the shape again.
+        header = "\t".join(["Cycle", "Time [min]", "Temp. [deg. C]"]
+                           + constants.col_names[3:])
+        rows = ["\t".join([str(cycle), str(20 * cycle), "30.0"]
+                          + ["0.1"] * 96) for cycle in range(3)]
+        lines = ["OD600", header] + rows + ["", "lux", header] + rows + [""]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "0_results.txt")
+            with open(path, "w") as file:
+                file.write("\n".join(lines) + "\n")
+            handler = module.DataHandler(path, ["H12"], False, False)
+            handler.determine_shape_of_input_file()
+        self.assertEqual(handler.lines_od, range(2, 6))
+        self.assertEqual(handler.lines_fu, range(8, 12))
+
     def test_get_wrappers(self):
         pass
 
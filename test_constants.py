@@ -0,0 +1,133 @@
+import io
+import os
+import sys
+import logging
+import unittest
+import tempfile
+from unittest import mock
+
+import numpy as np
+
+import constants
+
+
+class TestLogging(unittest.TestCase):
+    def test_setup_logger_shares_one_handler(self):
+        first = constants.setup_logger(logging.DEBUG, "test_constants.a")
+        second = constants.setup_logger(logging.DEBUG, "test_constants.b")
+        constants.setup_logger(logging.DEBUG, "test_constants.a")
+        self.assertEqual(first.handlers, [constants.get_shared_handler()])
+        self.assertEqual(first.handlers, second.handlers)
+        self.assertEqual(
+            constants.get_shared_handler().file_handler.baseFilename,
+            os.path.join(constants.LOG_DIR, constants.LOG_FILE))
+
+    def test_writable_log_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            blocked = os.path.join(tmp_dir, "file")
+            with open(blocked, "w"):
+                pass
+            log_dir = os.path.join(tmp_dir, "logs")
+            # A file in place of a directory cannot hold the log file.
+            self.assertEqual(
+                constants.writable_log_file((os.path.join(blocked, "logs"),
+                                             log_dir)),
+                os.path.join(log_dir, constants.LOG_FILE))
+            self.assertIsNone(constants.writable_log_file((blocked,)))
+
+    def test_log_level_from_environment(self):
+        with mock.patch.dict(os.environ,
+                             {constants.LOG_LEVEL_VARIABLE: "WARNING"}):
+            logger = constants.setup_logger(logging.DEBUG, "test_constants.c")
+        self.assertEqual(logger.level, logging.WARNING)
+        self.assertFalse(logger.isEnabledFor(logging.INFO))
+        for value, level in (("info", logging.INFO), ("20", logging.INFO),
+                             (" Error ", logging.ERROR),
+                             ("verbose", logging.DEBUG),
+                             ("", logging.DEBUG)):
+            with mock.patch.dict(os.environ,
+                                 {constants.LOG_LEVEL_VARIABLE: value}):
+                logger = constants.setup_logger(logging.DEBUG,
+                                                "test_constants.c")
+            self.assertEqual(logger.level, level, value)
+
+
+class TestNumberConversion(unittest.TestCase):
+    def test_parse_number_block(self):
+        block = constants.parse_number_block(
+            ["0;1,5;2;\n", "\n", "1;;3,25;4;\n"])
+        np.testing.assert_array_equal(
+            block, [[0, 1.5, 2, np.nan], [1, np.nan, 3.25, 4]])
+        np.testing.assert_array_equal(
+            constants.parse_number_block(["1,0\t2\t\n"], sep="\t"), [[1, 2]])
+        # Leading and trailing tabs do not shift the columns.
+        np.testing.assert_array_equal(
+            constants.parse_number_block(["\t0\t1,5\t\t\n", "1\t2,5\n"],
+                                         sep="\t"), [[0, 1.5], [1, 2.5]])
+        self.assertEqual(constants.parse_number_block([]).shape, (0, 0))
+
+    def test_format_numbers(self):
+        values = [[0, 1.5], [np.nan, 0.1 + 0.2]]
+        self.assertEqual(
+            constants.format_numbers(values).tolist(),
+            [[constants.num_to_str(value) for value in row]
+             for row in values])
+        self.assertEqual(
+            constants.format_numbers(np.array(values), missing="").tolist(),
+            [["0,0", "1,5"], ["", "0,30000000000000004"]])
+        self.assertEqual(constants.format_numbers([]).shape, (0,))
+
+
+class TestNames(unittest.TestCase):
+    def test_split_names(self):
+        self.assertEqual(constants.split_name(" pA, 0.5 "), ("pA", "0.5"))
+        self.assertEqual(
+            constants.split_names(["pA, 0.5", "pA, 0", "pA, 0.5.1",
+                                   "pA, 0.25", "pA, 0.5.2", "pB"]),
+            [("pA", "0.5"), ("pA", "0"), ("pA", "0.5"), ("pA", "0.25"),
+             ("pA", "0.5"), ("pB", "")])
+
+
+class TestOutputFiles(unittest.TestCase):
+    def test_is_output_file(self):
+        for file in ("all_relative_lux_reordered.csv", "all_OD.rows",
+                     "all_OD_summary.csv", "run/all_OD_smoothed.csv",
+                     "plate_promoter_activity.csv",
+                     "0_results_growth.csv"):
+            self.assertTrue(constants.is_output_file(file), file)
+        for file in ("all_relative_lux.csv", "summary/all_OD.csv"):
+            self.assertFalse(constants.is_output_file(file), file)
+
+
+class TestLazyImport(unittest.TestCase):
+    def test_lazy_import(self):
+        sys.modules.pop("colorsys", None)
+        colorsys = constants.lazy_import("colorsys")
+        self.assertIsInstance(colorsys, constants.LazyModule)
+        self.assertNotIn("colorsys", sys.modules)
+        self.assertEqual(colorsys.rgb_to_hsv(1, 0, 0), (0, 1, 1))
+        self.assertIn("colorsys", sys.modules)
+        self.assertIs(constants.lazy_import("colorsys"),
+                      sys.modules["colorsys"])
+
+    def test_missing_module_fails_on_first_use(self):
+        missing = constants.lazy_import("module_that_does_not_exist")
+        with self.assertRaises(ImportError):
+            missing.anything
+
+
+class TestAnnounce(unittest.TestCase):
+    def test_announce(self):
+        for value, expected in ((None, ""), ("0", ""), ("1", "\tHello\n")):
+            environment = {} if value is None \
+                else {constants.BANNER_VARIABLE: value}
+            with mock.patch.dict(os.environ, environment), \
+                    mock.patch("sys.stdout", new_callable=io.StringIO) as out:
+                if value is None:
+                    os.environ.pop(constants.BANNER_VARIABLE, None)
+                constants.announce("Hello")
+            self.assertEqual(out.getvalue(), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
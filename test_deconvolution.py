@@ -0,0 +1,68 @@
+import os
+import shutil
+import unittest
+import tempfile
+
+import numpy as np
+
+import deconvolution as module
+
+
+class TestDeconvolution(unittest.TestCase):
+    def setUp(self):
+        self.times = np.cumsum(np.r_[0, np.random.default_rng(0).uniform(
+            8, 12, 199)])
+        self.od = 0.05 * np.exp(0.005 * self.times)[:, np.newaxis]
+        self.activity = 1 + np.sin(self.times / 200)[:, np.newaxis]
+        production = self.activity * self.od
+        self.reporter = np.concatenate(([[0]], np.cumsum(
+            (production[1:] + production[:-1]) / 2
+            * np.diff(self.times)[:, np.newaxis], axis=0)))
+
+    def test_integration_matrix(self):
+        times = np.array([0, 1, 3, 4.0])
+        np.testing.assert_allclose(
+            module.integration_matrix(times) @ (2 * times),
+            times ** 2)
+
+    def test_regularized_derivative(self):
+        values = np.stack((self.times ** 2, 3 * self.times), axis=1)
+        derivative = module.regularized_derivative(
+            self.times, values, regularization=1e-6)
+        np.testing.assert_allclose(derivative[5:-5, 0],
+                                   2 * self.times[5:-5], rtol=1e-2)
+        np.testing.assert_allclose(derivative[:, 1], 3, rtol=1e-6)
+
+    def test_promoter_activity(self):
+        activity = module.promoter_activity(
+            self.times, self.od, self.reporter)
+        np.testing.assert_allclose(
+            activity[10:-10], self.activity[10:-10], atol=0.02)
+        degraded = module.promoter_activity(
+            self.times, self.od, self.reporter, degradation_rate=0.01)
+        np.testing.assert_allclose(
+            degraded - activity, 0.01 * self.reporter / self.od)
+        self.assertTrue(np.isnan(module.promoter_activity(
+            self.times, np.zeros_like(self.od), self.reporter)).all())
+
+    def test_deconvolve_files(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for file in ("SSC_P1_2018120401_results_OD_corrected.csv",
+                         "SSC_P1_2018120401_results_relative_mvenus_"
+                         + "corrected.csv"):
+                shutil.copy(os.path.join("test_data", file), tmp_dir)
+            pairs = module.find_file_pairs(tmp_dir)
+            self.assertEqual(len(pairs), 1)
+            outfile = module.deconvolve_files(*pairs[0])
+            self.assertEqual(
+                os.path.basename(outfile),
+                "SSC_P1_2018120401_results_relative_mvenus"
+                + "_promoter_activity.csv")
+            with open(outfile) as infile:
+                lines = infile.read().splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertEqual(lines[0].split(";")[:3], ["time", "A1", "A2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+import io
+import os
+import math
+import unittest
+import tempfile
+
+import numpy as np
+
+import dose_response as module
+
+
+CURVE_FILE_CONTENT = """time;0 uM;;500 uM;;
+0;1,0;1,0;1,0;1,0
+220;2,0;2,0;2,0;2,0
+300;2,0;2,0;3,0;5,0
+840;2,0;2,0;10,0;14,0
+1120;0,0;0,0;10,0;10,0
+"""
+
+
+class TestDoseResponseCurve(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.curve_file = os.path.join(self.tmp_dir.name, "pA.csv")
+        with open(self.curve_file, "w") as out:
+            out.write(CURVE_FILE_CONTENT)
+        self.curve = module.DoseResponseCurve(
+            self.curve_file, num_replicates=2)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_read_infile(self):
+        self.assertEqual(self.curve.name, "pA")
+        self.assertEqual(self.curve.conditions, ["0 uM", "500 uM"])
+        self.assertEqual(self.curve.condition_index["500 uM"], 1)
+        np.testing.assert_array_equal(
+            self.curve.times, [0, 220, 300, 840, 1120])
+        self.assertEqual(self.curve.values.shape, (5, 2, 2))
+        np.testing.assert_array_equal(self.curve.values[2, 1], [3, 5])
+
+    def test_unsorted_time_points(self):
+        lines = CURVE_FILE_CONTENT.splitlines(keepends=True)
+        with open(self.curve_file, "w") as out:
+            out.writelines([lines[0]] + lines[:0:-1])
+        curve = module.DoseResponseCurve(self.curve_file, num_replicates=2)
+        np.testing.assert_array_equal(curve.times, self.curve.times)
+        np.testing.assert_array_equal(curve.values, self.curve.values)
+
+    def test_missing_values(self):
+        with open(self.curve_file, "w") as out:
+            out.write("time;0 uM;;500 uM;;\n0;1,0;1,0;1,0\n")
+        with self.assertRaises(ValueError):
+            module.DoseResponseCurve(self.curve_file, num_replicates=2)
+
+    def test_mean_before_induction(self):
+        self.assertEqual(self.curve.mean_before_induction(), 2)
+
+    def test_time_delay(self):
+        self.assertEqual(self.curve.time_delay(), 80)
+        self.curve.ind_time = 1120
+        self.assertEqual(self.curve.time_delay(), -1)
+
+    def test_time_delays(self):
+        np.testing.assert_array_equal(self.curve.time_delays(), [-1, 80])
+        np.testing.assert_array_equal(
+            self.curve.time_delays(fold=1.5, conditions=["500 uM"],
+                                   interpolate=True), [40])
+
+    def test_threshold_crossing_times(self):
+        responses = np.array([[[0, 1, 3, 5], [0, 0, 0, 0]],
+                              [[4, 4, 4, 4], [0, 2, np.nan, 8]]])
+        delays = module.threshold_crossing_times(
+            [0, 10, 20, 30], responses, [[2], [4]], induction_time=5)
+        np.testing.assert_array_equal(delays, [[15, -1], [5, 25]])
+        delays = module.threshold_crossing_times(
+            [0, 10, 20, 30], responses, [[2], [4]], induction_time=5,
+            interpolate=True)
+        np.testing.assert_array_equal(delays, [[10, -1], [5, 25]])
+
+    def test_time_delays_of_many_curves(self):
+        other = module.DoseResponseCurve(
+            self.curve_file, num_replicates=2, induction_time=0)
+        delays, conditions = module.time_delays([self.curve, other])
+        self.assertEqual(conditions, ["0 uM", "500 uM"])
+        np.testing.assert_array_equal(delays, [[-1, 80], [220, 220]])
+        delays, _ = module.time_delays(
+            [self.curve, other], conditions=["500 uM", "1 mM"],
+            induction_time=220)
+        np.testing.assert_array_equal(delays, [[80, -1], [80, -1]])
+
+    def test_dynamic_range_at(self):
+        self.assertEqual(self.curve.dynamic_range_at(800), 6)
+        self.assertTrue(math.isnan(self.curve.dynamic_range_at(1120)))
+
+    def test_closest_time_idx(self):
+        np.testing.assert_array_equal(
+            self.curve.closest_time_idx([-5, 110, 111, 260, 5000]),
+            [0, 0, 1, 1, 4])
+        self.assertEqual(self.curve.closest_time_idx(300), 2)
+
+    def test_dynamic_range_profile(self):
+        profile = self.curve.dynamic_range_profile([300, 570, 840])
+        np.testing.assert_array_equal(profile, [2, 2, 6])
+        interpolated = self.curve.dynamic_range_profile(
+            [300, 570, 840], interpolate=True)
+        np.testing.assert_array_equal(interpolated, [2, 4, 6])
+        self.assertEqual(self.curve.dynamic_range_at(570, interpolate=True), 4)
+
+    def test_dynamic_range_profiles(self):
+        profiles = module.dynamic_range_profiles(
+            [self.curve, self.curve], [300, 840])
+        np.testing.assert_array_equal(profiles, [[2, 6], [2, 6]])
+        self.assertEqual(module.dynamic_range_profiles([], [300]).shape,
+                         (0, 1))
+
+    def test_metrics_are_invalidated(self):
+        self.assertEqual(self.curve.time_delay(), 80)
+        self.assertEqual(self.curve.dynamic_range_at(840), 6)
+        with self.assertRaises(ValueError):
+            self.curve.values[3, 1] = 0
+        values = self.curve.values.copy()
+        values[3, 1] = [4, 4]
+        self.curve.set_data(self.curve.times, values)
+        self.assertEqual(self.curve.dynamic_range_at(840), 2)
+        self.curve.ind_time = 0
+        self.assertEqual(self.curve.mean_before_induction(), 1)
+        self.assertEqual(self.curve.time_delay(), 220)
+
+    def test_apply_mask(self):
+        mask = np.zeros(self.curve.values.shape, dtype=bool)
+        mask[3, 1, 1] = True
+        self.curve.apply_mask(mask)
+        self.assertEqual(self.curve.dynamic_range_at(840), 5)
+        np.testing.assert_array_equal(
+            self.curve.mean_response("500 uM"), [1, 2, 4, 10, 10])
+
+    def test_write_csv(self):
+        out = io.StringIO()
+        module.write_csv([self.curve], out, sep="\t", time_points=[300, 840])
+        self.assertEqual(out.getvalue(), (
+            "Name\tMean Before Induction\tTime Delay [min]\t"
+            + "Dynamic Range at t=300\tDynamic Range at t=840\n"
+            + "pA\t2\t80\t2,0\t6,0\n"))
+        self.assertIn("Dynamic Range at t=1120",
+                      module.construct_csv([self.curve]))
+
+    def test_format_undefined_metrics(self):
+        self.assertEqual(
+            module.format_metrics(["pA", math.nan, 80, 2.004, math.nan]),
+            ["pA", "nan", "80", "2,0", "nan"])
+
+
+if __name__ == "__main__":
+    unittest.main()
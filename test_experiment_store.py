@@ -0,0 +1,67 @@
+import os
+import unittest
+import tempfile
+
+import experiment_store as module
+
+
+TEST_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         "test_data")
+TEST_NAME = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         "test_name", "plate1_as_tsv_as_csv.csv")
+
+
+def build_test_store():
+    base = os.path.join(TEST_DATA, "SSC_P1_2018120401_results")
+    return module.build_store([(
+        "2018120401",
+        TEST_NAME,
+        {
+            "OD": base + "_OD_corrected.csv",
+            "relative_mvenus": base + "_relative_mvenus_corrected.csv"
+        }
+    )])
+
+
+class TestExperimentStore(unittest.TestCase):
+    def setUp(self):
+        self.store = build_test_store()
+
+    def test_lookup_by_construct_and_condition(self):
+        selection = self.store.select("P02 eWT", "0 uM IPTG", "OD")
+        self.assertEqual(len(selection), 3 * 5)  # 3 replicates, 5 cycles
+        self.assertEqual(sorted(selection["well"].unique()),
+                         ["A1", "A2", "A3"])
+        self.assertEqual(sorted(selection["replicate"].unique()), [1, 2, 3])
+        self.assertAlmostEqual(
+            selection[(selection["well"] == "A1")
+                      & (selection["cycle"] == 0)]["value"].iloc[0],
+            0.01206)
+
+    def test_lookup_by_single_key(self):
+        # "no ECF" is used for six constructs in triplicates on both channels.
+        self.assertEqual(len(self.store.positions(condition="no ECF")),
+                         6 * 3 * 5 * 2)
+        self.assertEqual(len(self.store.positions(construct="unknown")), 0)
+        self.assertEqual(len(self.store.positions(condition="no ECF",
+                                                  channel="OD")), 6 * 3 * 5)
+        self.assertEqual(len(self.store.positions(channel="unknown")), 0)
+        self.assertNotIn("blank", self.store.constructs)
+
+    def test_replicates(self):
+        table = self.store.replicates("P02 eWT", "5 uM IPTG")
+        self.assertEqual(table.shape, (5, 3))
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "store.pkl")
+            self.store.save(path)
+            loaded = module.ExperimentStore.load(path)
+        self.assertEqual(len(loaded), len(self.store))
+        self.assertEqual(
+            list(loaded.positions("P02 eWT", "0 uM IPTG", "OD")),
+            list(self.store.positions("P02 eWT", "0 uM IPTG", "OD")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import unittest
+import tempfile
+
+import numpy as np
+
+import filters as module
+from test_reorder import MERGED_FILE_CONTENT
+
+
+class TestFilters(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.times = np.cumsum(rng.uniform(5, 15, 50))
+        self.values = np.stack((
+            3 + 2 * self.times - 0.01 * self.times ** 2,
+            np.sin(self.times / 50)), axis=1)
+
+    def test_smooth_keeps_polynomials(self):
+        np.testing.assert_allclose(
+            module.smooth(self.times, self.values[:, :1]),
+            self.values[:, :1])
+
+    def test_derivative_of_polynomial(self):
+        np.testing.assert_allclose(
+            module.derivative(self.times, self.values[:, :1])[:, 0],
+            2 - 0.02 * self.times)
+
+    def test_derivative_of_smooth_curve(self):
+        np.testing.assert_allclose(
+            module.derivative(self.times, self.values, window=5)[:, 1],
+            np.cos(self.times / 50) / 50, atol=1e-3)
+
+    def test_moving_average(self):
+        smoothed = module.smooth(np.arange(6.0), np.arange(6.0)[:, None] ** 2,
+                                 window=3, polyorder=0)
+        np.testing.assert_allclose(
+            smoothed[:, 0], [5 / 3, 5 / 3, 14 / 3, 29 / 3, 50 / 3, 50 / 3])
+
+    def test_invalid_polyorder(self):
+        with self.assertRaises(ValueError):
+            module.savgol_coefficients(self.times, window=3, polyorder=3)
+        with self.assertRaises(ValueError):
+            module.savgol_coefficients(self.times, polyorder=0, deriv=1)
+
+    def test_filter_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            merged_file = os.path.join(tmp_dir, "all_OD.csv")
+            with open(merged_file, "w") as out:
+                out.write(MERGED_FILE_CONTENT)
+            written = module.filter_file(merged_file, window=3, polyorder=1)
+            self.assertEqual(
+                [os.path.basename(file) for file in written],
+                ["all_OD_smoothed.csv", "all_OD_derivative.csv"])
+            with open(written[1]) as infile:
+                lines = infile.read().splitlines()
+        self.assertEqual(lines[0].split(";")[:3],
+                         ["time", "pA, 0 uM", "pA, 0 uM.1"])
+        self.assertEqual(lines[1].split(";")[0], "0,0")
+        self.assertAlmostEqual(float(lines[1].split(";")[1].replace(",", ".")),
+                               1 / 21)
+
+
+if __name__ == "__main__":
+    unittest.main()
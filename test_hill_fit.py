@@ -0,0 +1,77 @@
+import os
+import math
+import unittest
+import tempfile
+
+import numpy as np
+
+import hill_fit as module
+import dose_response
+from test_dose_response import CURVE_FILE_CONTENT
+
+
+CONCENTRATIONS = np.repeat([0, 1, 5, 10, 50, 100, 500, 1000], 3)
+
+
+class TestHillFit(unittest.TestCase):
+    def test_parse_concentration(self):
+        self.assertEqual(module.parse_concentration("500 uM"), 500)
+        self.assertEqual(module.parse_concentration("0,5 mM"), 500)
+        self.assertEqual(module.parse_concentration("250 nM"), 0.25)
+        self.assertEqual(module.parse_concentration("10"), 10)
+        self.assertTrue(math.isnan(module.parse_concentration("IPTG")))
+
+    def test_hill(self):
+        np.testing.assert_allclose(
+            module.hill([0, 20, 1e12], 100, 1000, 20, 1.5), [100, 550, 1000])
+
+    def test_initial_guess(self):
+        responses = module.hill(CONCENTRATIONS, 100, 1000, 20, 1.5)
+        bottom, top, log_ec50, hill = module.initial_guess(
+            CONCENTRATIONS, responses[np.newaxis])[0]
+        self.assertAlmostEqual(bottom, 100, delta=1)
+        self.assertAlmostEqual(top, 1000, delta=30)
+        self.assertTrue(1 <= 10 ** log_ec50 <= 50)
+        self.assertEqual(hill, 1)
+
+    def test_fit(self):
+        rng = np.random.default_rng(0)
+        num_curves = 500
+        bottom = rng.uniform(50, 200, num_curves)
+        top = bottom * rng.uniform(3, 30, num_curves)
+        ec50 = 10 ** rng.uniform(0.5, 2.5, num_curves)
+        hill = rng.uniform(0.7, 3, num_curves)
+        responses = module.hill(
+            CONCENTRATIONS, bottom[:, np.newaxis], top[:, np.newaxis],
+            ec50[:, np.newaxis], hill[:, np.newaxis])
+        responses[0, :3] = np.nan  # Missing values are ignored.
+        result = module.fit(CONCENTRATIONS, responses)
+        self.assertEqual(len(result), num_curves)
+        self.assertTrue(result.converged.all())
+        np.testing.assert_allclose(result.ec50, ec50, rtol=1e-4)
+        np.testing.assert_allclose(result.hill, hill, rtol=1e-4)
+        np.testing.assert_allclose(result.bottom[1:], bottom[1:], rtol=1e-4)
+        np.testing.assert_allclose(result.top, top, rtol=1e-4)
+
+    def test_fit_reports_failures(self):
+        responses = np.full((2, len(CONCENTRATIONS)), np.nan)
+        responses[1] = module.hill(CONCENTRATIONS, 1, 2, 10, 1)
+        result = module.fit(CONCENTRATIONS, responses)
+        np.testing.assert_array_equal(result.converged, [False, True])
+
+    def test_fit_curves(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            curve_file = os.path.join(tmp_dir, "pA.csv")
+            with open(curve_file, "w") as out:
+                out.write(CURVE_FILE_CONTENT)
+            curve = dose_response.DoseResponseCurve(
+                curve_file, num_replicates=2)
+        rows = module.fit_curves([curve], time_points=[300, 840])
+        self.assertEqual([row[:2] for row in rows],
+                         [["pA", 300], ["pA", 840]])
+        self.assertEqual(len(module.fit_curves([curve])), 5)
+        self.assertEqual(module.fit_curves([]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import json
+import unittest
+import tempfile
+import tracemalloc
+
+import constants
+import instrumentation as module
+
+
+@module.measured()
+def copy_file(source, destination):
+    with open(source) as infile, open(destination, "w") as out:
+        out.write(infile.read())
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp_dir.name, "source.csv")
+        with open(self.source, "w") as out:
+            out.write("A1;B1\n" * 100)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp_dir.name, name)
+
+    def test_stages(self):
+        with module.run_report("run", trace_memory=False) as report:
+            with module.span("copy"):
+                for idx in range(3):
+                    copy_file(self.source, self.path(f"copy{idx}.csv"))
+            with module.span("idle"):
+                pass
+        stages = [stage.as_dict() for stage in report.stages.values()]
+        self.assertEqual([stage["path"] for stage in stages],
+                         ["run", "run / copy", "run / copy / copy_file",
+                          "run / idle"])
+        run, copy, copy_file_stage, idle = stages
+        self.assertEqual(copy_file_stage["calls"], 3)
+        self.assertEqual(copy_file_stage["depth"], 2)
+        self.assertEqual(copy["bytes_opened"], 3 * 600)
+        self.assertEqual(copy["bytes_written"], 3 * 600)
+        self.assertEqual(len(copy["files"]), 4)
+        self.assertEqual(run["files"], copy["files"])
+        self.assertEqual(idle["files"], [])
+        self.assertIsNone(run["peak_memory_bytes"])
+        self.assertGreaterEqual(run["wall_s"], copy["wall_s"])
+        self.assertRegex(report.summary(),
+                         r"^copy \d+\.\d\d s, idle \d+\.\d\d s \(total "
+                         + r"\d+\.\d\d s, 4 file\(s\), 1.8 kB opened, "
+                         + r"1.8 kB written\)$")
+
+    def test_renamed_files(self):
+        with module.run_report("run", trace_memory=False) as report:
+            constants.rewrite_file(self.source,
+                                   lambda line: line.replace(";", ","))
+        self.assertEqual(report.root.files_written, {self.source})
+        self.assertEqual(report.root.bytes_written, 600)
+
+    def test_memory(self):
+        with module.run_report("run", trace_memory=True) as report:
+            with module.span("allocate"):
+                data = [0] * 1000000
+                del data
+            with module.span("small"):
+                pass
+        stages = report.stages
+        self.assertGreater(stages[("run", "allocate")].peak_memory, 7000000)
+        self.assertLess(stages[("run", "small")].peak_memory, 1000000)
+        # The peak of the inner span is kept for the run.
+        self.assertGreater(stages[("run",)].peak_memory, 7000000)
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertIn("peak memory", report.summary())
+
+    def test_without_report(self):
+        with module.span("alone") as span:
+            copy_file(self.source, self.path("copy.csv"))
+        self.assertIsNone(span.report)
+        self.assertEqual(span.files, set())
+        self.assertGreater(span.wall_s, 0)
+        self.assertEqual(module.active_spans(), [])
+
+    def test_write_report(self):
+        report_file = self.path(module.REPORT_FILE)
+        with self.assertRaises(ValueError):
+            with module.run_report("run", report_file):
+                with module.span("failing"):
+                    raise ValueError("Stage failed.")
+        with open(report_file) as infile:
+            report = json.load(infile)
+        self.assertEqual(report["run"], "run")
+        self.assertEqual([stage["stage"] for stage in report["stages"]],
+                         ["run", "failing"])
+        # Unwritable report files are logged only.
+        with module.run_report("run", self.path("missing/report.json")):
+            pass
+
+    def test_nested_runs(self):
+        with module.run_report("run"):
+            with self.assertRaises(RuntimeError):
+                with module.run_report("inner"):
+                    pass
+
+
+if __name__ == "__main__":
+    unittest.main()
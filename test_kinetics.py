@@ -0,0 +1,72 @@
+import os
+import math
+import unittest
+import tempfile
+
+import numpy as np
+
+import kinetics as module
+
+
+TEST_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         "test_data")
+
+
+class TestKinetics(unittest.TestCase):
+    def setUp(self):
+        self.times = np.arange(0, 600, 10.0)
+        growth_rates = np.array([0.01, 0.02])
+        lag_times = np.array([100.0, 200.0])
+        self.od = np.minimum(0.01 * np.exp(
+            np.clip(self.times[:, np.newaxis] - lag_times, 0, None)
+            * growth_rates), 1.0)
+
+    def test_growth_kinetics(self):
+        result = module.growth_kinetics(self.times, self.od)
+        np.testing.assert_allclose(result["max_growth_rate"], [0.01, 0.02])
+        np.testing.assert_allclose(result["lag_time"], [100, 200])
+        np.testing.assert_allclose(result["doubling_time"],
+                                   [math.log(2) / 0.01, math.log(2) / 0.02])
+        np.testing.assert_allclose(result["max_od"], [1, 1])
+        np.testing.assert_allclose(
+            result["auc"], np.trapezoid(self.od, self.times, axis=0)
+            if hasattr(np, "trapezoid")
+            else np.trapz(self.od, self.times, axis=0))
+
+    def test_no_growth(self):
+        result = module.growth_kinetics(self.times, np.zeros((60, 1)))
+        self.assertTrue(np.isnan(result["max_growth_rate"][0]))
+        self.assertTrue(np.isnan(result["lag_time"][0]))
+        self.assertEqual(result["max_od"][0], 0)
+
+    def test_missing_od(self):
+        od = np.full((60, 2), np.nan)
+        od[:, 0] = 0.5
+        result = module.growth_kinetics(self.times, od)
+        np.testing.assert_array_equal(result["max_od"], [0.5, np.nan])
+        self.assertTrue(np.isnan(result["max_growth_rate"][1]))
+
+    def test_sliding_slopes(self):
+        values = np.array([[0.0], [1.0], [np.nan], [3.0], [4.0], [5.0]])
+        slopes, window_times, window_means = module.sliding_slopes(
+            np.arange(6.0), values, 2)
+        np.testing.assert_allclose(slopes[:, 0],
+                                   [1, np.nan, np.nan, 1, 1])
+        np.testing.assert_allclose(window_times, [0.5, 1.5, 2.5, 3.5, 4.5])
+        self.assertEqual(window_means[3, 0], 3.5)
+
+    def test_write_growth_table_from_file(self):
+        test_file = os.path.join(
+            TEST_DATA, "SSC_P1_2018120401_results_OD_corrected.csv")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            outfile = os.path.join(tmp_dir, "growth.csv")
+            module.write_growth_table_from_file(test_file, outfile)
+            with open(outfile) as infile:
+                lines = infile.read().splitlines()
+        self.assertEqual(lines[0].split(";"), module.GROWTH_TABLE_COLUMNS)
+        self.assertEqual(len(lines), 97)
+        self.assertTrue(lines[1].startswith("A1;0,0037"))
+
+
+if __name__ == "__main__":
+    unittest.main()
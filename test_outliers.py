@@ -0,0 +1,109 @@
+import os
+import unittest
+import tempfile
+
+import numpy as np
+
+import outliers as module
+import reorder
+import aggregation
+from test_reorder import MERGED_FILE_CONTENT
+
+
+NAMES = ["a, 1", "a, 1.1", "a, 1.2", "a, 1.3", "b, 1", "b, 1.1", "b, 1.2"]
+
+
+class TestOutliers(unittest.TestCase):
+    def setUp(self):
+        times = np.arange(10.0)[:, np.newaxis]
+        self.values = np.hstack((
+            times + [0.0, 0.1, -0.1, 0.05],  # Group a
+            2 * times + [0.0, 0.2, -0.2]))  # Group b
+        self.values[3, 1] = 50  # Single bad value in a.
+        self.values[:, 6] += 30  # Whole bad curve in b.
+
+    def test_replicate_array(self):
+        grouped, replicate_idx = module.replicate_array(
+            np.array([1, 0, 1, 0, 0]), 2, np.arange(5.0)[np.newaxis])
+        np.testing.assert_array_equal(replicate_idx, [0, 0, 1, 1, 2])
+        np.testing.assert_array_equal(
+            grouped[0], [[1, 3, 4], [0, 2, np.nan]])
+
+    def test_nanmedian(self):
+        array = np.array([[1, 5, 2, np.nan], [np.nan] * 4, [4, 1, 2, 3]])
+        np.testing.assert_array_equal(
+            module.nanmedian(array)[:, 0], [2, np.nan, 2.5])
+
+    def test_pointwise_mask(self):
+        mask = module.outlier_mask(NAMES, self.values)
+        self.assertEqual(mask.shape, self.values.shape)
+        self.assertTrue(mask[3, 1])
+        self.assertEqual(mask[:, :4].sum(), 1)
+        self.assertTrue(mask[:, 6].all())
+
+    def test_curve_mask(self):
+        self.values[3, 1] = 3.1
+        mask = module.outlier_mask(NAMES, self.values, method="curve")
+        np.testing.assert_array_equal(
+            mask.all(axis=0), [False] * 6 + [True])
+        np.testing.assert_array_equal(
+            mask.any(axis=0), [False] * 6 + [True])
+        with self.assertRaises(ValueError):
+            module.outlier_mask(NAMES, self.values, method="mean")
+
+    def test_clean_replicates(self):
+        rng = np.random.default_rng(0)
+        values = rng.normal(100, 5, (50, 3 * 40))
+        names = [f"{group}, 1" for group in range(40) for _ in range(3)]
+        for method in module.METHODS:
+            mask = module.outlier_mask(names, values, method)
+            self.assertLess(mask.mean(), 0.01)
+
+    def test_without_spread(self):
+        values = np.full((5, 6), 5.0)
+        values[2, 1] = 6
+        values[:, 3:] = 0
+        values[2, 4] = 1
+        names = ["a, 1"] * 3 + ["b, 1"] * 3
+        with np.errstate(all="raise"):
+            groups, codes = aggregation.group_columns(names)
+            z_scores = module.robust_z_scores(
+                module.replicate_array(codes, len(groups), values)[0])
+        self.assertFalse(np.isinf(z_scores).any())
+        mask = module.outlier_mask(names, values)
+        # The scale of a is floored relative to its level, b has no scale.
+        self.assertTrue(mask[2, 1])
+        self.assertEqual(mask.sum(), 1)
+
+    def test_min_group_size(self):
+        values = np.array([[1.0, 1.1, 0.9], [1.0, 1.1, 100.0]])
+        self.assertTrue(module.outlier_mask(["a, 1"] * 3, values)[1, 2])
+        self.assertFalse(module.outlier_mask(
+            ["a, 1"] * 3, values, min_group_size=4).any())
+        values[1, 0] = np.nan  # Two replicates left at the second time.
+        self.assertFalse(module.outlier_mask(["a, 1"] * 3, values).any())
+
+    def test_mask_is_used_downstream(self):
+        mask = module.outlier_mask(NAMES, self.values)
+        _, statistics = aggregation.replicate_summary(
+            NAMES, self.values, mask)
+        np.testing.assert_array_equal(statistics["N"][3], [3, 2])
+        means, _, counts, _, _ = reorder.replicate_statistics(
+            NAMES, self.values, 4, mask=mask)
+        self.assertEqual(counts[3, 0, 0], 3)
+        self.assertAlmostEqual(means[3, 0, 1], 6.1)
+
+    def test_flag_merged_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            merged_file = os.path.join(tmp_dir, "all_OD.csv")
+            with open(merged_file, "w") as out:
+                out.write(MERGED_FILE_CONTENT)
+            mask = module.flag_merged_file(merged_file)
+            with open(os.path.join(tmp_dir, "all_OD_outliers.csv")) as infile:
+                lines = infile.read().splitlines()
+        self.assertFalse(mask.any())
+        self.assertEqual(lines, ["column;cycle;time;value"])
+
+
+if __name__ == "__main__":
+    unittest.main()
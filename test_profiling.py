@@ -0,0 +1,63 @@
+import os
+import unittest
+import tempfile
+from unittest import mock
+
+import instrumentation
+import profiling as module
+
+
+def busy_function():
+    return sum(index * index for index in range(10000))
+
+
+class TestProfiling(unittest.TestCase):
+    def test_requested_stages(self):
+        self.assertIsNone(module.requested_stages(""))
+        self.assertIsNone(module.requested_stages("0"))
+        self.assertEqual(module.requested_stages("1"), module.ALL_STAGES)
+        self.assertEqual(module.requested_stages(" All "), module.ALL_STAGES)
+        self.assertEqual(module.requested_stages("ingest, merge,"),
+                         {"ingest", "merge"})
+        with mock.patch.dict(os.environ, {module.PROFILE_VARIABLE: "merge"}):
+            self.assertEqual(module.profiler_for_run().stages, {"merge"})
+            self.assertEqual(module.profiler_for_run(True).stages, {"merge"})
+        with mock.patch.dict(os.environ, {module.PROFILE_VARIABLE: ""}):
+            self.assertIsNone(module.profiler_for_run())
+            self.assertEqual(module.profiler_for_run(True).stages,
+                             module.ALL_STAGES)
+
+    def test_selected_stages(self):
+        profiler = module.StageProfiler({"busy"})
+        with instrumentation.run_report("run", profiler=profiler):
+            with instrumentation.span("idle"):
+                pass
+            with instrumentation.span("busy"):
+                with instrumentation.span("nested"):
+                    busy_function()
+            with instrumentation.span("busy"):
+                pass
+        self.assertEqual(profiler.profiled_stages, ["busy", "busy"])
+        summary = profiler.summary()
+        self.assertTrue(summary.startswith(
+            "Profile of the stage busy. Profiled: busy\n"))
+        self.assertIn("(busy_function)", summary)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            profile_file = profiler.write(tmp_dir)
+            self.assertEqual(profile_file,
+                             os.path.join(tmp_dir, "run_profile.prof"))
+            self.assertTrue(os.path.getsize(profile_file))
+            with open(os.path.join(tmp_dir, "run_profile.txt")) as infile:
+                self.assertEqual(infile.read(), summary)
+
+    def test_nothing_profiled(self):
+        profiler = module.StageProfiler({"missing"})
+        with instrumentation.run_report("run", profiler=profiler):
+            busy_function()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.assertIsNone(profiler.write(tmp_dir))
+            self.assertEqual(os.listdir(tmp_dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import unittest
+import tempfile
+
+import constants
+import quality as module
+
+
+NAME_FILE_CONTENT = "A1\tpLux, 0 uM\nA2\tpLux, 500 uM\n"
+
+
+class TestNameFileNormalization(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.name_file = os.path.join(self.tmp_dir.name, "names.csv")
+        with open(self.name_file, "w") as outfile:
+            outfile.write(NAME_FILE_CONTENT)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def read(self):
+        with open(self.name_file) as infile:
+            return infile.read()
+
+    def test_sniff_separator(self):
+        self.assertEqual(module.sniff_separator(self.name_file), "\t")
+        with open(self.name_file, "w") as outfile:
+            outfile.write("\nno separator\n")
+        self.assertIsNone(module.sniff_separator(self.name_file))
+        self.assertEqual(module.is_name_file_csv(self.name_file),
+                         self.name_file)
+
+    def test_normalize_name_file(self):
+        self.assertTrue(module.normalize_name_file(self.name_file))
+        self.assertEqual(self.read(),
+                         NAME_FILE_CONTENT.replace("\t", constants.SEP))
+        mtime = os.stat(self.name_file).st_mtime_ns
+        self.assertFalse(module.normalize_name_file(self.name_file))
+        self.assertEqual(os.stat(self.name_file).st_mtime_ns, mtime)
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["names.csv"])
+
+    def test_rewrite_tsv(self):
+        csv_file = module.rewrite_tsv(self.name_file)
+        self.assertTrue(csv_file.endswith("names_as_csv.csv"))
+        with open(csv_file) as infile:
+            self.assertEqual(infile.read(),
+                             NAME_FILE_CONTENT.replace("\t", constants.SEP))
+        self.assertEqual(self.read(), NAME_FILE_CONTENT)
+
+    def test_remove_double_quotes(self):
+        self.assertFalse(
+            constants.remove_double_quotest_from_file(self.name_file))
+        with open(self.name_file, "w") as outfile:
+            outfile.write('A1;"pLux, 0 uM"\n')
+        self.assertTrue(
+            constants.remove_double_quotest_from_file(self.name_file))
+        self.assertEqual(self.read(), "A1;pLux, 0 uM\n")
+
+    def test_rewrite_file_keeps_original_on_error(self):
+        def fail(line):
+            if line.startswith("A2"):
+                raise ValueError(line)
+            return line.upper()
+
+        with self.assertRaises(ValueError):
+            constants.rewrite_file(self.name_file, fail)
+        self.assertEqual(self.read(), NAME_FILE_CONTENT)
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["names.csv"])
+
+
+if __name__ == "__main__":
+    unittest.main()
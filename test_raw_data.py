@@ -0,0 +1,90 @@
+import os
+import unittest
+import tempfile
+from unittest import mock
+
+import raw_data as module
+import synthetic_data
+import kinetics
+import reorder
+
+
+class TestRawDataRun(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.raw_data_dir = os.path.join(self.tmp_dir.name, "raw")
+        self.name_file_dir = os.path.join(self.tmp_dir.name, "names")
+        os.mkdir(self.raw_data_dir)
+        os.mkdir(self.name_file_dir)
+        synthetic_data.generate_run(self.raw_data_dir, plates=2, cycles=4,
+                                    name_file_dir=self.name_file_dir)
+        self.working_dir = os.getcwd()
+        self.messages = {}
+
+    def tearDown(self):
+        os.chdir(self.working_dir)
+        self.tmp_dir.cleanup()
+
+    def run_steps(self, name_file_dir=None, exclude_outliers=True):
+        steps = module.RawDataRun(
+            self.raw_data_dir, reporter_name="lux",
+            blank_wells=", ".join(synthetic_data.BLANK_WELLS),
+            name_file_dir=name_file_dir, exclude_outliers=exclude_outliers,
+            report=self.report)
+        return steps, steps.run()
+
+    def report(self, step, message):
+        self.messages[step] = message
+
+    def test_run(self):
+        steps, completed = self.run_steps(self.name_file_dir)
+        self.assertTrue(completed)
+        self.assertEqual(steps.merged_files,
+                         ["all_OD.csv", "all_relative_lux.csv"])
+        written = os.listdir(self.raw_data_dir)
+        for file in steps.merged_files + [module.EXPERIMENT_STORE_FILE]:
+            self.assertIn(file, written)
+        # Outliers are listed next to the merged files.
+        for merged_file in steps.merged_files:
+            self.assertIn(os.path.basename(reorder.outlier_file(merged_file)),
+                          written)
+        self.assertEqual(len([file for file in written if file.endswith(
+            f"{kinetics.GROWTH_SUFFIX}.csv")]), 2)
+        self.assertEqual(self.messages[2],
+                         "Naming and sorting of data complete.")
+
+    def test_outlier_masks_reach_the_summaries(self):
+        for exclude_outliers in (True, False):
+            with mock.patch.object(module.aggregation,
+                                   "aggregate_merged_file") as aggregate:
+                self.run_steps(self.name_file_dir, exclude_outliers)
+            masks = [call.kwargs["mask"] for call in aggregate.call_args_list]
+            self.assertEqual(len(masks), 2)
+            for mask in masks:
+                self.assertEqual(mask is not None, exclude_outliers)
+
+    def test_run_without_name_files(self):
+        steps, completed = self.run_steps()
+        self.assertTrue(completed)
+        self.assertEqual(steps.merged_files, [])
+        self.assertNotIn(2, self.messages)
+
+    def test_run_with_stray_raw_data_file(self):
+        # A stray file of another format is no problem, the .asc files are
+        #  read.
+        with open(os.path.join(self.raw_data_dir, "0_plate.xlsx"), "wb"):
+            pass
+        steps, completed = self.run_steps(self.name_file_dir)
+        self.assertTrue(completed)
+        self.assertEqual(len(steps.written_barcodes), 2)
+
+    def test_invalid_directories(self):
+        os.remove(os.path.join(self.name_file_dir, os.listdir(
+            self.name_file_dir)[0]))
+        _, completed = self.run_steps(self.name_file_dir)
+        self.assertFalse(completed)
+        self.assertIn("FOUND 1 PROBLEM(S)", self.messages[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import os
+import unittest
+import tempfile
+from unittest import mock
+from math import sqrt
+from statistics import mean, stdev
+
+import numpy as np
+
+import reorder as module
+
+
+MERGED_FILE_CONTENT = """;temp;time;cycle;pA, 0 uM;pA, 0 uM.1;pA, 5 uM;pA, 5 uM.1;pB, 0 uM;pB, 0 uM.1;pB, 5 uM;pB, 5 uM.1
+0;25,0;0,0;0,0;1,0;2,0;3,0;4,0;5,0;6,0;7,0;8,0
+1;25,0;10,5;1,0;1,5;2,5;3,5;4,5;5,5;6,5;7,5;8,5
+2;25,0;21,0;2,0;2,0;3,0;4,0;5,0;6,0;7,0;8,0;9,0
+"""
+
+
+class TestReorder(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.merged_file = os.path.join(self.tmp_dir.name, "merged.csv")
+        with open(self.merged_file, "w") as out:
+            out.write(MERGED_FILE_CONTENT)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_read_merged_file(self):
+        names, cycles, times, values = module.read_merged_file(
+            self.merged_file)
+        self.assertEqual(names[:2], ["pA, 0 uM", "pA, 0 uM.1"])
+        np.testing.assert_array_equal(cycles, [0, 1, 2])
+        np.testing.assert_array_equal(times, [0, 10.5, 21])
+        self.assertEqual(values.shape, (3, 8))
+        self.assertEqual(values[1, 0], 1.5)
+
+    def test_reorder_time_points(self):
+        names, _, _, values = module.read_merged_file(self.merged_file)
+        reordered, conditions, constructs = module.reorder_time_points(
+            names, values, 2)
+        self.assertEqual(conditions, ["0 uM", "5 uM"])
+        self.assertEqual(constructs, ["pA", "pB"])
+        self.assertEqual(reordered.shape, (3, 2, 4))
+        np.testing.assert_array_equal(reordered[0, 1], [3, 4, 7, 8])
+
+    def test_reorder_all_time_points(self):
+        written_files = module.reorder_all_time_points(self.merged_file, 2)
+        self.assertEqual(len(written_files), 3)
+        with open(written_files[2]) as infile:
+            self.assertEqual(
+                infile.read(),
+                ";pA;;pB;;\n0 uM;2,0;3,0;6,0;7,0;\n5 uM;4,0;5,0;8,0;9,0;\n")
+
+        written_files = module.reorder_all_time_points(
+            self.merged_file, 2, long_format=True)
+        with open(written_files[0]) as infile:
+            lines = infile.readlines()
+        self.assertEqual(len(lines), 1 + 3 * 8)
+        self.assertEqual(lines[1], "0;0,0;0 uM;pA;1;1,0\n")
+
+    def test_replicate_statistics(self):
+        names, _, _, values = module.read_merged_file(self.merged_file)
+        means, stdevs, counts, conditions, constructs = \
+            module.replicate_statistics(names, values, 2)
+        self.assertEqual(means.shape, (3, 2, 2))
+        self.assertAlmostEqual(means[0, 0, 1], 5.5)
+        self.assertAlmostEqual(stdevs[0, 0, 1], sqrt(0.5))
+        self.assertEqual(counts[0, 0, 1], 2)
+
+        means, stdevs, _, _, _ = module.replicate_statistics(
+            names, values, 2, background_keyword="pB")
+        background = [5, 6, 7, 8]
+        self.assertAlmostEqual(means[0, 0, 0], 1.5 - mean(background))
+        self.assertAlmostEqual(stdevs[0, 0, 0],
+                               sqrt(0.5 + stdev(background)**2))
+        with self.assertRaises(ValueError):
+            module.replicate_statistics(
+                names, values, 2, background_keyword="pC")
+
+    def test_reorder_single_point(self):
+        self.assertEqual(
+            module.reorder_single_point(self.merged_file, 2, timepoint_idx=3),
+            ";pA;;pB;;\n0 uM;2,0;3,0;6,0;7,0;\n5 uM;4,0;5,0;8,0;9,0;\n")
+        # Surplus replicates are dropped.
+        self.assertEqual(
+            module.reorder_single_point(self.merged_file, 1, timepoint_idx=1),
+            ";pA;pB;\n0 uM;1,0;5,0;\n5 uM;3,0;7,0;\n")
+        bg_corrected = module.reorder_single_point(
+            self.merged_file, 2, timepoint_idx=1, background_keyword="pA")
+        self.assertEqual(bg_corrected.splitlines()[1].split(";")[1:4],
+                         ["-1,0", "1,4719601443879744", "2"])
+
+    def test_get_row_offsets(self):
+        offsets = module.get_row_offsets(self.merged_file)
+        index_file = os.path.join(self.tmp_dir.name, "merged.rows")
+        self.assertTrue(os.path.exists(index_file))
+        self.assertEqual(len(offsets), 4)
+        with open(self.merged_file, "rb") as infile:
+            infile.seek(offsets[2])
+            self.assertTrue(infile.readline().startswith(b"1;25,0;10,5;"))
+        self.assertEqual(module.get_row_offsets(self.merged_file), offsets)
+
+        # A changed file invalidates the cached offsets.
+        with open(self.merged_file, "a") as out:
+            out.write("3;25,0;31,5;3,0;1;1;1;1;1;1;1;1\n")
+        self.assertEqual(len(module.get_row_offsets(self.merged_file)), 5)
+        _, cycles, times, _ = module.read_time_point(self.merged_file, 4)
+        self.assertEqual((cycles[0], times[0]), (3, 31.5))
+        with self.assertRaises(ValueError):
+            module.read_time_point(self.merged_file, 5)
+
+    def test_read_outlier_mask(self):
+        names, cycles, _, _ = module.read_merged_file(self.merged_file)
+        self.assertIsNone(
+            module.read_outlier_mask(self.merged_file, names, cycles))
+        with open(module.outlier_file(self.merged_file), "w") as out:
+            out.write("column;cycle;time;value\n"
+                      + "pA, 0 uM.1;1;10,5;5\n"
+                      + "unknown;1;10,5;5\n")
+        mask = module.read_outlier_mask(self.merged_file, names, cycles)
+        self.assertEqual(mask.shape, (len(cycles), len(names)))
+        self.assertEqual(mask.sum(), 1)
+        self.assertTrue(mask[list(cycles).index(1), 1])
+
+    def test_row_offsets_of_read_only_directory(self):
+        with mock.patch.object(module.os, "access", return_value=False):
+            self.assertEqual(len(module.get_row_offsets(self.merged_file)),
+                             4)
+        self.assertFalse(os.path.exists(
+            os.path.join(self.tmp_dir.name, "merged.rows")))
+
+
+if __name__ == "__main__":
+    unittest.main()
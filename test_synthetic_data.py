@@ -0,0 +1,118 @@
+import os
+import filecmp
+import unittest
+import tempfile
+
+import numpy as np
+
+import synthetic_data as module
+import validation
+import raw_data
+import blank_and_name_handling
+import dose_response
+
+
+class TestSyntheticData(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.raw_data_dir = os.path.join(self.tmp_dir.name, "raw")
+        self.name_file_dir = os.path.join(self.tmp_dir.name, "names")
+        os.mkdir(self.raw_data_dir)
+        os.mkdir(self.name_file_dir)
+        self.working_dir = os.getcwd()
+
+    def tearDown(self):
+        os.chdir(self.working_dir)
+        self.tmp_dir.cleanup()
+
+    def read_back(self, raw_format, plates=2, cycles=4):
+        """Generates a run and reads it with the readers of raw_data.py.
+        Returns the name files and the OD and reporter wrappers of plate 1.
+        """
+        name_files = module.generate_run(
+            self.raw_data_dir, plates, cycles, raw_format=raw_format,
+            name_file_dir=self.name_file_dir)
+        self.assertEqual(
+            validation.validate_directories(self.raw_data_dir,
+                                            self.name_file_dir), ([], []))
+        barcodes = raw_data.read_raw_data(self.raw_data_dir, "lux")
+        self.assertEqual(sorted(barcodes), sorted(name_files))
+        results_file = [file for file in os.listdir()
+                        if module.barcode_of(1) in file
+                        and "results.txt" in file][0]
+        od, rru = blank_and_name_handling.get_wrappers(
+            results_file, list(module.BLANK_WELLS))
+        return name_files, od, rru
+
+    def test_format_precedence(self):
+        name_files = module.generate_run(
+            self.raw_data_dir, 1, 3, raw_format="asc",
+            name_file_dir=self.name_file_dir)
+        # The .asc files are read, whatever the order of the listing, and
+        #  the stray file only raises a warning.
+        with open(os.path.join(self.raw_data_dir, "0_plate.xls"), "w"):
+            pass
+        problems, warnings = validation.validate_directories(
+            self.raw_data_dir, self.name_file_dir)
+        self.assertEqual(problems, [])
+        self.assertIn("Only the .asc files will be read.", warnings[0])
+        self.assertEqual(raw_data.read_raw_data(self.raw_data_dir, "lux"),
+                         list(name_files))
+
+    def test_asc_round_trip(self):
+        name_files, od, rru = self.read_back("asc")
+        self.assertEqual(len(od["A1"]), 4)
+        np.testing.assert_allclose(od["time"], [0, 20, 40, 60])
+        # The OD follows the growth curve of the model on top of the blank.
+        np.testing.assert_allclose(
+            od["A1"], module.OD_BLANK + module.growth(np.array(od["time"])),
+            rtol=0.1)
+        np.testing.assert_allclose(od["H10"], module.OD_BLANK, rtol=0.1)
+        label_dict = blank_and_name_handling.generate_label_dict(
+            name_files[module.barcode_of(1)])
+        self.assertEqual(label_dict["A1"], "SYN01 c1, 0 uM IPTG")
+        self.assertEqual(label_dict["H9"], "SYN01 c7, 500 uM IPTG")
+        self.assertEqual(label_dict["H12"], "blank")
+
+    def test_xlsx_round_trip(self):
+        _, od, rru = self.read_back("xlsx", plates=1)
+        np.testing.assert_allclose(od["time"], [0, 20, 40, 60])
+        self.assertEqual(len(rru["H9"]), 4)
+        with self.assertRaises(ValueError):
+            module.generate_run(self.raw_data_dir, 1,
+                                module.XLSX_MAX_CYCLES + 1, raw_format="xlsx")
+
+    @unittest.skipUnless(module.HAS_XLWT, "Writing .xls files requires xlwt.")
+    def test_xls_round_trip(self):
+        _, od, _ = self.read_back("xls", plates=1)
+        np.testing.assert_allclose(od["time"], [0, 20, 40, 60])
+
+    def test_unavailable_format(self):
+        with self.assertRaises(ValueError):
+            module.generate_run(self.raw_data_dir, raw_format="txt")
+
+    def test_reproducible(self):
+        other_dir = os.path.join(self.tmp_dir.name, "other")
+        os.mkdir(other_dir)
+        module.generate_run(self.raw_data_dir, 1, 3, seed=1)
+        module.generate_run(other_dir, 1, 3, seed=1)
+        files = sorted(os.listdir(self.raw_data_dir))
+        self.assertEqual(len(files), 3)
+        _, mismatch, errors = filecmp.cmpfiles(self.raw_data_dir, other_dir,
+                                               files, shallow=False)
+        self.assertEqual(mismatch + errors, [])
+
+    def test_curves(self):
+        paths = module.generate_curves(self.raw_data_dir, plates=1,
+                                       cycles=60)
+        self.assertEqual(len(paths), module.CONSTRUCTS_PER_PLATE)
+        drc = dose_response.DoseResponseCurve(paths[0])
+        self.assertEqual(drc.conditions, ["0 uM", "5 uM", "50 uM", "500 uM"])
+        self.assertEqual(drc.values.shape, (60, 4, 3))
+        # The induced reporter rises above the uninduced one.
+        self.assertGreater(drc.dynamic_range_at(1120), 2)
+        self.assertGreater(drc.time_delay(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
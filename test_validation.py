@@ -0,0 +1,94 @@
+import os
+import shutil
+import unittest
+import tempfile
+
+import validation as module
+
+
+ASC_FILES = ["SSC_P1_2018120401_{}.asc".format(cycle) for cycle in range(5)]
+
+
+class TestValidation(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.raw_data_dir = os.path.join(self.tmp_dir.name, "raw")
+        self.name_file_dir = os.path.join(self.tmp_dir.name, "names")
+        os.mkdir(self.raw_data_dir)
+        os.mkdir(self.name_file_dir)
+        for file in ASC_FILES:
+            shutil.copy(os.path.join("test_data", file), self.raw_data_dir)
+        with open(os.path.join(self.name_file_dir, "names.csv"), "w") as out:
+            out.write("A1;pLux, 0 uM\n")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def validate(self):
+        problems, _ = module.validate_directories(self.raw_data_dir,
+                                                  self.name_file_dir)
+        return problems
+
+    def test_valid_directories(self):
+        self.assertEqual(self.validate(), [])
+        self.assertEqual(module.validate_directories("test_data"), ([], []))
+
+    def test_missing_and_unequal_cycles(self):
+        os.remove(os.path.join(self.raw_data_dir, ASC_FILES[2]))
+        for cycle in range(3):
+            shutil.copy(
+                os.path.join("test_data", ASC_FILES[cycle]),
+                os.path.join(self.raw_data_dir,
+                             "SSC_P1_2018120402_{}.asc".format(cycle)))
+        self.assertEqual(self.validate(), [
+            "Plate 2018120401 is missing the files of cycles 2.",
+            "Plates have different numbers of cycles: 2018120401 (4), "
+            + "2018120402 (2).",
+            "Found 1 name file(s) for 2 plate(s).",
+        ])
+
+    def test_broken_files(self):
+        open(os.path.join(self.raw_data_dir, ASC_FILES[0]), "w").close()
+        with open(os.path.join(self.raw_data_dir, ASC_FILES[1]), "a") as out:
+            out.write("truncated")
+        with open(os.path.join(self.name_file_dir, "names.csv"), "w") as out:
+            out.write("A1 pLux\n")
+        problems = self.validate()
+        self.assertEqual(len(problems), 3)
+        self.assertIn("is empty", problems[0])
+        self.assertIn("does not end with the time", problems[1])
+        self.assertIn("contains no separator", problems[2])
+
+    def test_raw_data_formats(self):
+        self.assertEqual(
+            module.validate_directories(self.name_file_dir),
+            ([f"{self.name_file_dir} contains no .asc, .xlsx or .xls "
+              + "files."], []))
+        with open(os.path.join(self.raw_data_dir, "plate.xlsx"), "wb") as out:
+            out.write(b"not a zip archive")
+        # Only the .asc files are read, the .xlsx file is no problem.
+        problems, warnings = module.validate_directories(
+            self.raw_data_dir, self.name_file_dir)
+        self.assertEqual(problems, [])
+        self.assertEqual(len(warnings), 1)
+        for file in ASC_FILES:
+            os.remove(os.path.join(self.raw_data_dir, file))
+        self.assertEqual(self.validate(), [
+            "plate.xlsx is not a valid Excel workbook.",
+            "Found 1 name file(s) for 0 plate(s).",
+        ])
+
+    def test_hamilton_files(self):
+        for file in ASC_FILES:
+            os.remove(os.path.join(self.raw_data_dir, file))
+        for cycle in (1, 2, 4):
+            with open(os.path.join(self.raw_data_dir,
+                                   "BC0815_P4_run_{}.xls".format(cycle)),
+                      "wb") as out:
+                out.write(module.XLS_MAGIC)
+        self.assertEqual(self.validate(),
+                         ["Plate 0815 is missing the files of cycles 3."])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,265 @@
+"""Pre-flight validation of raw data and name file directories.
+
+Reading the raw data of a run takes minutes, while most structural problems
+of a directory can be seen from the file names, the file sizes and a few
+bytes at the start or the end of every file:
+
+    .asc   (TECAN robot)    <prefix>_<barcode>_<cycle>.asc with a
+                            "Well positions" header and a trailer holding
+                            the barcode, the temperatures and the time of
+                            the measurement
+    .xlsx  (TECAN reader)   one Excel workbook (zip archive) per barcode
+    .xls   (Hamilton robot) BC<barcode>_..._<cycle>.xls files of plate P4
+                            (OLE2 compound documents)
+
+validate_directories reports all problems found instead of stopping at the
+first one, so that a directory can be fixed in a single pass before the
+expensive parsing starts.
+"""
+
+import os
+import logging
+from collections import defaultdict
+
+import constants
+import quality
+import get_raw_data_asc
+
+
+# Initialize logger.
+logger = constants.setup_logger(
+    log_level=logging.DEBUG,
+    logger_name=__name__
+)
+
+ASC_HEADER = b"Well positions"
+XLSX_MAGIC = b"PK\x03\x04"
+XLS_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+TRAILER_SIZE = 512  # Bytes read from the end of .asc files.
+
+
+def raw_data_format(files):
+    """Returns the raw data formats ("asc", "xlsx", "xls") found in files in
+    this order of precedence. read_raw_data of raw_data.py reads the first.
+    """
+    formats = []
+    for extension in ("asc", "xlsx", "xls"):
+        if any(file.endswith("." + extension) for file in files):
+            formats.append(extension)
+    return formats
+
+
+def read_head(file, size):
+    with open(file, "rb") as infile:
+        return infile.read(size)
+
+
+def read_trailer(file, size=TRAILER_SIZE):
+    """Returns the last lines of file that fit into size bytes."""
+    with open(file, "rb") as infile:
+        infile.seek(0, os.SEEK_END)
+        infile.seek(max(infile.tell() - size, 0))
+        trailer = infile.read().decode("latin-1")
+    return trailer.strip().splitlines()
+
+
+def missing_cycles(cycles, first=0):
+    """Returns the cycles from first up to the last cycle that are missing."""
+    return sorted(set(range(first, max(cycles) + 1)) - set(cycles))
+
+
+def check_cycles(plates, first=0):
+    """Takes a dictionary mapping barcodes to their cycle numbers as input.
+    Returns problems for gaps in the cycles of a plate starting at first and
+    for plates with different numbers of cycles.
+    """
+    problems = []
+    for barcode, cycles in sorted(plates.items()):
+        gaps = missing_cycles(cycles, first)
+        if gaps:
+            problems.append(f"Plate {barcode} is missing the files of cycles "
+                            + ", ".join(map(str, gaps)) + ".")
+    last_cycles = {barcode: max(cycles) for barcode, cycles in plates.items()}
+    if len(set(last_cycles.values())) > 1:
+        problems.append("Plates have different numbers of cycles: "
+                        + ", ".join(f"{barcode} ({cycle})" for barcode, cycle
+                                    in sorted(last_cycles.items())) + ".")
+    return problems
+
+
+def check_asc_trailer(file):
+    """Returns the problems in the trailer of an .asc file and the time of
+    the measurement (None if it cannot be read). The barcode in the trailer
+    is not checked, since read_raw_data takes the barcode from the file name.
+    """
+    problems = []
+    lines = read_trailer(file)
+    try:
+        time_of_data = get_raw_data_asc.time_from_asc(lines[-1])
+    except (ValueError, IndexError):
+        return [f"{os.path.basename(file)} does not end with the time of "
+                + "the measurement."], None
+    if len(lines) < 2 or "temperature" not in lines[-2]:
+        problems.append(f"{os.path.basename(file)} lacks the measured "
+                        + "temperature.")
+    return problems, time_of_data
+
+
+def check_asc_files(raw_data_dir, files):
+    """Returns the barcodes and the problems of the .asc files of a TECAN
+    robot run.
+    """
+    problems = []
+    plates = defaultdict(list)
+    prefixes = defaultdict(set)
+    times = defaultdict(dict)
+    for file in sorted(file for file in files if file.endswith(".asc")):
+        parts = os.path.splitext(file)[0].split(sep="_")
+        try:
+            barcode, cycle = parts[2], int(parts[3])
+        except (IndexError, ValueError):
+            problems.append(f"{file} is not named <prefix>_<barcode>_<cycle>"
+                            + ".asc.")
+            continue
+        plates[barcode].append(cycle)
+        prefixes[barcode].add(file[:file.index(barcode)])
+        path = os.path.join(raw_data_dir, file)
+        if os.path.getsize(path) == 0:
+            problems.append(f"{file} is empty.")
+            continue
+        if not read_head(path, len(ASC_HEADER)) == ASC_HEADER:
+            problems.append(f"{file} does not start with the well positions.")
+        trailer_problems, times[barcode][cycle] = check_asc_trailer(path)
+        problems += trailer_problems
+    for barcode, barcode_prefixes in sorted(prefixes.items()):
+        if len(barcode_prefixes) > 1:
+            problems.append(f"Plate {barcode} appears with different file "
+                            + "name prefixes: "
+                            + ", ".join(sorted(barcode_prefixes)) + ".")
+    problems += check_cycles(plates)
+    for barcode, cycle_times in sorted(times.items()):
+        ordered = [cycle_times[cycle] for cycle in sorted(cycle_times)
+                   if cycle_times[cycle] is not None]
+        if any(later < earlier for earlier, later
+               in zip(ordered, ordered[1:])):
+            problems.append(f"The measurement times of plate {barcode} do "
+                            + "not increase with the cycle number.")
+    return sorted(plates), problems
+
+
+def check_xlsx_files(raw_data_dir, files):
+    """Returns the barcodes and the problems of the Excel files of a TECAN
+    reader run.
+    """
+    problems = []
+    barcodes = []
+    for file in sorted(file for file in files if file.endswith(".xlsx")):
+        if not read_head(os.path.join(raw_data_dir, file),
+                         len(XLSX_MAGIC)) == XLSX_MAGIC:
+            problems.append(f"{file} is not a valid Excel workbook.")
+            continue
+        barcodes.append(file.split(sep=".")[0])
+    return barcodes, problems
+
+
+def check_xls_files(raw_data_dir, files):
+    """Returns the barcodes and the problems of the .xls files of a Hamilton
+    robot run.
+    """
+    problems = []
+    plates = defaultdict(list)
+    for file in sorted(file for file in files
+                       if ".xls" in file and "P4" in file):
+        barcode = file.split(sep="_")[0].replace("BC", "")
+        try:
+            cycle = int(file.split(sep="_")[-1].split(sep=".")[0])
+        except ValueError:
+            problems.append(f"{file} does not end with _<cycle>.xls.")
+            continue
+        if not read_head(os.path.join(raw_data_dir, file),
+                         len(XLS_MAGIC)) == XLS_MAGIC:
+            problems.append(f"{file} is not a valid Excel 97 workbook.")
+            continue
+        plates[barcode].append(cycle)
+    if not plates:
+        if not problems:
+            problems.append("No Hamilton data files of plate P4 found.")
+        return [], problems
+    # All plates are read from the first to the last cycle of any plate.
+    problems += check_cycles(
+        plates, first=min(min(cycles) for cycles in plates.values()))
+    return sorted(plates), problems
+
+
+FORMAT_CHECKS = {
+    "asc": check_asc_files,
+    "xlsx": check_xlsx_files,
+    "xls": check_xls_files,
+}
+
+
+def check_raw_data_dir(raw_data_dir):
+    """Returns the barcodes, the problems and the warnings of a raw data
+    directory. Warnings do not keep the data from being read.
+    """
+    if not os.path.isdir(raw_data_dir):
+        return ([], [f"The raw data directory {raw_data_dir} does not "
+                     + "exist."], [])
+    files = os.listdir(raw_data_dir)
+    formats = raw_data_format(files)
+    if not formats:
+        return ([], [f"{raw_data_dir} contains no .asc, .xlsx or .xls "
+                     + "files."], [])
+    warnings = []
+    if len(formats) > 1:
+        warnings.append(f"{raw_data_dir} contains raw data of several "
+                        + f"formats ({', '.join(formats)}). Only the "
+                        + f".{formats[0]} files will be read.")
+    barcodes, problems = FORMAT_CHECKS[formats[0]](raw_data_dir, files)
+    return barcodes, problems, warnings
+
+
+def check_name_files(name_file_dir, barcodes):
+    """Returns the problems of the name files in name_file_dir for the
+    plates with the given barcodes.
+    """
+    if not os.path.isdir(name_file_dir):
+        return [f"The name file directory {name_file_dir} does not exist."]
+    problems = []
+    name_files = sorted(os.listdir(name_file_dir))
+    if len(name_files) != len(barcodes):
+        problems.append(f"Found {len(name_files)} name file(s) for "
+                        + f"{len(barcodes)} plate(s).")
+    for name_file in name_files:
+        path = os.path.join(name_file_dir, name_file)
+        if not os.path.isfile(path):
+            problems.append(f"{name_file} in the name file directory is not "
+                            + "a file.")
+        elif os.path.getsize(path) == 0:
+            problems.append(f"The name file {name_file} is empty.")
+        elif quality.sniff_separator(path) is None:
+            problems.append(f"The name file {name_file} contains no "
+                            + f"separator ('{constants.SEP}' or tab).")
+    return problems
+
+
+def validate_directories(raw_data_dir, name_file_dir=None):
+    """Checks the structure of a raw data directory and the optional name
+    file directory without parsing the data. Returns a tuple (problems,
+    warnings) of lists. Problems keep the data from being analysed and are
+    empty for valid directories, warnings are only logged.
+    """
+    barcodes, problems, warnings = check_raw_data_dir(raw_data_dir)
+    if name_file_dir is not None:
+        problems += check_name_files(name_file_dir, barcodes)
+    for problem in problems:
+        logger.error(problem)
+    for warning in warnings:
+        logger.warning(warning)
+    logger.info(f"Validated {raw_data_dir}: {len(barcodes)} plate(s), "
+                + f"{len(problems)} problem(s), {len(warnings)} warning(s).")
+    return problems, warnings
+
+
+if __name__ != "__main__":
+    constants.announce("Initialized pre-flight validation.")